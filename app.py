@@ -2,13 +2,19 @@ import streamlit as st
 import os
 import time
 import uuid
-from PIL import Image
-from fpdf import FPDF
 from langchain_core.messages import HumanMessage
-from src.graph import app as agent_graph
+from src.runs import get_run_manager, RunQueueFull, warm_up
+from src.tools.workspace import create_workspace, release_workspace, workspace_file
+from src.tools.pdf import prebuild_pdf, report_pdf
+from src.tools.artifacts import chart_digest, chart_variant, variant_path
+from src.tools.uploads import read_preview, count_rows, upload_hash, save_upload
+from src.tools.history import get_history, HISTORY_PAGE_SIZE
 
 # Cau hinh trang
 st.set_page_config(page_title="Intelligent Data Analyst", layout="wide", initial_sidebar_state="expanded")
+# Agents, graph, OpenAI client and REPL workers load in the background (once per server process),
+# the page renders meanwhile and the first analysis doesn't pay the cold start
+warm_up()
 
 # CSS Custom
 st.markdown("""
@@ -22,68 +28,64 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # SESSION STATE MANAGEMENT 
-if "history" not in st.session_state:
-    st.session_state.history = []
+if "history_page" not in st.session_state:
+    # History itself lives in SQLite (src/tools/history.py), only the page shown is kept here
+    st.session_state.history_page = 0
+if "preview" not in st.session_state:
+    st.session_state.preview = None
 if "current_report" not in st.session_state:
     st.session_state.current_report = None
-if "uploaded_file_path" not in st.session_state:
-    st.session_state.uploaded_file_path = None
-
-def create_pdf(p1, p2, p3):
-    pdf = FPDF()
-    pdf.add_page()
-    if os.path.exists('DejaVuSans.ttf'):
-        pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-        pdf.set_font('DejaVu', '', 14)
-    else:
-        pdf.set_font("Arial", size=12)
-    
-    pdf.cell(200, 10, txt="DATA ANALYSIS REPORT", ln=1, align='C')
-    pdf.ln(10)
-    
-    def write_section(title, body):
-        if os.path.exists('DejaVuSans.ttf'):
-            pdf.set_font('DejaVu', '', 14)
-            pdf.cell(200, 10, txt=title, ln=1)
-            pdf.set_font('DejaVu', '', 11)
-            pdf.multi_cell(0, 8, txt=body)
-        else:
-             # Fallback cho font Arial
-            pdf.set_font("Arial", 'B', 14)
-            pdf.cell(200, 10, txt=title.encode('latin-1', 'replace').decode('latin-1'), ln=1)
-            pdf.set_font("Arial", size=11)
-            pdf.multi_cell(0, 8, txt=body.encode('latin-1', 'replace').decode('latin-1'))
-        pdf.ln(5)
-
-    write_section("1. Trends & Overview", p1)
-    if os.path.exists("chart_1.png"):
-        pdf.image("chart_1.png", x=10, w=170)
-        pdf.ln(5)
-
-    write_section("2. Detailed Analysis", p2)
-    if os.path.exists("chart_2.png"):
-        pdf.image("chart_2.png", x=10, w=170)
-        pdf.ln(5)
-        
-    write_section("3. Insights & Recommendations", p3)
-    
-    return pdf.output(dest='S').encode('latin-1')
+if "thread" not in st.session_state:
+    # Analysis thread of the current file: follow-up questions resume its checkpointed state
+    st.session_state.thread = None
+if "user_id" not in st.session_state:
+    # Fairness key for the run manager: one browser session = one user
+    st.session_state.user_id = uuid.uuid4().hex
+# Progress labels for streamed node updates
+NODE_LABELS = {
+    "rewriter": "Request validated",
+    "cleaner": "Data cleaned",
+    "profiler": "Key columns detected",
+    "eda": "Exploratory analysis done",
+    "viz": "Charts created",
+    "validation": "Results validated",
+    "report": "Report written",
+}
+SECTION_TITLES = ["1. Data Overview", "2. Detailed Analysis", "3. Insights & Recommendations"]
 
 # SIDEBAR
 with st.sidebar:
     st.title("Analysis History")
     if st.button("New Session", use_container_width=True):
         st.session_state.current_report = None
+        if st.session_state.thread:
+            get_run_manager().forget_thread(st.session_state.thread["id"])
+            st.session_state.thread = None
         st.rerun()
     
     st.markdown("---")
     
-    # Hien thi danh sach cac bai phan tich cu
-    for idx, item in enumerate(reversed(st.session_state.history)):
-        # item format: {'id': ..., 'timestamp': ..., 'query': ..., 'report': ...}
+    # Hien thi danh sach cac bai phan tich cu (mot trang, moi nhat truoc)
+    history = get_history()
+    items, total = history.page(st.session_state.user_id, st.session_state.history_page)
+    for item in items:
+        # item format: {'id': ..., 'timestamp': ..., 'query': ..., 'img1': ...} - report is loaded on click
+        thumb = variant_path(item.get("img1"), "thumb")
+        if thumb:
+            st.image(thumb, output_format="PNG")
         label = f"{item['timestamp']} - {item['query'][:20]}..."
         if st.button(label, key=f"hist_{item['id']}", use_container_width=True):
-            st.session_state.current_report = item['report']
+            st.session_state.current_report = history.get(st.session_state.user_id, item['id'])
+            st.rerun()
+    pages = max(1, -(-total // HISTORY_PAGE_SIZE))
+    if pages > 1:
+        prev_col, info_col, next_col = st.columns([1, 2, 1])
+        if prev_col.button("<", disabled=st.session_state.history_page == 0, key="hist_prev"):
+            st.session_state.history_page -= 1
+            st.rerun()
+        info_col.caption(f"Page {st.session_state.history_page + 1} / {pages}")
+        if next_col.button(">", disabled=st.session_state.history_page >= pages - 1, key="hist_next"):
+            st.session_state.history_page += 1
             st.rerun()
 
 # MAIN UI
@@ -94,17 +96,14 @@ st.markdown("### Step 1: Upload File")
 uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
 
 if uploaded_file:
-    # Luu file
-    file_path = "uploaded_data.csv"
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    st.session_state.uploaded_file_path = file_path
-    
-    # Display preview
-    import pandas as pd
-    df_preview = pd.read_csv(file_path)
-    with st.expander(f"Preview: {uploaded_file.name} ({df_preview.shape[0]} rows)"):
-        st.dataframe(df_preview.head())
+    # Display preview (file is saved into the run workspace on submit)
+    # Only the first rows are parsed, rows are counted from newlines - once per upload, not per rerun
+    preview = st.session_state.preview
+    if preview is None or preview["file_id"] != uploaded_file.file_id:
+        preview = {"file_id": uploaded_file.file_id, "head": read_preview(uploaded_file), "rows": count_rows(uploaded_file)}
+        st.session_state.preview = preview
+    with st.expander(f"Preview: {uploaded_file.name} ({preview['rows']} rows)"):
+        st.dataframe(preview["head"])
 else:
     st.info("Please upload a CSV file to begin.")
 
@@ -122,10 +121,12 @@ with st.form(key="analysis_form"):
     cols = st.columns([1, 5])
     with cols[0]:
         submit_button = st.form_submit_button(label="Analyze Now", use_container_width=True)
+    with cols[1]:
+        use_cache = st.checkbox("Reuse cached results for identical data & request", value=True)
 
 # PROCESSING LOGIC
 if submit_button:
-    if not st.session_state.uploaded_file_path:
+    if not uploaded_file:
         st.error("Please upload a file to analyze")
     else:
         # Handle default prompt if user leaves blank
@@ -133,54 +134,137 @@ if submit_button:
         if not final_query:
             final_query = "Perform a general analysis of this dataset"
         
-        # Start agent execution
-        with st.spinner("Agent is reading data, creating charts, and writing report... Please wait"):
-            try:
-                # Goi Graph
-                inputs = {
-                    "messages": [HumanMessage(content=final_query)], 
-                    "csv_file_path": st.session_state.uploaded_file_path
-                }
-                
-                result = agent_graph.invoke(inputs)
+        # Start agent execution - stream node updates and report tokens as they arrive
+        status = st.status("Agent is reading data, creating charts, and writing report...", expanded=True)
+        live = st.container()
+        live.markdown("### Analysis Results (live)")
+        chart_area = live.container()
+        section_boxes = []
+        for title in SECTION_TITLES:
+            live.markdown(f'<div class="report-title">{title}</div>', unsafe_allow_html=True)
+            section_boxes.append(live.empty())
+        section_text = ["", "", ""]
+        run = None
+        
+        try:
+            # Same file as the previous question -> follow-up in the same thread, else start a new one
+            file_hash = upload_hash(uploaded_file)
+            thread = st.session_state.thread
+            # (the workspace may have expired under the retention policy)
+            follow_up = thread is not None and thread["file_hash"] == file_hash and os.path.exists(thread["csv_path"])
+            if not follow_up:
+                if thread:
+                    get_run_manager().forget_thread(thread["id"])
+                # Moi file co workspace rieng -> nhieu session chay song song an toan
+                workspace = create_workspace()
+                file_path = workspace_file({"workspace_dir": workspace}, "uploaded_data.csv")
+                save_upload(uploaded_file, file_path)
+                thread = {"id": uuid.uuid4().hex, "file_hash": file_hash, "workspace": workspace, "csv_path": file_path}
+                st.session_state.thread = thread
+            
+            # Goi Graph
+            inputs = {
+                "messages": [HumanMessage(content=final_query)], 
+                "csv_file_path": thread["csv_path"],
+                "workspace_dir": thread["workspace"],
+                "use_cache": use_cache
+            }
+            
+            # Runs are queued and executed by the shared run manager (async graph, bounded concurrency)
+            run = get_run_manager().submit(st.session_state.user_id, inputs, thread_id=thread["id"])
+            if run.status == "queued":
+                status.update(label="Waiting for a free slot (other analyses are running)...")
+            elif follow_up:
+                status.update(label="Follow-up question: reusing the analysis of this file, rewriting the report...")
+            result = dict(inputs)
+            for mode, payload in run.stream():
+                if mode == "messages":
+                    # Report sections stream token by token (tagged section_1..3 in reporting_node)
+                    chunk, meta = payload
+                    for idx in range(3):
+                        if f"section_{idx + 1}" in (meta.get("tags") or []) and chunk.content:
+                            section_text[idx] += chunk.content
+                            section_boxes[idx].markdown(section_text[idx])
+                    continue
                 
-                # Kiem tra tu choi
-                if result.get("refusal_reason"):
-                    st.warning(f"{result.get('refusal_reason')}")
-                    st.stop()
+                for node, update in payload.items():
+                    if not update:
+                        continue
+                    result.update(update)
+                    seconds = update.get("node_timings", {}).get(node, {}).get("seconds")
+                    label = NODE_LABELS.get(node, node)
+                    status.write(f"{label} ({seconds:.1f}s)" if seconds is not None else label)
+                    
+                    # Charts are shown as soon as the viz agent saves them
+                    if node == "viz":
+                        for img in update.get("viz_images", []):
+                            chart_area.image(chart_variant(img, "web"), output_format="PNG", use_container_width=True)
+                    
+                    # Cached reports arrive in one piece
+                    if node == "report":
+                        for idx, part in enumerate(update.get("final_report", "").split("|||")[:3]):
+                            section_boxes[idx].markdown(part.replace("##", "").strip())
+            
+            if run.status == "failed":
+                raise run.error
+            
+            # Kiem tra tu choi
+            if result.get("refusal_reason"):
+                status.update(label="Request rejected", state="error")
+                st.warning(f"{result.get('refusal_reason')}")
+                st.stop()
 
-                raw_report = result.get("final_report", "")
-                
-                if not raw_report:
-                    st.error("Error: Unable to generate report (possible system error).")
-                    st.stop()
-                
-                # Parse results
-                parts = raw_report.split("|||")
-                if len(parts) < 3: parts = [raw_report, "No Data", "No Data"]
-                
-                report_data = {
-                    "p1": parts[0],
-                    "p2": parts[1],
-                    "p3": parts[2],
-                    "img1": "chart_1.png" if os.path.exists("chart_1.png") else None,
-                    "img2": "chart_2.png" if os.path.exists("chart_2.png") else None
-                }
-                
-                session_id = str(uuid.uuid4())
-                timestamp = time.strftime("%H:%M")
-                st.session_state.history.append({
-                    "id": session_id,
-                    "timestamp": timestamp,
-                    "query": final_query,
-                    "report": report_data
-                })
-                
-                st.session_state.current_report = report_data
-                st.rerun()
-                
-            except Exception as e:
-                st.error(f"Analysis error: {str(e)}")
+            raw_report = result.get("final_report", "")
+            
+            if not raw_report:
+                status.update(label="Analysis failed", state="error")
+                st.error("Error: Unable to generate report (possible system error).")
+                st.stop()
+            
+            status.update(label="Analysis complete", state="complete", expanded=False)
+            
+            # Parse results
+            parts = raw_report.split("|||")
+            if len(parts) < 3: parts = [raw_report, "No Data", "No Data"]
+            
+            # Charts of this analysis (reused ones on follow-ups come from the checkpoint), not whatever
+            # chart_N.png an earlier run left in the workspace
+            charts = [c for c in run.result.get("viz_images", []) if os.path.exists(c)][:2]
+            charts += [None] * (2 - len(charts))
+            report_data = {
+                "p1": parts[0],
+                "p2": parts[1],
+                "p3": parts[2],
+                # Charts by content digest: the artifact store outlives the run's workspace
+                "img1": chart_digest(charts[0]) if charts[0] else None,
+                "img2": chart_digest(charts[1]) if charts[1] else None
+            }
+            
+            session_id = str(uuid.uuid4())
+            report_data["id"] = session_id  # PDF is built once per report id
+            timestamp = time.strftime("%H:%M")
+            get_history().add(st.session_state.user_id, {
+                "id": session_id,
+                "timestamp": timestamp,
+                "query": final_query,
+                "report": report_data
+            })
+            st.session_state.history_page = 0
+            
+            st.session_state.current_report = report_data
+            st.rerun()
+            
+        except RunQueueFull:
+            release_workspace(thread["workspace"])  # nothing queued on it, idle until the next question
+            status.update(label="Server busy", state="error")
+            st.error("Too many analyses are waiting right now. Please try again in a moment.")
+        except Exception as e:
+            status.update(label="Analysis failed", state="error")
+            st.error(f"Analysis error: {str(e)}")
+        finally:
+            # Session closed / script rerun while running -> free the slot
+            if run is not None and not run.done.is_set():
+                get_run_manager().cancel(run.id)
 
 # RESULTS DISPLAY SECTION
 if st.session_state.current_report:
@@ -191,15 +275,16 @@ if st.session_state.current_report:
     with st.container():
         st.markdown('<div class="report-title">1. Data Overview</div>', unsafe_allow_html=True)
         st.markdown(f'<div class="report-text">{report["p1"]}</div>', unsafe_allow_html=True)
-        if report.get("img1") and os.path.exists(report["img1"]):
-            image = Image.open(report["img1"])
-            st.image(image, caption="Analysis Chart 1", use_container_width=True)
+        # Pre-encoded web version, sent as is (PNG output: Streamlit does not decode / re-encode it)
+        chart = variant_path(report.get("img1"), "web")
+        if chart:
+            st.image(chart, caption="Analysis Chart 1", output_format="PNG", use_container_width=True)
 
         st.markdown('<div class="report-title">2. Detailed Analysis</div>', unsafe_allow_html=True)
         st.markdown(f'<div class="report-text">{report["p2"]}</div>', unsafe_allow_html=True)
-        if report.get("img2") and os.path.exists(report["img2"]):
-            image = Image.open(report["img2"])
-            st.image(image, caption="Analysis Chart 2", use_container_width=True)
+        chart = variant_path(report.get("img2"), "web")
+        if chart:
+            st.image(chart, caption="Analysis Chart 2", output_format="PNG", use_container_width=True)
 
         st.markdown('<div class="report-title">3. Insights & Recommendations</div>', unsafe_allow_html=True)
         st.markdown(f'<div class="report-text">{report["p3"]}</div>', unsafe_allow_html=True)
@@ -208,10 +293,12 @@ if st.session_state.current_report:
     st.markdown("---")
     col1, col2 = st.columns([1, 4])
     with col1:
-        pdf_bytes = create_pdf(report["p1"], report["p2"], report["p3"])
+        # Built in the background once per report (not on every rerun); the click just collects the bytes
+        pdf_args = (report["id"], report["p1"], report["p2"], report["p3"], report.get("img1"), report.get("img2"))
+        prebuild_pdf(*pdf_args)
         st.download_button(
             label="Download PDF Report",
-            data=pdf_bytes,
+            data=lambda: report_pdf(*pdf_args),
             file_name="analysis_report.pdf",
             mime="application/pdf"
         )
\ No newline at end of file
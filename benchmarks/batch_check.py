@@ -0,0 +1,68 @@
+"""Batch runner check: parallel jobs, per-file outputs, failures, resume after a crash, process mode.
+
+Run: python -m benchmarks.batch_check [jobs]
+Uses the fake LLM, so it runs offline.
+"""
+import os
+import sys
+import json
+import tempfile
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("RESULT_CACHE", "off")
+
+import numpy as np
+import pandas as pd
+from benchmarks.fakes import install_fake_llm
+from src import batch
+
+def make_inputs(folder, n):
+    rng = np.random.default_rng(0)
+    for idx in range(n):
+        rows = 200 + idx
+        pd.DataFrame({
+            "order_date": pd.date_range("2023-01-01", periods=rows, freq="D").strftime("%Y-%m-%d"),
+            "region": rng.choice(["North", "South", "East", "West"], rows),
+            "sales": rng.normal(100, 10, rows).round(2),
+        }).to_csv(os.path.join(folder, f"region_{idx:03d}.csv"), index=False)
+    # Manifest: every file plus one missing file that must fail cleanly
+    manifest = os.path.join(folder, "jobs.csv")
+    paths = sorted(f for f in os.listdir(folder) if f.endswith(".csv"))
+    pd.DataFrame({"csv_path": paths + ["missing.csv"],
+                  "query": ["Compare sales by region"] * len(paths) + [""]}).to_csv(manifest, index=False)
+    return manifest
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    install_fake_llm(latency=0.1)
+    with tempfile.TemporaryDirectory() as folder:
+        inputs = os.path.join(folder, "inputs")
+        os.makedirs(inputs)
+        manifest = make_inputs(inputs, n)
+        jobs = batch.load_jobs(manifest=manifest)
+        out = os.path.join(folder, "out")
+
+        summary = batch.run_batch(jobs, out, workers=3, llm_rps=20)
+        assert summary["jobs"] == n + 1 and summary.get("ok") == n, summary
+        assert [f["id"] for f in summary["failures"]] == [batch.job_id(os.path.join(inputs, "missing.csv"), batch.DEFAULT_QUERY)]
+        for job in jobs[:n]:
+            files = set(os.listdir(os.path.join(out, job["id"])))
+            assert {"report.md", "report.pdf", "chart_1.png", "chart_2.png"} <= files, files
+        print(f"Thread mode: {json.dumps({k: v for k, v in summary.items() if k != 'failures'})}")
+
+        # Crash simulation: the last two records never made it to disk -> only those jobs run again
+        state_path = os.path.join(out, batch.STATE_FILE)
+        with open(state_path) as f:
+            lines = f.readlines()
+        with open(state_path, "w") as f:
+            f.writelines(lines[:-2] + [lines[-2][:10]])  # plus a torn line
+        summary = batch.run_batch(jobs, out, workers=3)
+        assert summary["jobs"] == 2, summary
+        print(f"Resume: re-ran {summary['jobs']} jobs")
+
+        # Nothing left to do
+        assert batch.run_batch(jobs, out)["jobs"] == 0
+
+        summary = batch.run_batch(jobs[:n], os.path.join(folder, "out_proc"), workers=2, executor="process",
+                                  initializer=install_fake_llm)
+        assert summary.get("ok") == n, summary
+        print(f"Process mode: {json.dumps({k: v for k, v in summary.items() if k != 'failures'})}")
@@ -0,0 +1,121 @@
+"""Benchmark: chart render / encode cost and bytes sent to the browser and the PDF, old vs artifact store.
+
+Run: python -m benchmarks.bench_charts [reruns]
+Old: charts saved at 100 dpi; every rerun of app.py opens them with PIL and st.image re-encodes them,
+the PDF downscales them on export. Current: rendered once at CHART_DPI, web / thumb / print versions
+built right after rendering (src/tools/artifacts.py), st.image gets the web PNG and sends it as is.
+Bytes sent are the bytes Streamlit hands to its media file manager (what the browser downloads).
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+from streamlit.elements.lib import image_utils
+from streamlit.elements.lib.layout_utils import LayoutConfig
+
+from src.tools import artifacts, charts, pdf
+
+SPECS = [{"type": "trend", "date": "order_date", "value": "sales", "agg": "sum"},
+         {"type": "top_n", "group": "product", "value": "sales", "agg": "sum"}]
+
+def make_frame(rows=50_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "order_date": pd.date_range("2020-01-01", periods=rows, freq="h"),
+        "product": rng.choice([f"Product {i:02d}" for i in range(30)], rows),
+        "sales": rng.gamma(2.0, 120.0, rows).round(2),
+    })
+
+def old_render(spec, path, namespace):
+    """render_chart as it was: 100 dpi, no variants"""
+    fig, ax = charts._get_axes()
+    title = charts.RENDERERS[spec["type"]](ax, namespace["df"], spec, {})
+    ax.set_title(spec.get("title", title), fontsize=14, fontweight="bold")
+    fig.tight_layout()
+    fig.savefig(path, dpi=100, bbox_inches="tight")
+
+sent = []
+_ensure = image_utils._ensure_image_size_and_format
+
+def _capture(image_data, layout_config, image_format):
+    data = _ensure(image_data, layout_config, image_format)
+    sent.append(len(data))
+    return data
+
+def st_image(image, output_format="auto"):
+    """What st.image(..., use_container_width=True) does with one image, outside a running app"""
+    image_utils.image_to_url(image, LayoutConfig(width="stretch"), False, "RGB", output_format, "bench")
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    image_utils._ensure_image_size_and_format = _capture
+    with tempfile.TemporaryDirectory() as folder:
+        artifacts.ARTIFACT_DIR = os.path.join(folder, "artifacts")
+        namespace = {"df": make_frame()}
+        old_paths = [os.path.join(folder, f"old_{i}.png") for i in range(len(SPECS))]
+        new_paths = [os.path.join(folder, f"chart_{i}.png") for i in range(len(SPECS))]
+        for idx, spec in enumerate(SPECS):  # warm-up (matplotlib caches text per dpi)
+            charts.render_chart(spec, os.path.join(folder, f"warmup_{idx}.png"), namespace)
+            old_render(spec, os.path.join(folder, f"warmup_old_{idx}.png"), namespace)
+
+        # Best of 3; from the second run on the variants are found in the store (same content)
+        old_render_s = min(sum(timed(lambda: old_render(spec, path, namespace)) for spec, path in zip(SPECS, old_paths))
+                           for _ in range(3))
+        new_render_s = min(sum(timed(lambda: charts.render_chart(spec, path, namespace)) for spec, path in zip(SPECS, new_paths))
+                           for _ in range(3))
+        metas = [artifacts.chart_variants(p) for p in new_paths]
+        encode_ms = sum(m["encode_ms"] for m in metas)
+        print(f"Render (2 charts): old {old_render_s * 1000:.0f} ms at 100 dpi | new {new_render_s * 1000:.0f} ms at "
+              f"{artifacts.CHART_DPI} dpi, + {encode_ms:.0f} ms encoding web / thumb / print once per chart content")
+
+        sent.clear()
+        old_rerun_s = timed(lambda: [st_image(Image.open(p)) for p in old_paths], reruns)
+        old_bytes = sum(sent[:len(old_paths)])
+        sent.clear()
+        new_rerun_s = timed(lambda: [st_image(artifacts.chart_variant(p, "web"), "PNG") for p in new_paths], reruns)
+        new_bytes = sum(sent[:len(new_paths)])
+        print(f"Per rerun (2 charts): old {old_rerun_s * 1000:.1f} ms, {old_bytes / 1024:.0f} KB sent | "
+              f"new {new_rerun_s * 1000:.1f} ms, {new_bytes / 1024:.0f} KB sent ({old_rerun_s / new_rerun_s:.0f}x faster)")
+
+        sent.clear()
+        thumb_s = timed(lambda: [st_image(artifacts.chart_variant(p, "thumb"), "PNG") for p in new_paths], reruns)
+        print(f"History thumbnails: {sum(sent[:len(new_paths)]) / 1024:.1f} KB for 2 items, {thumb_s * 1000:.2f} ms per rerun")
+        for p, m in zip(new_paths, metas):
+            print(f"  {os.path.basename(p)}: {m['width']}x{m['height']} master {m['bytes']['png'] // 1024} KB -> "
+                  + ", ".join(f"{k} {m['bytes'][k] // 1024} KB" for k in artifacts.VARIANTS))
+
+        text = "Revenue grew steadily month over month. " * 40
+        pdf.create_pdf(text, text, text)  # font metrics loaded once per process
+        old_pdf_s = timed(lambda: pdf.create_pdf(text, text, text, *old_paths))  # old charts, print versions built here
+        old_pdf = pdf.create_pdf(text, text, text, *old_paths)
+        new_pdf_s = timed(lambda: pdf.create_pdf(text, text, text, *new_paths))  # print versions already built
+        new_pdf = pdf.create_pdf(text, text, text, *new_paths)
+        print(f"PDF: 100 dpi charts {old_pdf_s * 1000:.0f} ms (first export), {len(old_pdf) / 1024:.0f} KB | "
+              f"print versions {new_pdf_s * 1000:.0f} ms, {len(new_pdf) / 1024:.0f} KB")
+        assert new_bytes < old_bytes and new_rerun_s < old_rerun_s
+
+        # History / PDF refer to charts by digest: still resolved once the workspace file is gone
+        digest = artifacts.chart_digest(new_paths[0])
+        meta_path = artifacts._store_path(digest, "json")
+        os.utime(meta_path, (time.time() - 7200, time.time() - 7200))
+        for key, entry in artifacts._memo.items():
+            if key[0] == os.path.abspath(new_paths[0]):
+                entry[1] = 0  # memo hit due for a last-use refresh
+        artifacts.chart_variants(new_paths[0])
+        assert time.time() - os.path.getmtime(meta_path) < 60, "memo hit did not refresh the last use"
+        os.remove(artifacts._store_path(digest, "web.png"))  # evicted by another process
+        assert os.path.exists(artifacts.chart_variant(new_paths[0], "web")), "memo hit served a deleted file"
+        os.remove(new_paths[0])
+        assert artifacts.variant_path(digest, "print") and pdf.prepare_image(digest)
+        assert artifacts.variant_path(new_paths[0], "web") is None
+        print("Digest references: resolved after the workspace chart is gone, memo hits refresh / rebuild")
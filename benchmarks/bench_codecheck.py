@@ -0,0 +1,139 @@
+"""Benchmark: generated cleaning scripts run blindly vs statically checked first (src/tools/codecheck.py).
+
+Run: python -m benchmarks.bench_codecheck [rows]
+Each case is a script the LLM might write plus the corrected script a regeneration would return.
+Old: every script goes to the REPL pool as is. Current: validate, apply automatic fixes, ask for one
+regeneration when needed, and only execute code that passed. Also runs the cleaning node end to end
+with a fake LLM whose first answer references a column that does not exist.
+"""
+import os
+import sys
+import time
+import tempfile
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["RESULT_CACHE"] = "off"
+
+import numpy as np
+import pandas as pd
+
+from src.tools import codecheck
+from src.tools.pool import get_pool
+
+HEADER = "import pandas as pd\nimport matplotlib.pyplot as plt\n"
+
+def make_csv(folder, rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Order Date": pd.date_range("2020-01-01", periods=rows, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "Region": rng.choice(["North", "South", "East", "West", None], rows),
+        "Revenue": rng.normal(100, 25, rows).round(2),
+        "Units": rng.integers(1, 10, rows),
+    })
+    path = os.path.join(folder, "input.csv")
+    df.to_csv(path, index=False)
+    return path
+
+def cases(csv_path, out_path):
+    read = f"df = pd.read_csv({csv_path!r})\n"
+    save = f"df.to_csv({out_path!r}, index=False)\nprint('Cleaning Success', df.shape)\n"
+    good = HEADER + read + "df = df.dropna(subset=['Region'])\n" + save
+    return [
+        ("valid script", good, None),
+        ("column case / spacing", HEADER + read + "df = df.dropna(subset=['region'])\ndf['revenue'] = df['revenue'].fillna(0)\n" + save, None),
+        ("plt.show + re-read in loop", HEADER + read + "for col in ['Revenue', 'Units']:\n    df2 = pd.read_csv("
+         f"{csv_path!r})\n    print(col, df2[col].mean())\nplt.plot([1, 2])\nplt.show()\n" + save, None),
+        ("rename(columns=str.lower)", HEADER + read + "df = df.rename(columns=str.lower)\ndf = df.dropna(subset=['region'])\n" + save, None),
+        ("dict-comprehension rename", HEADER + read + "df = df.rename(columns={c: c.lower().replace(' ', '_') for c in df.columns})\n"
+         "df['revenue'] = df['revenue'].fillna(0)\n" + save, None),
+        ("unknown column", HEADER + read + "df = df.dropna(subset=['Profit'])\n" + save, good),
+        ("syntax error", HEADER + read + "df = df.dropna(subset=['Region']\n" + save, good),
+        ("iterrows on large file", HEADER + read + "for i, row in df.iterrows():\n    df.at[i, 'Revenue'] = max(row['Revenue'], 0)\n" + save,
+         HEADER + read + "df['Revenue'] = df['Revenue'].clip(lower=0)\n" + save),
+    ]
+
+def rename_check(columns):
+    """Names after a non-literal rename are unknown: lowercase refs must be left alone, not 'fixed'"""
+    for code in ("df = df.rename(columns=str.lower)\nprint(df['region'])",
+                 "df = df.rename(columns={c: c.lower() for c in df.columns})\nprint(df['region'])",
+                 "df = df.rename(str.lower, axis=1)\nprint(df['region'])",
+                 "df = df.set_axis([c.lower() for c in df.columns], axis=1)\nprint(df['region'])",
+                 "df = df.merge(other, on='Region')\nprint(df['region'])"):
+        check = codecheck.validate(code, columns)
+        assert check["ok"] and check["code"] == code and not check["issues"], (code, check)
+    # A literal mapping is still resolved: the new name is known, a wrong one is fixed
+    check = codecheck.validate("df = df.rename(columns={'Region': 'area'})\nprint(df['area'], df['revenue'])", columns)
+    assert [i["message"] for i in check["issues"]] == ["column 'revenue' -> 'Revenue'"], check
+
+def failed(result):
+    return result["status"] != "ok" or "Error" in result["output"]
+
+def run_old(scripts):
+    pool = get_pool()
+    runs = fails = 0
+    start = time.perf_counter()
+    for _, code, _ in scripts:
+        result = pool.run(code)
+        runs += 1
+        fails += failed(result)
+    return runs, fails, time.perf_counter() - start
+
+def run_new(scripts, columns, large):
+    pool = get_pool()
+    runs = fails = regenerations = 0
+    start = time.perf_counter()
+    for _, code, corrected in scripts:
+        check = codecheck.validate(code, columns, large)
+        codecheck.record(check, "first")
+        if not check["ok"] and corrected:
+            regenerations += 1
+            check = codecheck.validate(corrected, columns, large)
+            codecheck.record(check, "retry")
+        if not check["ok"]:
+            continue
+        result = pool.run(check["code"])
+        runs += 1
+        fails += failed(result)
+    return runs, fails, regenerations, time.perf_counter() - start
+
+def node_check(folder, csv_path):
+    """Cleaning node with a fake LLM: first answer uses a wrong column, the regeneration fixes it"""
+    from langchain_core.messages import AIMessage
+    from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+    from src.agents import prep
+    out = os.path.join(folder, "cleaned_data.csv")
+    bad = f"```python\n{HEADER}df = pd.read_csv({csv_path!r})\ndf = df.dropna(subset=['Profit'])\ndf.to_csv({out!r}, index=False)\n```"
+    fixed = bad.replace("'Profit'", "'Region'")
+    fake = FakeMessagesListChatModel(responses=[AIMessage(content=bad), AIMessage(content=fixed)])
+    prep.llm.model = fake
+    before = codecheck.stats()
+    result = prep.data_cleaning_node({"csv_file_path": csv_path, "workspace_dir": folder,
+                                      "refined_query": "Clean the data: drop rows with missing region"})
+    after = codecheck.stats()
+    assert result["cleaned_csv_path"] == out and result["cleaning_stats"]["engine"] == "llm", result
+    assert after["rejected"] - before["rejected"] == 1 and after["passed"] - before["passed"] == 1, after
+    assert pd.read_csv(out)["Region"].notna().all()
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = make_csv(folder, rows)
+        scripts = cases(csv_path, os.path.join(folder, "out.csv"))
+        columns, large = codecheck.csv_columns(csv_path), codecheck.is_large(csv_path)
+        print(f"Input: {rows} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB (large: {large})")
+        for label, code, _ in scripts:
+            check = codecheck.validate(code, columns, large)
+            print(f"  {label:<28} ok={check['ok']!s:<5} {'; '.join(i['message'] for i in check['issues'])[:90]}")
+
+        rename_check(columns)
+
+        get_pool().run("print('warm-up')")
+        old_runs, old_fails, old_s = run_old(scripts)
+        new_runs, new_fails, regenerations, new_s = run_new(scripts, columns, large)
+        print(f"Blind:   {old_runs} executions, {old_fails} failed, {old_s:.2f}s")
+        print(f"Checked: {new_runs} executions, {new_fails} failed, {regenerations} regenerations, {new_s:.2f}s")
+        print(f"Code check stats: {codecheck.stats()}")
+        assert new_fails == 0, "checked scripts should not fail"
+
+        node_check(folder, csv_path)
+        print("Cleaning node: wrong column caught before execution, regenerated once, cleaned file written")
+    get_pool().shutdown()
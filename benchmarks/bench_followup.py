@@ -0,0 +1,65 @@
+"""Benchmark: follow-up question on the same file, fresh run vs resuming the thread's checkpoint.
+
+Run: python -m benchmarks.bench_followup [llm latency seconds]
+Uses the fake LLM (with injected latency) and no result cache, so every node does real work.
+"""
+import os
+import sys
+import time
+import tempfile
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["RESULT_CACHE"] = "off"
+
+from langchain_core.messages import HumanMessage
+from benchmarks.fakes import install_fake_llm
+from benchmarks.run_manager_check import make_csv
+from src.graph import app, session_app
+from src.runs import RunManager
+
+def inputs(csv_path, workspace, query):
+    return {"messages": [HumanMessage(content=query)], "csv_file_path": csv_path, "workspace_dir": workspace}
+
+def timed_run(graph, state, config=None):
+    ran = []
+    start = time.perf_counter()
+    for update in graph.stream(state, config, stream_mode="updates"):
+        ran += list(update)
+    return time.perf_counter() - start, ran, graph.get_state(config).values if config else None
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    install_fake_llm(latency=latency)
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = make_csv(folder, rows=5000)
+        first, follow_up = "Perform general data analysis.", "Which region has the highest sales?"
+        thread = {"configurable": {"thread_id": "bench"}}
+
+        first_s, ran, _ = timed_run(session_app, inputs(csv_path, folder, first), thread)
+        fresh_s, fresh_ran, _ = timed_run(app, inputs(csv_path, folder, follow_up))
+        resume_s, resume_ran, state = timed_run(session_app, inputs(csv_path, folder, follow_up), thread)
+
+        assert resume_ran == ["rewriter", "report"], resume_ran
+        assert state["refined_query"] == follow_up and state["final_report"] and state["viz_images"]
+        # Per-run metrics: the earlier turn's nodes are not reported again
+        assert sorted(state["node_timings"]) == sorted(resume_ran), sorted(state["node_timings"])
+        print(f"First question:          {first_s:6.2f}s  ({' '.join(ran)})")
+        print(f"Follow-up, fresh run:    {fresh_s:6.2f}s  ({' '.join(fresh_ran)})")
+        print(f"Follow-up, resumed:      {resume_s:6.2f}s  ({' '.join(resume_ran)}) -> {fresh_s / resume_s:.1f}x faster")
+
+        # New cleaning instructions invalidate the reused analysis
+        _, ran, state = timed_run(session_app, inputs(csv_path, folder, "Remove duplicates and analyze sales"), thread)
+        assert "cleaner" in ran and "eda" in ran, ran
+        assert sorted(state["node_timings"]) == sorted(ran), sorted(state["node_timings"])
+        assert len(state["viz_images"]) == len(set(state["viz_images"])), state["viz_images"]
+        print(f"Follow-up with cleaning instructions re-runs the pipeline: {' '.join(ran)}")
+
+        # Through the run manager (as the UI does): a follow-up's result carries the reused charts from
+        # the checkpoint, so the history entry refers to this analysis' charts
+        manager = RunManager(session_graph=session_app)
+        runs = []
+        for query in (first, follow_up):
+            runs.append(manager.submit("bench", inputs(csv_path, folder, query), thread_id="bench-manager"))
+            assert runs[-1].wait(timeout=120) and runs[-1].status == "done", runs[-1].error
+        assert runs[1].result["viz_images"] == session_app.get_state({"configurable": {"thread_id": "bench-manager"}}).values["viz_images"]
+        assert runs[1].result["viz_images"] == runs[0].result["viz_images"], runs[1].result["viz_images"]
+        print(f"Follow-up result through the run manager keeps the thread's charts: {len(runs[1].result['viz_images'])}")
@@ -0,0 +1,108 @@
+"""Benchmark: cold-start import time (python -X importtime) with a budget check.
+
+Run: python -m benchmarks.bench_import [--repeat 3] [--budget ui=300,graph=2000] [--top 8]
+Each target is imported in a fresh interpreter; the total is the sum of the per-module times
+reported by -X importtime, interpreter startup excluded (best of --repeat). Exits 1 when a target
+is over its budget (ms) or imports a library it must not load at import time.
+
+Targets:
+- ui: what app.py imports before the first render (streamlit itself excluded)
+- graph: src.graph (agents, LangGraph, pandas), compiled on first use
+Also times warm_up() (graph compile, OpenAI client import, REPL workers ready) in a fresh process.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = {
+    "ui": "src.runs, src.tools.pdf, src.tools.uploads, src.tools.history, src.tools.artifacts, src.tools.workspace",
+    "graph": "src.graph",
+}
+BUDGETS_MS = {"ui": 300, "graph": 2000}
+# Loaded later (first use, warm-up or the REPL workers), never at import
+FORBIDDEN = {
+    "ui": ["pandas", "langgraph", "langchain_openai", "matplotlib", "PIL", "fpdf"],
+    "graph": ["langchain_openai", "openai", "matplotlib", "seaborn", "sklearn", "scipy", "PIL", "fpdf"],
+}
+
+def importtime(statement):
+    """{module: self us} of the modules a statement imports in a fresh interpreter (startup excluded)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                          capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            own, _, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(own)
+    return times
+
+def measure(modules, startup):
+    """({module: self us}, total ms) of `import modules`"""
+    times = {name: us for name, us in importtime(f"import {modules}").items() if name not in startup}
+    return times, sum(times.values()) / 1000
+
+def warm_up_probe():
+    """Runs in the child process started by warm_up_seconds()"""
+    os.environ["APP_WARMUP"] = "on"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    start = time.perf_counter()
+    from src import runs
+    runs.warm_up(background=False)
+    print(round(time.perf_counter() - start, 2))
+
+def warm_up_seconds():
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_import", "--warm-up-probe"], cwd=ROOT,
+                          capture_output=True, text=True)
+    return float(proc.stdout.strip().splitlines()[-1]) if proc.returncode == 0 else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time budget check")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", default="", help="overrides, e.g. ui=300,graph=2000 (ms)")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports listed per target")
+    parser.add_argument("--no-warm-up", action="store_true")
+    parser.add_argument("--warm-up-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.warm_up_probe:
+        warm_up_probe()
+        return 0
+    budgets = dict(BUDGETS_MS)
+    for item in filter(None, args.budget.split(",")):
+        name, value = item.split("=")
+        budgets[name] = float(value)
+
+    failures = []
+    startup = set(importtime("pass"))  # site, encodings... imported by every interpreter
+    for target, modules in TARGETS.items():
+        runs = [measure(modules, startup) for _ in range(args.repeat)]
+        times, total = min(runs, key=lambda r: r[1])
+        status = "ok" if total <= budgets[target] else "OVER BUDGET"
+        print(f"{target}: {total:.0f} ms (budget {budgets[target]:.0f} ms) {status}  [{modules}]")
+        if total > budgets[target]:
+            failures.append(f"{target} import {total:.0f} ms > {budgets[target]:.0f} ms")
+        # Import time per top-level package, slowest first
+        packages = {}
+        for name, us in times.items():
+            root = name.split(".")[0]
+            packages[root] = packages.get(root, 0) + us
+        for name, us in sorted(packages.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"    {name:<24}{us / 1000:>8.0f} ms")
+        loaded = [m for m in FORBIDDEN[target] if m in times]
+        if loaded:
+            failures.append(f"{target} imports {', '.join(loaded)} at import time")
+
+    if not args.no_warm_up:
+        seconds = warm_up_seconds()
+        print(f"warm_up(): {seconds if seconds is not None else 'failed'} s (graph compiled, OpenAI client imported, REPL workers ready)")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
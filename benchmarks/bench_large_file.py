@@ -0,0 +1,92 @@
+"""Benchmark: peak RSS of in-memory vs streaming (large-file mode) cleaning and profiling as the CSV grows.
+
+Run: python -m benchmarks.bench_large_file [rows ...]
+Each measurement runs in a fresh process so ru_maxrss is not polluted by earlier runs.
+Modes: in-memory cleaning; streaming cleaning with the row hashes de-duplicated in memory (8 bytes per
+unique row, grows with the file) and on disk (LARGE_FILE_DEDUP_MB set to a quarter of the hashes); profiling of the
+streamed output (sample load, key columns, stream_aggregates over the full Feather file, profile).
+"""
+import os
+import sys
+import time
+import tempfile
+import resource
+import queue as queue_module
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+TIMEOUT = 1800  # seconds per measurement
+
+def make_csv(path, rows, chunk=200_000):
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        df = pd.DataFrame({
+            "order_id": np.arange(start, start + n),
+            "order_date": (pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1000, n), unit="D")).strftime("%Y-%m-%d"),
+            "region": rng.choice(["North", "South", "East", "West"], n),
+            "product": rng.choice([f"P{i}" for i in range(200)], n),
+            "sales": np.where(rng.random(n) < 0.02, np.nan, rng.random(n) * 500).round(2),
+        })
+        df.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+def measure(mode, csv_path, rows, out_dir, queue):
+    from src.tools import cleaning, largefile
+    start = time.perf_counter()
+    base = os.path.join(out_dir, "streamed")
+    if mode.startswith("streaming"):
+        if mode == "streaming-disk":
+            # Budget for a quarter of the row hashes: the file is always too big for the in-memory set
+            largefile.DEDUP_MEMORY_MB = rows * 8 / 4 / 1024 / 1024
+        stats = largefile.stream_clean(csv_path, base + ".feather", base + ".sample.feather",
+                                       cleaning.NUMERIC_COERCE_THRESHOLD, cleaning.CATEGORICAL_FILL)
+        rows = stats["rows_after"]
+        assert stats["dedup"] == ("disk" if mode == "streaming-disk" else "memory"), stats["dedup"]
+    elif mode == "profiling":
+        # What profiling_node does on a large file, after the streaming cleaner
+        from src.tools import datastore
+        from src.tools.profiling import detect_key_columns, build_profile
+        sample = datastore.load(base + ".sample.feather")
+        hints = detect_key_columns(sample)
+        frames = largefile.stream_aggregates(base + ".feather", hints["date_col"], hints["target_col"], hints["group_col"])
+        build_profile(sample, hints, aggregates=frames)
+        rows = int(frames["agg_by_month"][hints["target_col"]].count()) if "agg_by_month" in frames else 0
+    else:
+        df, stats = cleaning.clean_dataframe(pd.read_csv(csv_path))
+        df.to_feather(os.path.join(out_dir, "in_memory.feather"), compression="uncompressed")
+        rows = len(df)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    queue.put((rows, time.perf_counter() - start, peak_mb))
+
+def run(mode, csv_path, rows, out_dir):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(mode, csv_path, rows, out_dir, queue))
+    proc.start()
+    # The result is a small tuple, so the child can exit before it is read
+    proc.join(TIMEOUT)
+    if proc.is_alive():
+        proc.terminate()
+        raise RuntimeError(f"{mode} on {rows} rows did not finish in {TIMEOUT}s")
+    if proc.exitcode != 0:
+        raise RuntimeError(f"{mode} on {rows} rows failed (exit code {proc.exitcode})")
+    try:
+        return queue.get(timeout=10)
+    except queue_module.Empty:
+        raise RuntimeError(f"{mode} on {rows} rows returned no result")
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [100_000, 400_000, 1_600_000]
+    print(f"{'rows':>10} {'file MB':>8} | {'mode':>14} {'seconds':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in sizes:
+            csv_path = os.path.join(folder, f"data_{rows}.csv")
+            make_csv(csv_path, rows)
+            size_mb = os.path.getsize(csv_path) / 1024 / 1024
+            kept = {}
+            for mode in ("in-memory", "streaming", "streaming-disk", "profiling"):
+                kept[mode], seconds, peak = run(mode, csv_path, rows, folder)
+                print(f"{rows:>10} {size_mb:>8.1f} | {mode:>14} {seconds:>8.2f} {peak:>12.0f}")
+            assert kept["streaming"] == kept["streaming-disk"] == kept["in-memory"], kept
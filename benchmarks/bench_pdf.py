@@ -0,0 +1,86 @@
+"""Benchmark: PDF report build time and size, old create_pdf vs the current one.
+
+Run: python -m benchmarks.bench_pdf [chart dpi]
+Old: add_font per document, full-size RGBA chart PNGs embedded as is. Current: font metrics and
+glyph lookups reused, charts flattened / downscaled / palette-encoded once, PDF memoized per report.
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from fpdf import FPDF
+
+from src.tools import pdf
+
+TEXT = ("Doanh thu tăng trưởng ổn định qua các tháng; khu vực North dẫn đầu với 28% tổng doanh số. "
+        "Revenue grew steadily month over month, the North region leads with 28% of total sales. ") * 12
+
+def make_charts(folder, dpi):
+    rng = np.random.default_rng(0)
+    paths = []
+    for idx in (1, 2):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if idx == 1:
+            ax.plot(np.cumsum(rng.normal(1, 3, 36)), marker="o")
+        else:
+            ax.bar([f"Product {i}" for i in range(10)], rng.integers(50, 500, 10))
+            ax.tick_params(axis="x", rotation=45)
+        ax.set_title(f"Chart {idx}")
+        fig.tight_layout()
+        path = os.path.join(folder, f"chart_{idx}.png")
+        fig.savefig(path, dpi=dpi)
+        plt.close(fig)
+        paths.append(path)
+    return paths
+
+def old_create_pdf(p1, p2, p3, img1=None, img2=None):
+    """create_pdf as it was in app.py"""
+    doc = FPDF()
+    doc.add_page()
+    doc.add_font('DejaVu', '', pdf.FONT_PATH, uni=True)
+    doc.fonts['dejavu']['ttffile'] = pdf.FONT_PATH  # the shipped .pkl has a cwd-relative path
+    doc.set_font('DejaVu', '', 14)
+    doc.cell(200, 10, txt="DATA ANALYSIS REPORT", ln=1, align='C')
+    doc.ln(10)
+    for title, body, img in (("1. Trends & Overview", p1, img1), ("2. Detailed Analysis", p2, img2),
+                             ("3. Insights & Recommendations", p3, None)):
+        doc.set_font('DejaVu', '', 14)
+        doc.cell(200, 10, txt=title, ln=1)
+        doc.set_font('DejaVu', '', 11)
+        doc.multi_cell(0, 8, txt=body)
+        doc.ln(5)
+        if img:
+            doc.image(img, x=10, w=170)
+            doc.ln(5)
+    return doc.output(dest='S').encode('latin-1')
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    dpi = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as folder:
+        img1, img2 = make_charts(folder, dpi)
+        sizes = [os.path.getsize(p) for p in (img1, img2)]
+        print(f"Charts: {dpi} dpi, {sizes[0] // 1024} KB + {sizes[1] // 1024} KB (RGBA PNG)")
+        args = (TEXT, TEXT, TEXT, img1, img2)
+
+        old_s, old_bytes = timed(old_create_pdf, *args)
+        cold_s, new_bytes = timed(pdf.create_pdf, *args)   # includes preparing the charts
+        warm_s, _ = timed(pdf.create_pdf, *args)           # prepared charts reused
+        first_s, _ = timed(pdf.report_pdf, "bench", *args)  # background build, waited for
+        memo_s, memo_bytes = timed(pdf.report_pdf, "bench", *args)
+        assert new_bytes.startswith(b"%PDF") and len(memo_bytes) == len(new_bytes)
+
+        print(f"{'old create_pdf':>28}: {old_s * 1000:7.1f} ms  {len(old_bytes) / 1024:6.1f} KB")
+        print(f"{'create_pdf (first build)':>28}: {cold_s * 1000:7.1f} ms  {len(new_bytes) / 1024:6.1f} KB")
+        print(f"{'create_pdf (charts prepared)':>28}: {warm_s * 1000:7.1f} ms  ({old_s / warm_s:.0f}x faster)")
+        print(f"{'report_pdf (background build)':>28}: {first_s * 1000:7.1f} ms")
+        print(f"{'report_pdf (memoized rerun)':>28}: {memo_s * 1000:7.3f} ms")
@@ -0,0 +1,188 @@
+"""Benchmark: prompt size and time-to-first-token of the EDA and report prompts, old layout vs compacted.
+
+Run: python -m benchmarks.bench_prompts
+Old: request and full EDA text / data profile in the middle of one system prompt. Current:
+src/tools/prompts.py (static instructions first, variable data last, compacted to a token budget).
+Time to first token is measured through the gateway against benchmarks/mock_openai.py with a
+prefill cost per prompt token.
+"""
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.mock_openai import MockOpenAI
+server = MockOpenAI(prefill_per_1k=0.05).start()  # before any model is built
+os.environ["RESULT_CACHE"] = "off"
+
+from langchain_core.messages import SystemMessage
+from src import llm
+from src.agents import analysis, reporting
+from src.tools.prompts import count_tokens, _encoding
+from src.tools.profiling import detect_key_columns, build_profile
+
+def wide_frame(rows=5000, numeric=60, text=20):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "order_date": pd.date_range("2019-01-01", periods=rows, freq="6h").strftime("%Y-%m-%d"),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "revenue": rng.gamma(2, 150, rows).round(2),
+    })
+    for i in range(numeric):
+        df[f"metric_{i}"] = rng.normal(i, 1 + i / 10, rows).round(3)
+    for i in range(text):
+        df[f"attr_{i}"] = rng.choice([f"value_{k}" for k in range(30)], rows)
+    return df
+
+def raw_stdout(df):
+    """What an EDA fallback to raw REPL output looks like: describe tables, per-column loops, warnings"""
+    lines = [df.describe(include="all").T.to_string()]
+    for col in df.columns:
+        lines.append(f"Processing column {col}...")
+        lines.append("FutureWarning: use_inf_as_na option is deprecated and will be removed in a future version.")
+        lines.append(df[col].value_counts().head(15).to_string())
+    lines.append(df.groupby("region")["revenue"].agg(["sum", "mean", "count"]).to_string())
+    return "\n".join(lines)
+
+def old_eda_prompt(state, profile):
+    """analysis._eda_prompt as it was"""
+    return f"""You are a Senior Data Analyst with 10+ years of experience in business intelligence.
+    User request: "{state.get('refined_query', '')}" (If empty, perform general analysis).
+    
+    DATA PROFILE (computed exactly from the dataset, JSON):
+    {json.dumps(profile, separators=(",", ":"), default=str)}
+    
+    Notes: "key_columns" are the detected date / target / group columns ("None" = not available).
+    "target_by_group" and "target_trend" break down the target column. If "sampled_rows" is set,
+    quantiles and outlier counts come from a uniform sample, everything else covers all rows.
+    
+    MISSION: Write a factual EDA summary (plain text, no code, no headers):
+    1. Dataset shape, column types and data quality (missing values, outliers).
+    2. Descriptive statistics of the target, and per group if available.
+    3. Time range and trend of the target if a date column exists.
+    4. Notable correlations.
+    Cite the exact numbers from the profile. NEVER invent values that are not in the profile.
+    """
+
+def old_section_prompts(state):
+    """reporting._section_prompts as it was: request + EDA inside the shared instructions, EDA uncompacted"""
+    eda = state.get("eda_report", "")
+    query = state.get("refined_query", "")
+    
+    # Base system prompt - adapts like a 10-year experienced data analyst
+    base_instruction = f"""
+    YOU ARE A SENIOR DATA ANALYST WITH 10+ YEARS OF EXPERIENCE.
+    
+    INPUT:
+    - User Request: "{query}" (If empty, perform general analysis).
+    - EDA Results: {eda}
+    
+    CRITICAL RULES - MUST FOLLOW:
+    1. **ONLY USE ACTUAL DATA**: Never fabricate, assume, or guess numbers/statistics
+    2. **CITE SPECIFIC VALUES**: Reference exact figures from EDA results
+    3. **BE HONEST**: If data is insufficient, clearly state limitations
+    4. **NO SPECULATION**: Don't make up trends, patterns, or insights not visible in data
+    
+    CORE PRINCIPLES:
+    1. **Adapt to Data Context:**
+       - Sales data -> Use business language and actual KPIs from data.
+       - Healthcare data -> Use medical terminology with real statistics.
+       - Simple data -> Focus on what's actually present, DON'T fabricate strategies.
+       
+    2. **Flexible Length:**
+       - General question -> Write concise, fact-based summary with real numbers.
+       - Detailed question -> Provide in-depth analysis citing specific data points.
+       
+    3. **No Redundant Headers:**
+       - DO NOT write "Part 1", "## Overview". Only write content paragraphs.
+       
+    4. **Evidence-Based Writing:**
+       - Every claim must be supported by actual data from EDA
+       - Use phrases like "Based on the data...", "The analysis shows..."
+       - If uncertain, say "The available data suggests..." or "Based on limited information..."
+    """
+    
+    # Section 1: Overview
+    prompt_p1 = f"""{base_instruction}
+    Write SECTION 1 (Overview):
+    - What does this dataset ACTUALLY contain? (Use real column names and data types)
+    - EXACT data scale (state precise row and column counts from EDA)
+    - ACTUAL data quality issues (missing values, outliers - cite specific percentages)
+    - Keep objective tone, report ONLY what's in the data
+    
+    REMEMBER: Every statement must be verifiable from the EDA results above.
+    """
+    
+    # Section 2: Detailed Analysis
+    prompt_p2 = f"""{base_instruction}
+    Write SECTION 2 (Detailed Analysis):
+    - Report ACTUAL findings from the data (cite specific numbers, percentages, values)
+    - Describe REAL distribution patterns with concrete examples
+    - If data shows trends, state them with supporting numbers
+    - If data is minimal (< 5 rows), describe what's actually there without extrapolation
+    
+    FORBIDDEN: Making up statistics, inventing trends, or stating conclusions not supported by data.
+    REQUIRED: Every insight must reference actual values from the EDA.
+    """
+    
+    # Section 3: Insights & Actions
+    prompt_p3 = f"""{base_instruction}
+    Write SECTION 3 (Insights & Recommendations):
+    - If data reveals clear patterns -> State them with supporting evidence from EDA
+    - Provide recommendations ONLY if they logically follow from the actual data
+    - If data is limited/unclear -> State: "Based on the available data, [specific limitation]. More data needed for [specific aspect]."
+    - If data is trivial -> State honestly: "This dataset contains basic information only and lacks sufficient depth for strategic recommendations."
+    
+    CRITICAL: 
+    - Don't recommend actions unsupported by the data
+    - Don't make bold claims without numerical evidence
+    - Be transparent about data limitations
+    - If you're uncertain, say so clearly
+    """
+    
+    return [prompt_p1, prompt_p2, prompt_p3]
+
+def tokens(messages):
+    return sum(count_tokens(m.content) for m in messages)
+
+def ttft(messages):
+    """Seconds to the first streamed token through the gateway's model"""
+    start = time.perf_counter()
+    for chunk in llm.get_llm("gpt-4o-mini").model.stream(messages):
+        if chunk.content:
+            return time.perf_counter() - start
+    return time.perf_counter() - start
+
+def compare(label, old, new):
+    old_tokens, new_tokens = sum(map(tokens, old)), sum(map(tokens, new))
+    old_s, new_s = sum(map(ttft, old)), sum(map(ttft, new))
+    print(f"{label:<34} tokens {old_tokens:>7} -> {new_tokens:>6} ({1 - new_tokens / old_tokens:>4.0%} less)   "
+          f"TTFT {old_s:.2f}s -> {new_s:.2f}s")
+    return new_tokens <= old_tokens
+
+if __name__ == "__main__":
+    df = wide_frame()
+    hints = detect_key_columns(df)
+    profile = build_profile(df, hints)
+    state = {"refined_query": "Analyse revenue by region and over time", "data_profile": profile}
+
+    print(f"Dataset: {df.shape[1]} columns; tokens counted with {'tiktoken' if _encoding() else '~4 characters per token'}")
+    ttft([SystemMessage(content="warm-up")])  # model construction + connection setup
+    ok = compare("EDA prompt (wide profile)", [[SystemMessage(content=old_eda_prompt(state, profile))]],
+                 [analysis._eda_messages(state, profile)])
+
+    narrative = ("The dataset has 5000 rows and 83 columns. Revenue averages 300.5 with a standard deviation of 212.4; "
+                 "the North region leads with 26% of total revenue. Monthly revenue peaked in 2020-03. ") * 6
+    for label, eda in (("Report prompts (EDA narrative)", narrative), ("Report prompts (raw stdout EDA)", raw_stdout(df))):
+        report_state = {**state, "eda_report": eda}
+        old = [[SystemMessage(content=p)] for p in old_section_prompts(report_state)]
+        ok &= compare(label, old, reporting._section_prompts(report_state))
+
+    # Shared prefix of the three section prompts (what a provider-side prefix cache can reuse)
+    new = reporting._section_prompts({**state, "eda_report": narrative})
+    shared = os.path.commonprefix(["\n".join(m.content for m in p) for p in new])
+    print(f"Section prompts share a {count_tokens(shared)}-token prefix (static instructions + request + EDA)")
+    server.stop()
+    assert ok, "compacted prompts should never be larger"
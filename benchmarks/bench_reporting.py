@@ -0,0 +1,51 @@
+"""Benchmark: sequential vs concurrent report section generation with a fake, latency-injected LLM.
+
+Run: python -m benchmarks.bench_reporting
+"""
+import os
+import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["RESULT_CACHE"] = "off"  # measure real generation, not cache hits
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import SystemMessage
+from src.agents import reporting
+
+LATENCY = 0.5  # seconds per LLM round trip
+
+def fake_llm():
+    return FakeListChatModel(responses=["Section text based on the data."], sleep=LATENCY)
+
+def run_sequential():
+    # Old behaviour: three invoke calls back to back
+    llm = fake_llm()
+    start = time.perf_counter()
+    for _ in range(3):
+        llm.invoke([SystemMessage(content="prompt")])
+    return time.perf_counter() - start
+
+def run_concurrent(state):
+    reporting.llm = fake_llm()
+    start = time.perf_counter()
+    result = reporting.reporting_node(state)
+    elapsed = time.perf_counter() - start
+    assert result["final_report"].count("|||") == 2
+    return elapsed
+
+def run_with_timeout():
+    # One slow section must not hold the report hostage
+    reporting.llm = FakeListChatModel(responses=["ok"], sleep=LATENCY * 4)
+    start = time.perf_counter()
+    res = reporting.generate_sections([[SystemMessage(content=p)] for p in "abc"], timeout=LATENCY)
+    return time.perf_counter() - start, res
+
+if __name__ == "__main__":
+    state = {"eda_report": "rows: 100, columns: 5", "refined_query": "General analysis"}
+    seq = run_sequential()
+    conc = run_concurrent(state)
+    print(f"Sequential: {seq:.2f}s")
+    print(f"Concurrent: {conc:.2f}s")
+    print(f"Speedup:    {seq / conc:.2f}x")
+
+    elapsed, sections = run_with_timeout()
+    print(f"Timeout fallback: {elapsed:.2f}s, sections={[s[:30] for s in sections]}")
@@ -0,0 +1,89 @@
+"""Benchmark: full-column type probing vs sample-based type inference on wide synthetic frames.
+
+Run: python -m benchmarks.bench_type_inference [rows] [column groups]
+"Probing" is what the pipeline used to do: pd.to_numeric on every text column, and
+pd.to_datetime(errors='raise') / format="mixed" on every candidate date column.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.tools import typeinfer
+from src.tools.cleaning import NUMERIC_COERCE_THRESHOLD
+
+DATE_STYLES = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y %H:%M", "%b %d, %Y"]
+
+def make_frame(rows, groups):
+    """Each group adds 10 string columns: categories, free text, ids, numbers-as-text and dates"""
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")
+    columns = {}
+    for g in range(groups):
+        for c in range(4):
+            columns[f"category_{g}_{c}"] = rng.choice([f"cat {i}" for i in range(30)], rows)
+        columns[f"comment_{g}"] = rng.choice(["ok", "late delivery", "n/a", "great", "refund asked"], rows)
+        columns[f"customer_code_{g}"] = pd.Series(rng.integers(0, 10**9, rows)).map("C{:09d}".format).to_numpy()
+        columns[f"amount_{g}"] = rng.normal(100, 30, rows).round(2).astype(str)
+        columns[f"units_{g}"] = rng.integers(1, 20, rows).astype(str)
+        columns[f"date_{g}"] = dates.strftime(DATE_STYLES[g % len(DATE_STYLES)])
+        columns[f"label_{g}"] = rng.choice(["A1", "B2", "C3"], rows)
+    return pd.DataFrame(columns)
+
+def probe_types(df):
+    """Old approach: full-column conversions used as type tests"""
+    numeric, dates = {}, {}
+    for col in df.columns:
+        values = pd.to_numeric(df[col], errors="coerce")
+        if values.isna().mean() < NUMERIC_COERCE_THRESHOLD:
+            numeric[col] = values
+            continue
+        try:
+            dates[col] = pd.to_datetime(df[col], errors="raise", format="mixed")
+        except (ValueError, TypeError):
+            pass
+    return numeric, dates
+
+def infer_types(df):
+    """New approach: decide on a bounded sample, convert each column once with an explicit format"""
+    numeric, dates = {}, {}
+    for col in df.columns:
+        values = typeinfer.coerce_numeric(df[col], NUMERIC_COERCE_THRESHOLD)
+        if values is not None:
+            numeric[col] = values
+            continue
+        fmt = typeinfer.detect_date_format(df[col])
+        if fmt:
+            dates[col] = typeinfer.parse_dates(df[col], fmt)
+    return numeric, dates
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    groups = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    df = make_frame(rows, groups)
+    print(f"Frame: {rows} rows x {df.shape[1]} string columns")
+
+    probe_s, (probe_num, probe_dates) = timed(probe_types, df)
+    infer_s, (infer_num, infer_dates) = timed(infer_types, df)
+
+    # Same decisions; date values checked against the format they were generated with
+    assert sorted(probe_num) == sorted(infer_num), (sorted(probe_num), sorted(infer_num))
+    assert sorted(probe_dates) == sorted(infer_dates), (sorted(probe_dates), sorted(infer_dates))
+    wrong = {"probe": 0, "infer": 0}
+    for g in range(groups):
+        col = f"date_{g}"
+        truth = pd.to_datetime(df[col], format=DATE_STYLES[g % len(DATE_STYLES)])
+        wrong["probe"] += int((probe_dates[col] != truth).sum())
+        wrong["infer"] += int((infer_dates[col] != truth).sum())
+    assert wrong["infer"] == 0, f"{wrong['infer']} dates parsed wrong"
+
+    print(f"{'full-column probing':>22}: {probe_s:7.2f}s  ({wrong['probe']} dates parsed wrong)")
+    print(f"{'sample-based inference':>22}: {infer_s:7.2f}s  ({probe_s / infer_s:.1f}x faster, {wrong['infer']} wrong)")
+    print(f"numeric: {len(infer_num)} columns, dates: {len(infer_dates)} columns "
+          f"({', '.join(f'{c}={typeinfer.detect_date_format(df[c])}' for c in infer_dates)})")
@@ -0,0 +1,82 @@
+"""Benchmark: upload preview / save time and peak memory, full read_csv vs bounded preview, plus history store.
+
+Run: python -m benchmarks.bench_upload [rows]
+Old: pd.read_csv of the whole upload for .head() and the row count, buffer written in one piece,
+history as a growing list in session_state. Current: src/tools/uploads.py + src/tools/history.py.
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.tools import uploads
+from src.tools.history import HistoryStore
+
+def make_upload(rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=rows, freq="min").astype(str),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "product": rng.choice([f"Product {i}" for i in range(50)], rows),
+        "revenue": rng.normal(100, 30, rows).round(2),
+        "units": rng.integers(1, 20, rows),
+    })
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+def old_preview(f):
+    f.seek(0)
+    df = pd.read_csv(f)
+    return df.head(), df.shape[0]
+
+def new_preview(f):
+    return uploads.read_preview(f), uploads.count_rows(f)
+
+def main(rows=1_000_000):
+    f = make_upload(rows)
+    print(f"Upload: {rows} rows, {len(f.getbuffer()) / 1e6:.1f} MB")
+
+    (old_head, old_rows), old_s, old_mb = measure(lambda: old_preview(f))
+    (new_head, new_rows), new_s, new_mb = measure(lambda: new_preview(f))
+    assert old_rows == new_rows, (old_rows, new_rows)
+    assert old_head.equals(new_head)
+    print(f"Preview  old: {old_s:.2f}s peak {old_mb:.0f} MB | new: {new_s:.3f}s peak {new_mb:.1f} MB "
+          f"({old_s / new_s:.0f}x faster)")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "uploaded_data.csv")
+        _, save_s, save_mb = measure(lambda: uploads.save_upload(f, path))
+        assert os.path.getsize(path) == len(f.getbuffer())
+        print(f"Save (chunked): {save_s:.2f}s peak {save_mb:.1f} MB")
+
+        store = HistoryStore(os.path.join(folder, "history.sqlite"), max_per_user=50, ttl_hours=1)
+        report = {"p1": "x" * 4000, "p2": "y" * 4000, "p3": "z" * 4000, "img1": None, "img2": None}
+        start = time.perf_counter()
+        for idx in range(200):
+            store.add("user-a", {"id": f"r{idx}", "timestamp": "10:00", "query": f"question {idx}", "report": {**report, "id": f"r{idx}"}})
+        add_ms = (time.perf_counter() - start) / 200 * 1000
+        items, total = store.page("user-a", 0, 10)
+        assert total == 50 and items[0]["id"] == "r199", (total, items[0])
+        assert store.get("user-a", "r0") is None and store.get("user-a", "r199")["p1"] == report["p1"]
+        assert store.page("user-b")[1] == 0
+        start = time.perf_counter()
+        for page in range(5):
+            store.page("user-a", page, 10)
+        page_ms = (time.perf_counter() - start) / 5 * 1000
+        print(f"History: {add_ms:.1f} ms per add, {page_ms:.1f} ms per page, {total} kept of 200 (cap 50)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
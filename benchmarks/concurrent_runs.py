@@ -0,0 +1,58 @@
+"""Concurrency check: N graph runs in parallel must keep their data and charts isolated.
+
+Run: python -m benchmarks.concurrent_runs [N]
+"""
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import numpy as np
+import pandas as pd
+from langchain_core.messages import HumanMessage
+from benchmarks.fakes import install_fake_llm
+from src.graph import app as agent_graph
+from src.tools.pool import get_pool
+
+def make_csv(folder, run_idx, rows=200):
+    # Each run gets a unique column name and row count so leaks are detectable
+    rng = np.random.default_rng(run_idx)
+    df = pd.DataFrame({
+        "region": rng.choice(["North", "South", "East", "West"], rows + run_idx),
+        f"sales_{run_idx}": rng.normal(100 * (run_idx + 1), 10, rows + run_idx).round(2),
+    })
+    path = os.path.join(folder, f"input_{run_idx}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+def run_one(csv_path):
+    inputs = {"messages": [HumanMessage(content="Perform general data analysis.")], "csv_file_path": csv_path, "use_cache": False}
+    return agent_graph.invoke(inputs)
+
+def check_isolation(results, n):
+    workspaces = [r["workspace_dir"] for r in results]
+    assert len(set(workspaces)) == n, "runs shared a workspace"
+    for idx, r in enumerate(results):
+        ws = r["workspace_dir"]
+        # Cleaned data lives in the content-addressed dataset store, shared only by identical uploads
+        cleaned = pd.read_feather(r["dataset_path"])
+        assert f"sales_{idx}" in cleaned.columns, f"run {idx} read another run's data"
+        assert r["viz_images"], f"run {idx} produced no charts"
+        for img in r["viz_images"]:
+            assert os.path.dirname(img) == ws, f"run {idx} chart outside its workspace: {img}"
+        assert f"sales_{idx}" in r["eda_report"], f"run {idx} EDA used another run's data"
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    install_fake_llm(latency=0.05)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = [make_csv(folder, i) for i in range(n)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            results = list(pool.map(run_one, paths))
+        elapsed = time.perf_counter() - start
+    check_isolation(results, n)
+    print(f"{n} concurrent runs isolated OK in {elapsed:.2f}s")
+    print(f"REPL pool: {get_pool().metrics()}")
@@ -0,0 +1,93 @@
+"""Synthetic CSVs for the benchmark suite, generated chunk by chunk (bounded memory) and cached on disk.
+
+    path = dataset("narrow", 1_000_000)            # -> $BENCH_DATA_DIR/narrow-1000000.csv
+
+Shapes:
+- narrow: date, region, product, sales, units (typical sales export)
+- wide: date + group + 120 numeric + 30 text columns
+- high_cardinality: customer / sku / city ids with up to millions of distinct values
+- date_heavy: four date columns in different formats plus a value and a category
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+BENCH_DATA_DIR = os.getenv("BENCH_DATA_DIR", os.path.join(tempfile.gettempdir(), "data_analyst_bench_data"))
+SHAPES = ["narrow", "wide", "high_cardinality", "date_heavy"]
+CHUNK_ROWS = 500_000
+MAX_CELLS = 1.5e8  # rows x columns above this are skipped (10M-row wide files would be ~15 GB)
+COLUMNS = {"narrow": 5, "wide": 152, "high_cardinality": 6, "date_heavy": 7}
+
+def _narrow(rng, start, n, total):
+    idx = np.arange(start, start + n)
+    return pd.DataFrame({
+        "order_date": (pd.Timestamp("2015-01-01") + pd.to_timedelta(idx * 3650 // max(total, 1), unit="D")).strftime("%Y-%m-%d"),
+        "region": rng.choice(["North", "South", "East", "West"], n),
+        "product": rng.choice([f"Product {i:02d}" for i in range(50)], n),
+        "sales": rng.gamma(2.0, 120.0, n).round(2),
+        "units": rng.integers(1, 20, n),
+    })
+
+def _wide(rng, start, n, total):
+    frame = {
+        "date": (pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2000, n), unit="D")).strftime("%Y-%m-%d"),
+        "segment": rng.choice(["Consumer", "Corporate", "Home Office", "SMB", "Public"], n),
+    }
+    for i in range(120):
+        values = rng.normal(i, 1 + i / 20, n).round(3)
+        if i % 10 == 0:
+            values[rng.random(n) < 0.05] = np.nan  # some missing values to clean
+        frame[f"metric_{i:03d}"] = values
+    for i in range(30):
+        frame[f"attr_{i:02d}"] = rng.choice([f"v{k}" for k in range(5 + i)], n)
+    return pd.DataFrame(frame)
+
+def _high_cardinality(rng, start, n, total):
+    return pd.DataFrame({
+        "customer_id": [f"C{v:08d}" for v in rng.integers(0, max(total // 2, 1), n)],
+        "sku": [f"SKU-{v:06d}" for v in rng.integers(0, 100_000, n)],
+        "city": [f"City {v}" for v in rng.integers(0, 20_000, n)],
+        "channel": rng.choice(["web", "store", "phone"], n),
+        "amount": rng.lognormal(3, 1, n).round(2),
+        "quantity": rng.integers(1, 5, n),
+    })
+
+def _date_heavy(rng, start, n, total):
+    base = pd.Timestamp("2016-01-01") + pd.to_timedelta(rng.integers(0, 3000 * 24 * 60, n), unit="min")
+    return pd.DataFrame({
+        "created_at": base.strftime("%Y-%m-%d %H:%M:%S"),
+        "ship_date": (base + pd.to_timedelta(rng.integers(1, 10, n), unit="D")).strftime("%d/%m/%Y"),
+        "invoice_month": base.strftime("%Y-%m"),
+        "due": (base + pd.to_timedelta(30, unit="D")).strftime("%b %d, %Y"),
+        "status": rng.choice(["paid", "open", "overdue", "void"], n, p=[0.7, 0.2, 0.08, 0.02]),
+        "amount": rng.normal(500, 150, n).round(2),
+        "fee": rng.uniform(0, 20, n).round(2),
+    })
+
+GENERATORS = {"narrow": _narrow, "wide": _wide, "high_cardinality": _high_cardinality, "date_heavy": _date_heavy}
+
+def too_big(shape, rows):
+    return rows * COLUMNS[shape] > MAX_CELLS
+
+def dataset(shape, rows, seed=0, folder=BENCH_DATA_DIR):
+    """Path of the synthetic CSV (created on first use, written chunk by chunk under a temp name)"""
+    path = os.path.join(folder, f"{shape}-{rows}-{seed}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="") as f:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = GENERATORS[shape](rng, start, min(CHUNK_ROWS, rows - start), rows)
+            chunk.to_csv(f, index=False, header=start == 0)
+    os.replace(tmp, path)
+    return path
+
+def parse_size(text):
+    """'1k' -> 1000, '10M' -> 10000000"""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
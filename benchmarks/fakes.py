@@ -0,0 +1,53 @@
+"""Offline stand-ins for the OpenAI chat models used by the agents."""
+import re
+import json
+import time
+import textwrap
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+
+def scripted_response(prompt: str) -> str:
+    """Answer each agent prompt the way a well-behaved model would"""
+    if "Gatekeeper" in prompt:
+        query = re.search(r'User Input: "(.*?)"', prompt, re.DOTALL)
+        return json.dumps({"status": "VALID", "content": query.group(1) if query else ""})
+    if "Data Engineer" in prompt:
+        # Echo the required code pattern back, like the real model does
+        block = re.search(r"```python\n(.*?)```", prompt, re.DOTALL)
+        return f"```python\n{textwrap.dedent(block.group(1))}```" if block else ""
+    if "Visualization Expert" in prompt:
+        # Pick the default chart specs shown in the prompt
+        block = re.search(r"```json\n(.*?)```", prompt, re.DOTALL)
+        return block.group(1).strip() if block else ""
+    if "DATA PROFILE" in prompt:
+        profile = json.loads(re.search(r"DATA PROFILE.*?\n\s*(\{.*\})\n", prompt, re.DOTALL).group(1))
+        target = profile["key_columns"]["target_col"]
+        stats = profile["columns"].get(target, {})
+        return (f"The dataset has {profile['rows']} rows and {profile['columns_count']} columns. "
+                f"{target}: mean {stats.get('mean')}, min {stats.get('min')}, max {stats.get('max')}.")
+    return "Based on the data, the analysis shows the values reported in the EDA results."
+
+class ScriptedChatModel(SimpleChatModel):
+    """Fake chat model returning scripted answers per agent, with optional injected latency"""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _call(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return scripted_response(messages[-1].content)
+
+def install_fake_llm(latency: float = 0.0):
+    """Put a ScriptedChatModel behind the gateway client of every agent module (retries, limits,
+    coalescing and accounting in src/llm.py still apply)"""
+    from src.agents import prep, analysis, reporting
+    model = ScriptedChatModel(latency=latency)
+    for module in (prep, analysis, reporting):
+        module.llm.model = model
+    return model
@@ -0,0 +1,105 @@
+"""Local OpenAI-compatible server for offline checks of the real HTTP path (src/llm.py + ChatOpenAI).
+
+    server = MockOpenAI(latency=0.1, fail_first=2).start()   # sets OPENAI_BASE_URL
+    ...
+    server.stop()
+
+POST /v1/chat/completions answers with the scripted agent responses from benchmarks/fakes.py,
+as JSON or as an SSE stream (stream=true), including token usage. The first `fail_first`
+requests get a 429 with a Retry-After header. `prefill_per_1k` adds that many seconds per 1000 prompt
+tokens before the first byte (prompt processing time, for time-to-first-token measurements).
+"""
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.fakes import scripted_response
+
+class MockOpenAI:
+    def __init__(self, latency=0.0, fail_first=0, retry_after=0.1, prefill_per_1k=0.0):
+        self.latency = latency
+        self.prefill_per_1k = prefill_per_1k
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.requests = 0       # every POST, including rejected ones
+        self.prompts = []       # last message of each answered request
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def start(self, set_env=True):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling is exercised
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with mock._lock:
+                    mock.requests += 1
+                    reject = mock.requests <= mock.fail_first
+                if reject:
+                    return self._json(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                                      {"Retry-After": str(mock.retry_after)})
+                prompt = body["messages"][-1]["content"]
+                prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+                if mock.latency or mock.prefill_per_1k:
+                    time.sleep(mock.latency + mock.prefill_per_1k * prompt_tokens / 1000)
+                with mock._lock:
+                    mock.prompts.append(prompt)
+                answer = scripted_response(prompt)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": max(1, len(answer) // 4)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get("stream"):
+                    return self._stream(body["model"], answer, usage)
+                self._json(200, {
+                    "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model, answer, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+                pieces = [answer[i:i + 40] for i in range(0, len(answer), 40)] or [""]
+                events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": p}, "finish_reason": None}]}
+                          for p in pieces]
+                events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                events.append({**base, "choices": [], "usage": usage})
+                for event in [json.dumps(e) for e in events] + ["[DONE]"]:
+                    data = f"data: {event}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if set_env:
+            os.environ["OPENAI_BASE_URL"] = self.base_url
+            os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,106 @@
+"""Record / replay chat model: canned responses keyed by node, model and prompt hash.
+
+    models = install_replay(fixtures_path, record=True)   # on every agent module, like fakes.install_fake_llm
+    ...run the graph...
+    save_fixtures(recorded(models), fixtures_path)
+
+A call is looked up by (graph node, model, hash of the normalised prompt). Temp / workspace paths are
+replaced by a placeholder before hashing so recordings stay valid across runs. On a miss the model
+answers with `inner` (a real ChatOpenAI when recording live) or the scripted fake, and in record mode
+the answer is added to the fixtures. `replay_latency` sleeps the recorded latency of each answer.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+
+from benchmarks.fakes import scripted_response
+from src import llm
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "replay.json")
+_PATH = re.compile(r"(?:/[\w.\-]+)+\.(?:csv|png|feather|json)")
+_lock = threading.Lock()
+
+def prompt_key(node, model_name, messages):
+    text = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    digest = hashlib.sha256(_PATH.sub("<path>", text).encode("utf-8")).hexdigest()[:16]
+    return f"{node or 'other'}|{model_name}|{digest}"
+
+def load_fixtures(path=FIXTURES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_fixtures(fixtures, path=FIXTURES_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(sorted(fixtures.items())), f, indent=1)
+    os.replace(tmp, path)
+
+class ReplayChatModel(SimpleChatModel):
+    """Fake chat model answering from recorded fixtures"""
+
+    fixtures: dict
+    model_name: str = "gpt-4o-mini"
+    inner: Any = None             # answers misses (e.g. a real ChatOpenAI), None = scripted fake
+    record: bool = False          # add answers to misses to the fixtures
+    strict: bool = False          # a miss raises instead of answering
+    replay_latency: bool = False  # sleep the recorded latency
+    counts: dict = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-fake"
+
+    def _count(self, outcome):
+        with _lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def _call(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> str:
+        key = prompt_key(llm.current_node(), self.model_name, messages)
+        entry = self.fixtures.get(key)
+        if entry is not None:
+            self._count("hits")
+            if self.replay_latency and entry.get("seconds"):
+                time.sleep(entry["seconds"])
+            return entry["content"]
+        if self.strict:
+            raise KeyError(f"No recorded response for {key}")
+        self._count("misses")
+        start = time.perf_counter()
+        content = self.inner.invoke(messages).content if self.inner is not None else scripted_response(messages[-1].content)
+        if self.record:
+            with _lock:
+                self.fixtures[key] = {"content": content, "seconds": round(time.perf_counter() - start, 3)}
+        return content
+
+def install_replay(path=FIXTURES_PATH, record=False, strict=False, replay_latency=False, live=False):
+    """Put a ReplayChatModel behind every agent module's gateway client. Returns the models."""
+    from src.agents import prep, analysis, reporting
+    fixtures = load_fixtures(path)
+    models = []
+    for module in (prep, analysis, reporting):
+        inner = None
+        if live:
+            from langchain_openai import ChatOpenAI
+            inner = ChatOpenAI(model=module.llm.model_name, temperature=module.llm.temperature)
+        model = ReplayChatModel(fixtures=fixtures, model_name=module.llm.model_name, inner=inner, record=record,
+                                strict=strict, replay_latency=replay_latency, counts={})
+        module.llm.model = model
+        models.append(model)
+    return models
+
+def recorded(models):
+    """Fixtures of all models merged (pydantic gives every model its own copy of the dict)"""
+    fixtures = {}
+    for model in models:
+        fixtures.update(model.fixtures)
+    return fixtures
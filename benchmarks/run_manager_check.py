@@ -0,0 +1,96 @@
+"""Run manager check: bounded queue, concurrency limit, per-user fairness and cancellation.
+
+Run: python -m benchmarks.run_manager_check
+Uses the fake LLM, so it runs offline.
+"""
+import os
+import time
+import tempfile
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import numpy as np
+import pandas as pd
+from langchain_core.messages import HumanMessage
+from benchmarks.fakes import install_fake_llm
+from src.runs import RunManager, RunQueueFull
+from src.tools import workspace
+
+def make_csv(folder, rows=300):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "order_date": pd.date_range("2023-01-01", periods=rows, freq="D").strftime("%Y-%m-%d"),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "sales": rng.normal(100, 10, rows).round(2),
+    })
+    path = os.path.join(folder, "input.csv")
+    df.to_csv(path, index=False)
+    return path
+
+def inputs(csv_path):
+    return {"messages": [HumanMessage(content="Perform general data analysis.")], "csv_file_path": csv_path, "use_cache": False}
+
+if __name__ == "__main__":
+    install_fake_llm(latency=0.3)
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = make_csv(folder)
+        manager = RunManager(max_concurrent=2, max_queued=8, per_user=1)
+
+        # User A floods the queue first, B and C arrive later
+        runs = [manager.submit("A", inputs(csv_path)) for _ in range(4)]
+        runs += [manager.submit("B", inputs(csv_path)) for _ in range(2)]
+        runs += [manager.submit("C", inputs(csv_path))]
+
+        # Admission control: the queue holds at most 8 waiting runs
+        try:
+            for _ in range(10):
+                manager.submit("D", inputs(csv_path))
+            raise AssertionError("queue never filled up")
+        except RunQueueFull as e:
+            print(f"Rejected as expected: {e}")
+
+        # Cancel one queued run and one running run
+        queued = runs[3]
+        assert manager.cancel(queued.id) and queued.status == "cancelled"
+        running = runs[0]
+        while running.status == "queued":
+            time.sleep(0.01)
+        time.sleep(0.5)
+        manager.cancel(running.id)
+
+        for run in runs:
+            run.wait(timeout=120)
+        others = [r for r in list(manager._runs.values()) if r.user == "D"]
+        for run in others:
+            run.wait(timeout=120)
+
+        assert running.status == "cancelled", running.status
+        finished = [r for r in runs if r.status == "done"]
+        assert all(r.result.get("final_report") for r in finished), "finished run without report"
+
+        # Fairness: B and C start before A's later runs although A queued first
+        order = [r.user for r in sorted(runs + others, key=lambda r: r.started or float("inf")) if r.started]
+        print(f"Start order: {' '.join(order)}")
+        assert order.index("C") < len(order) - 1 - order[::-1].index("A"), "C waited behind all of A's runs"
+        assert order[:3].count("A") == 1, "A got more than its fair share up front"
+
+        for run in runs:
+            wait = f"{run.queue_wait:.2f}s" if run.queue_wait is not None else "-"
+            took = f"{run.run_time:.2f}s" if run.run_time is not None else "-"
+            print(f"  {run.user} {run.status:>9}  queue wait {wait:>6}  run time {took:>6}")
+        print(f"Metrics: {manager.metrics()}")
+
+        # Retention: a queued / running run's workspace survives the run cap, it is evictable once finished
+        workspace.WORKSPACE_ROOT = os.path.join(folder, "runs")
+        live = workspace.create_workspace()
+        run = manager.submit("E", {**inputs(csv_path), "workspace_dir": live})
+        idle = [workspace.create_workspace() for _ in range(3)]
+        for path in idle:
+            workspace.release_workspace(path)
+            os.utime(path, (time.time() + 60, time.time() + 60))  # newer than the live run
+        removed = workspace.cleanup_workspaces(max_runs=1)
+        assert os.path.isdir(live) and removed == 2, (removed, os.listdir(workspace.WORKSPACE_ROOT))
+        run.wait(timeout=120)
+        assert run.status == "done" and run.result.get("viz_images"), run.status
+        assert workspace.cleanup_workspaces(max_runs=1) == 1 and not os.path.isdir(live)
+        print("Retention: live workspace kept under the run cap, removed once idle")
+        manager.shutdown()
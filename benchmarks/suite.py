@@ -0,0 +1,226 @@
+"""Benchmark suite: the full agent graph on synthetic CSVs of several shapes and sizes, LLM replayed from fixtures.
+
+Run: python -m benchmarks.suite                                   # 1k / 10k / 100k rows, all shapes
+     python -m benchmarks.suite --sizes 1k,100k,1M,10M --shapes narrow,date_heavy --output after.json
+     python -m benchmarks.suite --baseline before.json --output after.json --repeat 3   # exit 1 on regressions
+     python -m benchmarks.suite --record [--live]                 # (re)record benchmarks/fixtures/replay.json
+
+Every case runs in a fresh process (clean memory, REPL pool warmed up before timing, no result or
+dataset cache). Per node: wall time, peak RSS of the main process while the node ran (sampled),
+peak RSS of the REPL worker, CSV bytes read and LLM calls. Results are written as JSON.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+
+from benchmarks import datasets
+
+DEFAULT_SIZES = "1k,10k,100k"
+SAMPLE_INTERVAL = 0.005  # seconds between RSS samples
+
+class RSSSampler(threading.Thread):
+    """Samples this process' RSS in the background: (time, MB) pairs"""
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.samples = []
+        self._done = threading.Event()
+        self._page_mb = os.sysconf("SC_PAGE_SIZE") / 1024 / 1024 if hasattr(os, "sysconf") else 0
+
+    def rss_mb(self):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_mb
+        except OSError:
+            return 0.0
+
+    def run(self):
+        while not self._done.is_set():
+            self.samples.append((time.time(), self.rss_mb()))
+            self._done.wait(SAMPLE_INTERVAL)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def peak(self, start=0.0, end=float("inf")):
+        # Nodes shorter than the interval get the last sample taken before they started
+        before = [mb for t, mb in self.samples if t < start][-1:]
+        return round(max([mb for t, mb in self.samples if start <= t <= end] or before or [0.0]), 1)
+
+def run_case(shape, rows, repeat=1, fixtures=None, record=False, live=False, replay_latency=False, strict=False):
+    """Run one (shape, rows) case in this process. Returns its result dict."""
+    os.environ["RESULT_CACHE"] = "off"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    from langchain_core.messages import HumanMessage
+    from benchmarks import replay
+    from src.graph import app, critical_path
+    from src.tools import datastore
+    from src.tools.pool import get_pool
+    from src.tools.workspace import create_workspace, remove_workspace
+
+    csv_path = datasets.dataset(shape, rows)
+    fixtures_path = fixtures or replay.FIXTURES_PATH
+    models = replay.install_replay(fixtures_path, record=record, strict=strict, replay_latency=replay_latency, live=live)
+    get_pool().run("pass")  # start the workers outside the measurement
+
+    runs = []
+    for _ in range(repeat):
+        # Fresh dataset store per repetition: the cleaner must really clean
+        datastore.DATASET_CACHE_DIR = tempfile.mkdtemp(prefix="bench_datasets_")
+        workspace = create_workspace()
+        sampler = RSSSampler()
+        sampler.start()
+        start = time.time()
+        result = app.invoke({"messages": [HumanMessage(content="Perform a general analysis of this dataset")],
+                             "csv_file_path": csv_path, "workspace_dir": workspace, "use_cache": False})
+        wall = time.time() - start
+        sampler.stop()
+        timings = result.get("node_timings", {})
+        nodes = {}
+        for name, t in timings.items():
+            nodes[name] = {
+                "seconds": t["seconds"],
+                "peak_rss_mb": sampler.peak(t["start"], t["end"]),
+                "repl_peak_mb": t.get("repl", {}).get("peak_mb", 0),
+                "csv_bytes_read": t.get("csv", {}).get("bytes", 0),
+                "llm_calls": t.get("llm", {}).get("calls", 0),
+            }
+        runs.append({"wall_s": round(wall, 3), "peak_rss_mb": sampler.peak(), "nodes": nodes,
+                     "critical_path": critical_path(timings)[0], "report": bool(result.get("final_report"))})
+        remove_workspace(workspace)
+
+    if record:
+        replay.save_fixtures(replay.recorded(models), fixtures_path)
+    counts = {}
+    for model in models:
+        for outcome, n in model.counts.items():
+            counts[outcome] = counts.get(outcome, 0) + n
+
+    # Median over repetitions, per node
+    median = lambda values: round(statistics.median(values), 3)
+    names = runs[0]["nodes"]
+    return {
+        "shape": shape,
+        "rows": rows,
+        "csv_mb": round(os.path.getsize(csv_path) / 1e6, 2),
+        "repeat": repeat,
+        "wall_s": median([r["wall_s"] for r in runs]),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "report": all(r["report"] for r in runs),
+        "critical_path": runs[-1]["critical_path"],
+        "replay": counts,
+        "nodes": {name: {metric: median([r["nodes"][name][metric] for r in runs if name in r["nodes"]])
+                         for metric in names[name]} for name in names},
+    }
+
+def _meta(args):
+    import pandas as pd
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "pandas": pd.__version__, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "sizes": args.sizes, "shapes": args.shapes, "repeat": args.repeat}
+
+def compare(results, baseline, threshold=0.2, min_seconds=0.15, min_mb=20):
+    """Regressions of results vs baseline: [(case, node, metric, old, new)]"""
+    regressions = []
+    for case, current in results["cases"].items():
+        old = baseline.get("cases", {}).get(case)
+        if not old or "nodes" not in current:
+            continue
+        pairs = [("(run)", "wall_s", old.get("wall_s"), current["wall_s"], min_seconds),
+                 ("(run)", "peak_rss_mb", old.get("peak_rss_mb"), current["peak_rss_mb"], min_mb)]
+        for node, metrics in current["nodes"].items():
+            before = old.get("nodes", {}).get(node, {})
+            pairs.append((node, "seconds", before.get("seconds"), metrics["seconds"], min_seconds))
+            pairs.append((node, "peak_rss_mb", before.get("peak_rss_mb"), metrics["peak_rss_mb"], min_mb))
+        for node, metric, before, after, floor in pairs:
+            if before is not None and after > before * (1 + threshold) and after - before > floor:
+                regressions.append((case, node, metric, before, after))
+    return regressions
+
+def print_case(name, case):
+    if "error" in case:
+        print(f"{name}: FAILED {case['error']}")
+        return
+    print(f"{name}: {case['csv_mb']} MB, wall {case['wall_s']:.2f}s, peak RSS {case['peak_rss_mb']:.0f} MB, "
+          f"replay {case['replay']}, critical path {' -> '.join(case['critical_path'])}")
+    for node, m in case["nodes"].items():
+        print(f"    {node:<11}{m['seconds']:>8.3f}s  rss {m['peak_rss_mb']:>7.0f} MB  repl {m['repl_peak_mb']:>6.0f} MB"
+              f"  csv read {m['csv_bytes_read'] / 1e6:>8.1f} MB  llm {m['llm_calls']:.0f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent graph benchmark suite (replayed LLM, synthetic CSVs)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated row counts, e.g. 1k,100k,1M,10M")
+    parser.add_argument("--shapes", default=",".join(datasets.SHAPES))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case (medians are reported)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results JSON to compare against (exit 1 on regressions)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.15, help="smaller slowdowns are ignored (timer noise)")
+    parser.add_argument("--fixtures", help="replay fixtures file (default benchmarks/fixtures/replay.json)")
+    parser.add_argument("--record", action="store_true", help="add responses for unseen prompts to the fixtures")
+    parser.add_argument("--live", action="store_true", help="answer unseen prompts with the real models (needs OPENAI_API_KEY)")
+    parser.add_argument("--strict", action="store_true", help="fail a case on a prompt without a recorded response")
+    parser.add_argument("--replay-latency", action="store_true", help="sleep the recorded LLM latency")
+    parser.add_argument("--case", help=argparse.SUPPRESS)         # shape:rows, run in this process
+    parser.add_argument("--case-output", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        shape, rows = args.case.split(":")
+        result = run_case(shape, int(rows), args.repeat, args.fixtures, args.record, args.live, args.replay_latency, args.strict)
+        with open(args.case_output, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    results = {"meta": _meta(args), "cases": {}}
+    for rows in [datasets.parse_size(s) for s in args.sizes.split(",")]:
+        for shape in args.shapes.split(","):
+            name = f"{shape}-{rows}"
+            if datasets.too_big(shape, rows):
+                print(f"{name}: skipped ({rows} x {datasets.COLUMNS[shape]} cells over the suite limit)")
+                continue
+            datasets.dataset(shape, rows)  # generated outside the timed run
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                out = tmp.name
+            cmd = [sys.executable, "-m", "benchmarks.suite", "--case", f"{shape}:{rows}", "--case-output", out,
+                   "--repeat", str(args.repeat)]
+            cmd += ["--fixtures", args.fixtures] if args.fixtures else []
+            cmd += [flag for flag, on in (("--record", args.record), ("--live", args.live),
+                                          ("--replay-latency", args.replay_latency), ("--strict", args.strict)) if on]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode == 0:
+                with open(out) as f:
+                    results["cases"][name] = json.load(f)
+            else:
+                results["cases"][name] = {"shape": shape, "rows": rows, "error": proc.stderr.strip().splitlines()[-1:] or ["?"]}
+            os.remove(out)
+            print_case(name, results["cases"][name])
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        for case, node, metric, before, after in regressions:
+            print(f"REGRESSION {case} {node} {metric}: {before} -> {after} (+{(after / before - 1) if before else 0:.0%})")
+        print(f"{len(regressions)} regressions vs {args.baseline} (commit {baseline.get('meta', {}).get('commit', '?')})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
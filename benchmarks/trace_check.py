@@ -0,0 +1,57 @@
+"""Tracing check: graph runs (sync and async) with TRACE_FILE and TRACE_PROFILE set, then the viewer.
+
+Run: python -m benchmarks.trace_check
+Uses the fake LLM and no result cache. Checks that every node span is exported with its LLM,
+REPL and CSV counters, that REPL executions are child spans with a cProfile summary, that the
+nodes of one run share a trace id, and that the viewer finds the critical path.
+"""
+import os
+import asyncio
+import tempfile
+
+folder = tempfile.mkdtemp()
+os.environ["TRACE_FILE"] = os.path.join(folder, "trace.jsonl")
+os.environ["TRACE_PROFILE"] = "cprofile"
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["RESULT_CACHE"] = "off"
+
+from langchain_core.messages import HumanMessage
+from benchmarks.fakes import install_fake_llm
+from benchmarks.run_manager_check import make_csv
+from src import tracing
+from src.graph import app, critical_path
+
+def inputs(csv_path, query):
+    return {"messages": [HumanMessage(content=query)], "csv_file_path": csv_path, "workspace_dir": folder}
+
+if __name__ == "__main__":
+    install_fake_llm(latency=0.05)
+    csv_path = make_csv(folder, rows=5000)
+
+    result = app.invoke(inputs(csv_path, "Perform general data analysis."))
+    timings = result["node_timings"]
+    assert timings["cleaner"]["csv"]["bytes"] > 0, timings["cleaner"]
+    assert timings["viz"]["repl"]["calls"] >= 1 and timings["viz"]["repl"]["peak_mb"] > 0, timings["viz"]
+    assert timings["eda"]["llm"]["calls"] >= 1, timings["eda"]
+    path, seconds = critical_path(timings)
+    print(f"Sync run: critical path {' -> '.join(path)} ({seconds:.2f}s)")
+
+    # Custom cleaning goes through the REPL in the cleaner node, async this time
+    async_result = asyncio.run(app.ainvoke(inputs(csv_path, "Clean the data: drop duplicates, then analyse sales by region")))
+    assert async_result["node_timings"]["cleaner"]["repl"]["calls"] == 1, async_result["node_timings"]["cleaner"]
+    assert async_result["trace_id"] != result["trace_id"]
+
+    traces = tracing.load_traces(os.environ["TRACE_FILE"])
+    assert list(traces) == [result["trace_id"], async_result["trace_id"]], list(traces)
+    for trace_id, spans in traces.items():
+        nodes = {s["name"] for s in spans if s["parent_span_id"] is None}
+        assert nodes == set(timings), nodes
+        repl = [s for s in spans if s["name"] == "repl"]
+        assert repl and all(s["attributes"]["repl.profile"] for s in repl), "missing REPL profile"
+        ids = {s["span_id"] for s in spans}
+        assert all(s["parent_span_id"] in ids for s in repl), "orphan REPL span"
+        summary = tracing.summarize(spans)
+        assert summary["critical_path"][0] == "rewriter" and summary["critical_path"][-1] == "report", summary
+    print(f"Trace file: {sum(len(s) for s in traces.values())} spans in {len(traces)} traces")
+
+    assert tracing.main([os.environ["TRACE_FILE"], "--all", "--profile"]) == 0
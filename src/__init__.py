@@ -0,0 +1,3 @@
+# .env is loaded once, before any module reads its settings from the environment
+from dotenv import load_dotenv
+load_dotenv()
@@ -1,242 +1,250 @@
 import os
 import json
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg') # Headless mode
-import matplotlib.pyplot as plt
-import seaborn as sns
-from dotenv import load_dotenv
-load_dotenv()
-
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
 from src.state import AgentState
-from src.tools.base import python_repl_tool, extract_code
+from src import tracing
+from src.llm import get_llm
+from src.tools.base import python_repl_tool
+from src.tools.workspace import workspace_file
+from src.tools.prompts import build_messages, compact_profile, EDA_PROFILE_TOKENS
+from src.tools import datastore, charts, artifacts
+from src.tools.cache import cached_node, prompt_version
+from src.tools.profiling import detect_key_columns, build_profile
+from src.tools.largefile import stream_aggregates
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+llm = get_llm("gpt-4o-mini")
 
-# ROBUST EDA AGENT
-def eda_agent_node(state: AgentState):
-    print("--- EDA AGENT STARTED ---")
+def repl_inputs(state: AgentState):
+    """Data preloaded into the REPL worker: df (full dataset or large-file sample) and aggregates"""
+    return {
+        "dataset_path": state.get("sample_path") or state.get("dataset_path", ""),
+        "frames": state.get("aggregates") or {},
+    }
+
+def load_cleaned_data(state: AgentState) -> pd.DataFrame:
+    dataset_path = state.get("dataset_path", "")
+    if dataset_path and os.path.exists(dataset_path):
+        return datastore.load(dataset_path)
     csv_path = state.get("cleaned_csv_path", "cleaned_data.csv")
-    
-    # Force JSON output for column identification
-    prompt = f"""You are a Senior Data Analyst with 10+ years of experience in business intelligence.
-    Data file: '{csv_path}'.
-    
-    MISSION:
-    1. Read and analyze the dataset.
-    2. Identify the 3 most important columns (return "None" if not found):
-       - "date_col": Time-based column (e.g., Date, Time, Year).
-       - "target_col": Primary numeric metric (e.g., Revenue, Score, Price).
-       - "group_col": Primary categorical dimension (e.g., Product, Region, Category).
-    3. Calculate descriptive statistics for the target column.
-    
-    REQUIRED PYTHON OUTPUT:
-    - Print results as JSON string.
-    - Format: print(json.dumps({{\"date_col\": \"...\", \"target_col\": \"...\", \"group_col\": \"...\", \"summary\": \"...\"}}))
+    tracing.record_csv_read(csv_path)
+    return pd.read_csv(csv_path)
+
+# COLUMN PROFILER (no LLM) - runs before EDA and Viz so both get the same hints
+def profiling_node(state: AgentState):
+    print("--- COLUMN PROFILER STARTED ---")
+    sample_path = state.get("sample_path", "")
+    stats = state.get("cleaning_stats", {})
+    df = None
+    try:
+        if sample_path:
+            # Large file: detect on the row sample, with full-file distinct counts from the streaming pass
+            df = datastore.load(sample_path)
+            distinct = {c: p["approx_distinct"] for c, p in stats.get("profile", {}).items()}
+            hints = detect_key_columns(df, distinct, stats.get("rows_after"))
+        else:
+            df = load_cleaned_data(state)
+            hints = detect_key_columns(df)
+    except Exception as e:
+        print(f"Profiling Error: {str(e)}")
+        hints = {"date_col": "None", "target_col": "None", "group_col": "None"}
+
+    print(f"Auto-detected: Date='{hints['date_col']}', Target='{hints['target_col']}', Group='{hints['group_col']}'")
+    result = {
+        "primary_date": hints["date_col"],
+        "primary_target": hints["target_col"],
+        "primary_group": hints["group_col"],
+        # Follow-ups on the same file reuse this analysis (graph.can_reuse_analysis)
+        "analyzed_file": state.get("csv_file_path", ""),
+    }
+    
+    frames = {}
+    if sample_path and hints["target_col"] != "None":
+        # Exact chart aggregates over the full file, streamed batch by batch
+        aggregates = {}
+        try:
+            frames = stream_aggregates(state["dataset_path"], hints["date_col"], hints["target_col"], hints["group_col"])
+            for name, frame in frames.items():
+                path = workspace_file(state, f"{name}.feather")
+                frame.to_feather(path)
+                aggregates[name] = path
+        except Exception as e:
+            print(f"Aggregation Error: {str(e)}")
+        result["aggregates"] = aggregates
+
+    if df is not None:
+        try:
+            result["data_profile"] = build_profile(df, hints, stats.get("profile") if sample_path else None,
+                                                   stats.get("rows_after") if sample_path else None, frames)
+        except Exception as e:
+            print(f"Profile Error: {str(e)}")
+    return result
+
+async def aprofiling_node(state: AgentState):
+    # Pure pandas / file work: run the sync profiler off the event loop
+    return await asyncio.to_thread(profiling_node, state)
+
+def analysis_key(state):
+    """Inputs (besides the dataset) that EDA and Viz outputs depend on"""
+    return [state.get("refined_query", ""), state.get("primary_date", "None"),
+            state.get("primary_target", "None"), state.get("primary_group", "None")]
+
+# EDA AGENT: narrates the native profile (stats are computed by the profiler, not by LLM code)
+EDA_ERROR = "Error in EDA."
+
+EDA_INSTRUCTIONS = """You are a Senior Data Analyst with 10+ years of experience in business intelligence.
+    You get the user request and a DATA PROFILE computed exactly from the dataset (JSON).
+    
+    Notes: "key_columns" are the detected date / target / group columns ("None" = not available).
+    "target_by_group" and "target_trend" break down the target column. If "sampled_rows" is set,
+    quantiles and outlier counts come from a uniform sample, everything else covers all rows.
+    "other_columns" (if present) lists further columns by name and kind only.
+    
+    MISSION: Write a factual EDA summary (plain text, no code, no headers):
+    1. Dataset shape, column types and data quality (missing values, outliers).
+    2. Descriptive statistics of the target, and per group if available.
+    3. Time range and trend of the target if a date column exists.
+    4. Notable correlations.
+    Cite the exact numbers from the profile. NEVER invent values that are not in the profile.
     """
-    
+
+def _eda_messages(state: AgentState, profile):
+    # Static instructions first, request + profile (compacted to a token budget) last
+    profile = compact_profile(profile, EDA_PROFILE_TOKENS)
+    return build_messages(EDA_INSTRUCTIONS, f"""User request: "{state.get('refined_query', '')}" (If empty, perform general analysis).
+
+DATA PROFILE (computed exactly from the dataset, JSON):
+{json.dumps(profile, separators=(",", ":"), default=str)}
+""")
+
+eda_cacheable = lambda r: r.get("eda_report") not in ("", EDA_ERROR)
+EDA_VERSION = prompt_version(llm, EDA_INSTRUCTIONS, EDA_PROFILE_TOKENS)
+
+@cached_node("eda", analysis_key, EDA_VERSION, cacheable=eda_cacheable)
+def eda_agent_node(state: AgentState):
+    print("--- EDA AGENT STARTED ---")
+    profile = state.get("data_profile")
+    if not profile:
+        return {"eda_report": EDA_ERROR}
     try:
-        raw_content = llm.invoke([SystemMessage(content=prompt)]).content
-        code = extract_code(raw_content)
-        # Ensure required imports
-        code = "import json\nimport pandas as pd\n" + code
-        
-        result_str = python_repl_tool.invoke(code)
-        
-        # Parse JSON from output
-        import re
-        json_match = re.search(r'\{.*\}', result_str, re.DOTALL)
-        
-        data = {}
-        if json_match:
-            try:
-                data = json.loads(json_match.group(0))
-            except: pass
-            
-        target = data.get("target_col", "None")
-        group = data.get("group_col", "None")
-        date = data.get("date_col", "None")
-        summary = data.get("summary", result_str)
-
-        print(f"Auto-detected: Date='{date}', Target='{target}', Group='{group}'")
-        
-        return {
-            "eda_report": summary,
-            "primary_target": target,
-            "primary_group": group
-        }
+        summary = llm.invoke(_eda_messages(state, profile)).content.strip()
+        return {"eda_report": summary or EDA_ERROR}
     except Exception as e:
         print(f"EDA Error: {str(e)}")
-        return {"eda_report": "Error in EDA."}
+        return {"eda_report": EDA_ERROR}
 
-# SMART AGGREGATION VIZ AGENT 
+@cached_node("eda", analysis_key, EDA_VERSION, cacheable=eda_cacheable)
+async def aeda_agent_node(state: AgentState):
+    print("--- EDA AGENT STARTED ---")
+    profile = state.get("data_profile")
+    if not profile:
+        return {"eda_report": EDA_ERROR}
+    try:
+        summary = (await llm.ainvoke(_eda_messages(state, profile))).content.strip()
+        return {"eda_report": summary or EDA_ERROR}
+    except Exception as e:
+        print(f"EDA Error: {str(e)}")
+        return {"eda_report": EDA_ERROR}
+
+# VIZ AGENT: the LLM picks chart specs (small JSON), the native chart library renders them
+VIZ_PROMPT = """You are a Visualization Expert with 10+ years in business analytics.
+    User request: "{query}" (If empty, perform general analysis).
+    Columns: {columns}
+    Suggested columns - Date: '{date_col}', Target: '{target_col}', Group: '{group_col}'.
+    
+    MISSION: Pick the {max_charts} most informative charts for this request. Charts are rendered by our chart library,
+    do NOT write code. Available chart types and their fields:
+    - {{"type": "trend", "date": <datetime col>, "value": <numeric col>, "agg": "sum"|"mean"|"count"}}
+    - {{"type": "histogram", "value": <numeric col>}}
+    - {{"type": "top_n", "group": <text col>, "value": <numeric col>, "agg": "sum"|"mean"|"count"}}
+    - {{"type": "boxplot", "value": <numeric col>, "group": <optional text col>}}
+    - {{"type": "scatter", "x": <numeric col>, "y": <numeric col>}}
+    - {{"type": "heatmap"}} (correlation of numeric columns)
+    Optional "title" on any chart. Column names MUST match the columns above.
+    
+    Answer with JSON only, e.g. the default choice:
+    ```json
+    {defaults}
+    ```
+    """
+
+def _viz_request(state: AgentState):
+    """(prompt, columns, hints), or None when there is nothing to chart"""
+    profile = state.get("data_profile") or {}
+    columns = {c: info.get("kind") for c, info in profile.get("columns", {}).items()}
+    if not columns or not repl_inputs(state)["dataset_path"]:
+        print("Viz skipped: no data profile")
+        return None
+    
+    hints = {"date_col": state.get("primary_date", "None"),
+             "target_col": state.get("primary_target", "None"),
+             "group_col": state.get("primary_group", "None")}
+    defaults = charts.default_specs(hints, columns)
+    column_info = {c: f"{kind}, {profile['columns'][c].get('distinct')} distinct" for c, kind in columns.items()}
+
+    prompt = VIZ_PROMPT.format(query=state.get("refined_query", ""), columns=json.dumps(column_info), **hints,
+                               max_charts=charts.MAX_CHARTS, defaults=json.dumps({"charts": defaults}))
+    return prompt, columns, hints
+
+def _chart_jobs(state: AgentState, answer, columns, hints):
+    """[(repl inputs, chart path)] for the specs picked by the LLM"""
+    specs = charts.parse_specs(answer, columns, hints)
+    paths = [workspace_file(state, f"chart_{idx}.png") for idx in range(1, len(specs) + 1)]
+    for f in paths:
+        if os.path.exists(f): os.remove(f)
+    return [({"code": charts.render_code(spec, path), **repl_inputs(state)}, path) for spec, path in zip(specs, paths)]
+
+def _viz_result(jobs, logs):
+    print(f"Viz Log: {' | '.join(log.strip() for log in logs)}")
+    images = [path for _, path in jobs if os.path.exists(path)]
+    # Variants were built by the workers: render / encode cost and bytes of each output
+    for path in images:
+        meta = artifacts.chart_variants(path)
+        if meta:
+            tracing.record(charts_count=1, charts_render_ms=meta.get("render_ms") or 0, charts_encode_ms=meta["encode_ms"],
+                           **{f"charts_{name}_bytes": size for name, size in meta["bytes"].items()})
+    return {"viz_images": images}
+
+viz_cacheable = lambda r: bool(r.get("viz_images"))
+# Cached charts are restored as rendered: the render settings are part of the key too
+VIZ_VERSION = prompt_version(llm, VIZ_PROMPT, charts.MAX_CHARTS, artifacts.CHART_DPI)
+
+@cached_node("viz", analysis_key, VIZ_VERSION, files_key="viz_images", cacheable=viz_cacheable)
 def viz_agent_node(state: AgentState):
     print("--- VIZ AGENT STARTED ---")
-    csv_path = state.get("cleaned_csv_path", "cleaned_data.csv")
-    
-    # Suggestions from EDA phase
-    target_col = state.get("primary_target", "None")
-    group_col = state.get("primary_group", "None")
-    
-    # Clean up old charts
-    for f in ["chart_1.png", "chart_2.png"]:
-        if os.path.exists(f): os.remove(f)
+    request = _viz_request(state)
+    if request is None:
+        return {"viz_images": []}
+    prompt, columns, hints = request
+    try:
+        answer = llm.invoke([SystemMessage(content=prompt)]).content
+    except Exception as e:
+        print(f"Viz Error: {str(e)}")
+        answer = ""
+    jobs = _chart_jobs(state, answer, columns, hints)
+    
+    # Charts are independent: render them in parallel on the worker pool
+    # (each thread runs in a copy of the node's context, so executions are traced to this node)
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, python_repl_tool.invoke, job[0]) for job in jobs]
+        logs = [future.result() for future in futures]
+    return _viz_result(jobs, logs)
 
-    # Professional visualization workflow
-    prompt = f"""You are a Visualization Expert with 10+ years in business analytics.
-    Data file: '{csv_path}'.
-    Suggested columns - Target: '{target_col}', Group: '{group_col}'.
-    
-    MISSION: Create 2 professional, data-driven charts with CLEAR LABELS and ACCURATE DATA.
-    
-    CRITICAL RULES:
-    1. NEVER fabricate or assume data - ONLY use actual values from the dataset
-    2. ALL charts MUST have: clear title, axis labels, legends (if needed), and proper formatting
-    3. Column names MUST match actual columns in the CSV file
-    4. Handle missing/invalid data gracefully
-    
-    VISUALIZATION LOGIC (MANDATORY):
-    1. Setup:
-       - `import pandas as pd`
-       - `import matplotlib.pyplot as plt`
-       - `import seaborn as sns`
-       - `import numpy as np`
-       - `df = pd.read_csv('{csv_path}')`
-       - `sns.set_theme(style="whitegrid")`
-    
-    2. Auto-detect columns:
-       - Find date column: Check for datetime-like columns or columns with 'date', 'time', 'year' in name
-       - Find numeric column: Use `df.select_dtypes(include=['number']).columns` 
-       - Find categorical column: Use `df.select_dtypes(include=['object']).columns`
-    
-    3. CHART 1: TIME SERIES or DISTRIBUTION
-       - If date column found:
-         + Convert to datetime: `df[date_col] = pd.to_datetime(df[date_col], errors='coerce')`
-         + Drop NaT values: `df = df.dropna(subset=[date_col])`
-         + Aggregate by month: `df_agg = df.groupby(pd.Grouper(key=date_col, freq='M'))[numeric_col].sum().reset_index()`
-         + Plot line chart with proper x-axis formatting
-         + Title: 'Trend Over Time'
-       - Else: Plot histogram of first numeric column
-       - Save as `chart_1.png` and close figure
-    
-    4. CHART 2: RANKING or BOXPLOT
-       - If categorical column exists:
-         + Group by category: `df_rank = df.groupby(cat_col)[numeric_col].sum().nlargest(10).reset_index()`
-         + Plot horizontal bar chart (barh)
-         + Title: 'Top 10 Categories'
-       - Else: Plot boxplot of numeric column
-       - Save as `chart_2.png` and close figure
-    
-    5. CODE STRUCTURE (REQUIRED):
-    ```python
-    import pandas as pd
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    import numpy as np
-    
+@cached_node("viz", analysis_key, VIZ_VERSION, files_key="viz_images", cacheable=viz_cacheable)
+async def aviz_agent_node(state: AgentState):
+    print("--- VIZ AGENT STARTED ---")
+    request = _viz_request(state)
+    if request is None:
+        return {"viz_images": []}
+    prompt, columns, hints = request
     try:
-        # Load and validate data
-        df = pd.read_csv('{csv_path}')
-        print(f"Dataset loaded: {{df.shape[0]}} rows, {{df.shape[1]}} columns")
-        print(f"Columns: {{list(df.columns)}}")
-        
-        sns.set_theme(style="whitegrid")
-        
-        # Auto-detect columns ONLY from actual data
-        date_col = None
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                try:
-                    pd.to_datetime(df[col], errors='raise')
-                    date_col = col
-                    print(f"Date column detected: {{date_col}}")
-                    break
-                except:
-                    pass
-        
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        cat_cols = [c for c in df.select_dtypes(include=['object']).columns.tolist() if c != date_col]
-        
-        val_col = numeric_cols[0] if numeric_cols else None
-        cat_col = cat_cols[0] if cat_cols else None
-        
-        print(f"Selected columns - Numeric: {{val_col}}, Category: {{cat_col}}, Date: {{date_col}}")
-        
-        # Chart 1: Time series or histogram
-        plt.figure(figsize=(10, 6))
-        if date_col and val_col:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df_clean = df.dropna(subset=[date_col, val_col])
-            df_agg = df_clean.groupby(pd.Grouper(key=date_col, freq='M'))[val_col].sum().reset_index()
-            plt.plot(df_agg[date_col], df_agg[val_col], marker='o', linewidth=2, markersize=6)
-            plt.title(f'Trend of {{val_col}} Over Time', fontsize=14, fontweight='bold')
-            plt.xlabel('Date', fontsize=12)
-            plt.ylabel(f'Total {{val_col}}', fontsize=12)
-            plt.grid(True, alpha=0.3)
-            # Add value labels on points for clarity
-            for idx, row in df_agg.iterrows():
-                if idx % max(1, len(df_agg)//10) == 0:  # Show every 10th label to avoid clutter
-                    plt.text(row[date_col], row[val_col], f'{{row[val_col]:.0f}}', 
-                            fontsize=9, ha='center', va='bottom')
-        elif val_col:
-            df[val_col].hist(bins=min(20, len(df)//5), edgecolor='black')
-            plt.title(f'Distribution of {{val_col}}', fontsize=14, fontweight='bold')
-            plt.xlabel(val_col, fontsize=12)
-            plt.ylabel('Frequency', fontsize=12)
-            plt.grid(True, alpha=0.3, axis='y')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.savefig('chart_1.png', dpi=100, bbox_inches='tight')
-        plt.close()
-        print("Chart 1 saved successfully")
-        
-        # Chart 2: Ranking or boxplot
-        plt.figure(figsize=(10, 6))
-        if cat_col and val_col:
-            df_rank = df.groupby(cat_col)[val_col].sum().nlargest(10).sort_values().reset_index()
-            colors = plt.cm.viridis(np.linspace(0.3, 0.9, len(df_rank)))
-            bars = plt.barh(df_rank[cat_col], df_rank[val_col], color=colors, edgecolor='black')
-            plt.title(f'Top 10 {{cat_col}} by Total {{val_col}}', fontsize=14, fontweight='bold')
-            plt.xlabel(f'Total {{val_col}}', fontsize=12)
-            plt.ylabel(cat_col, fontsize=12)
-            # Add value labels on bars
-            for idx, (bar, val) in enumerate(zip(bars, df_rank[val_col])):
-                plt.text(val, bar.get_y() + bar.get_height()/2, f' {{val:.0f}}', 
-                        va='center', fontsize=10)
-            plt.grid(True, alpha=0.3, axis='x')
-        elif val_col:
-            bp = df.boxplot(column=val_col, patch_artist=True, return_type='dict')
-            for patch in bp['boxes']:
-                patch.set_facecolor('lightblue')
-            plt.title(f'Distribution Analysis of {{val_col}}', fontsize=14, fontweight='bold')
-            plt.ylabel(val_col, fontsize=12)
-            plt.grid(True, alpha=0.3, axis='y')
-        plt.tight_layout()
-        plt.savefig('chart_2.png', dpi=100, bbox_inches='tight')
-        plt.close()
-        print("Chart 2 saved successfully")
-        
-        print("All charts created successfully with actual data")
+        answer = (await llm.ainvoke([SystemMessage(content=prompt)])).content
     except Exception as e:
-        print(f"Visualization error: {{str(e)}}")
-        import traceback
-        traceback.print_exc()
-    ```
-    
-    IMPORTANT: Return complete working code with proper error handling.
-    """
-    
-    raw_content = llm.invoke([SystemMessage(content=prompt)]).content
-    code = extract_code(raw_content)
-    
-    # Execute visualization code
-    exec_result = python_repl_tool.invoke(code)
-    print(f"Viz Log: {exec_result}")
-    
-    images = []
-    if os.path.exists("chart_1.png"): images.append("chart_1.png")
-    if os.path.exists("chart_2.png"): images.append("chart_2.png")
-    
-    return {"viz_images": images}
\ No newline at end of file
+        print(f"Viz Error: {str(e)}")
+        answer = ""
+    jobs = _chart_jobs(state, answer, columns, hints)
+    logs = await asyncio.gather(*(python_repl_tool.ainvoke(inputs) for inputs, _ in jobs))
+    return _viz_result(jobs, logs)
@@ -1,26 +1,32 @@
 import os
 import json
 import re
-from dotenv import load_dotenv
-load_dotenv()
+import asyncio
+import pandas as pd
 
-from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
 from src.state import AgentState
+from src import tracing
+from src.llm import get_llm
 from src.tools.base import python_repl_tool, extract_code
+from src.tools import datastore
+from src.tools.cache import cached_call, acached_call, prompt_version
+from src.tools.cleaning import clean_csv, wants_custom_cleaning
+from src.tools import gatekeeper, codecheck
+from src.tools.workspace import create_workspace, workspace_file
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+llm = get_llm("gpt-4o")
 
 # GATEKEEPER QUERY REWRITER
-def query_rewriter_node(state: AgentState):
-    print("--- QUERY REWRITER (GATEKEEPER) STARTING ---")
-    
-    original_query = state["messages"][-1].content
+def _original_query(state: AgentState):
+    query = state["messages"][-1].content
     # Default query if user input is empty
-    if not original_query or not original_query.strip():
-        original_query = "Perform general data analysis."
+    if not query or not query.strip():
+        query = "Perform general data analysis."
+    return query
 
-    prompt = f"""You are a Gatekeeper AI for a Data Analysis System with 10 years of expertise.
+def _rewriter_prompt(original_query):
+    return f"""You are a Gatekeeper AI for a Data Analysis System with 10 years of expertise.
     User Input: "{original_query}"
     
     MISSION:
@@ -39,37 +45,94 @@ def query_rewriter_node(state: AgentState):
     - If VALID: "content" should be the refined, technically clear query.
     - If INVALID: "content" should be a polite rejection guiding user back to data analysis.
     """
+
+def _parse_verdict(content):
+    # Parse JSON tu response (loi -> exception, khong luu vao cache)
+    return json.loads(content.replace("```json", "").replace("```", "").strip())
+
+def _rewriter_update(data, original_query, workspace):
+    status = data.get("status", "VALID")
+    payload = data.get("content", original_query)
+    
+    if status == "INVALID":
+        print(f"Request Rejected: {payload}")
+        return {"refusal_reason": payload, "workspace_dir": workspace}
+    
+    print(f"Request Validated: {payload}")
+    return {"refined_query": payload, "refusal_reason": "", "workspace_dir": workspace}
+
+def _local_verdict(original_query):
+    # Clear-cut requests (default query, obvious analysis, greetings, gibberish) skip the gpt-4o call
+    if not gatekeeper.GATEKEEPER_LOCAL:
+        return None
+    verdict = gatekeeper.classify_query(original_query)
+    if verdict is not None:
+        print(f"Gatekeeper (local): {verdict['status']}")
+    return verdict
+
+def _rewriter_fallback(e, original_query, workspace):
+    # Fallback neu JSON loi
+    print(f"JSON Parse Error: {e}. Proceeding as valid.")
+    return {"refined_query": original_query, "refusal_reason": "", "workspace_dir": workspace}
+
+def query_rewriter_node(state: AgentState):
+    print("--- QUERY REWRITER (GATEKEEPER) STARTING ---")
+    # Entry node: make sure the run has its own workspace
+    workspace = state.get("workspace_dir") or create_workspace()
+    original_query = _original_query(state)
+    verdict = _local_verdict(original_query)
+    if verdict is not None:
+        return _rewriter_update(verdict, original_query, workspace)
+    prompt = _rewriter_prompt(original_query)
+    
+    def classify():
+        return _parse_verdict(llm.invoke([SystemMessage(content=prompt)]).content)
     
     try:
-        response = llm.invoke([SystemMessage(content=prompt)])
-        # Parse JSON tu response
-        content = response.content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(content)
-        
-        status = data.get("status", "VALID")
-        payload = data.get("content", original_query)
-        
-        if status == "INVALID":
-            print(f"Request Rejected: {payload}")
-            return {"refusal_reason": payload}
-        
-        print(f"Request Validated: {payload}")
-        return {"refined_query": payload, "refusal_reason": ""}
-        
+        return _rewriter_update(cached_call("rewriter", [prompt_version(llm, prompt), original_query], classify, state), original_query, workspace)
     except Exception as e:
-        # Fallback neu JSON loi
-        print(f"JSON Parse Error: {e}. Proceeding as valid.")
-        return {"refined_query": original_query, "refusal_reason": ""}
+        return _rewriter_fallback(e, original_query, workspace)
 
-# DATA CLEANING 
-def data_cleaning_node(state: AgentState):
-    print("--- DATA CLEANING AGENT WORKING ---")
-    csv_path = state.get("csv_file_path", "uploaded_data.csv")
-    cleaned_path = "cleaned_data.csv"
+async def aquery_rewriter_node(state: AgentState):
+    print("--- QUERY REWRITER (GATEKEEPER) STARTING ---")
+    workspace = state.get("workspace_dir") or await asyncio.to_thread(create_workspace)
+    original_query = _original_query(state)
+    verdict = _local_verdict(original_query)
+    if verdict is not None:
+        return _rewriter_update(verdict, original_query, workspace)
+    prompt = _rewriter_prompt(original_query)
+    
+    async def classify():
+        return _parse_verdict((await llm.ainvoke([SystemMessage(content=prompt)])).content)
     
-    prompt = f"""You are a Senior Data Engineer with 10+ years of experience.
+    try:
+        return _rewriter_update(await acached_call("rewriter", [prompt_version(llm, prompt), original_query], classify, state), original_query, workspace)
+    except Exception as e:
+        return _rewriter_fallback(e, original_query, workspace)
+
+# DATA CLEANING 
+def _native_cleaning(csv_path):
+    # Fast path: default cleaning rules run natively, no LLM call.
+    # Result is stored once per file content (Feather) and reused on re-upload
+    try:
+        dataset_path, stats = clean_csv(csv_path)
+        print(f"Cleaning Success ({stats['engine']}): {stats['rows_after']} rows, {stats['duplicates_removed']} duplicates removed (cache hit: {stats['cache_hit']})")
+        # No cleaned CSV copy: downstream agents read dataset_path
+        result = {"cleaned_csv_path": "", "dataset_path": dataset_path, "cleaning_stats": stats}
+        if stats["engine"] == "streaming":
+            # Large file: agents work on a row sample plus exact aggregates
+            result["sample_path"] = datastore.sample_file(dataset_path)
+        return result
+    except Exception as e:
+        print(f"Native Cleaning Error: {e}")
+        return {"cleaned_csv_path": csv_path, "cleaning_stats": {"engine": "native", "error": str(e)}}
+
+def _cleaning_prompt(csv_path, cleaned_path, query):
+    # Custom cleaning requested -> LLM adapts the template to the user's instructions
+    return f"""You are a Senior Data Engineer with 10+ years of experience.
     Source data file: '{csv_path}'.
-    TASK: Write a Python script to clean the data.
+    User request: "{query}"
+    TASK: Write a Python script to clean the data. Start from the pattern below and adapt it ONLY to satisfy the cleaning instructions in the user request.
     REQUIRED CODE PATTERN (STRICT):
     ```python
     import pandas as pd
@@ -93,12 +156,74 @@ def data_cleaning_node(state: AgentState):
     except Exception as e: print(f"Cleaning Error: {{str(e)}}")
     ```
     """
-    code_gen = llm.invoke([SystemMessage(content=prompt)])
-    code = extract_code(code_gen.content)
-    result = python_repl_tool.invoke(code)
-    
+
+def _custom_cleaning_result(csv_path, cleaned_path, result):
     # Return cleaned file path if successful, otherwise return original
     if os.path.exists(cleaned_path):
-        return {"cleaned_csv_path": cleaned_path}
+        # Parse the custom result once into the columnar store for the downstream agents
+        try:
+            tracing.record_csv_read(cleaned_path)
+            df = pd.read_csv(cleaned_path)
+            dataset_path = datastore.store(datastore.dataset_key(cleaned_path, "custom"), df)
+        except Exception as e:
+            print(f"Dataset Store Error: {e}")
+            dataset_path = ""
+        return {"cleaned_csv_path": cleaned_path, "dataset_path": dataset_path, "cleaning_stats": {"engine": "llm"}}
     else:
-        return {"cleaned_csv_path": csv_path}
\ No newline at end of file
+        return {"cleaned_csv_path": csv_path, "cleaning_stats": {"engine": "llm", "error": result}}
+
+def _check_code(content, csv_path, stage="first"):
+    """Extract and statically validate generated cleaning code against the CSV header (src/tools/codecheck.py)"""
+    code = extract_code(content)
+    if not codecheck.CODECHECK_ENABLED:
+        return {"ok": True, "code": code, "issues": []}
+    check = codecheck.validate(code, codecheck.csv_columns(csv_path), codecheck.is_large(csv_path))
+    codecheck.record(check, stage)
+    return check
+
+def _retry_messages(messages, code_gen, check, csv_path):
+    # Single targeted regeneration: the previous answer plus what is wrong with it
+    return messages + [AIMessage(content=code_gen.content),
+                       HumanMessage(content=codecheck.feedback(check, codecheck.csv_columns(csv_path)))]
+
+def data_cleaning_node(state: AgentState):
+    print("--- DATA CLEANING AGENT WORKING ---")
+    csv_path = state.get("csv_file_path", "uploaded_data.csv")
+    cleaned_path = workspace_file(state, "cleaned_data.csv")
+    query = state.get("refined_query", "")
+    
+    if not wants_custom_cleaning(query):
+        return _native_cleaning(csv_path)
+    
+    messages = [SystemMessage(content=_cleaning_prompt(csv_path, cleaned_path, query))]
+    code_gen = llm.invoke(messages)
+    check = _check_code(code_gen.content, csv_path)
+    if not check["ok"]:
+        check = _check_code(llm.invoke(_retry_messages(messages, code_gen, check, csv_path)).content, csv_path, "retry")
+    if not check["ok"]:
+        print("Cleaning code failed the code check twice: using the native cleaning rules")
+        return _native_cleaning(csv_path)
+    result = python_repl_tool.invoke(check["code"])
+    return _custom_cleaning_result(csv_path, cleaned_path, result)
+
+async def adata_cleaning_node(state: AgentState):
+    print("--- DATA CLEANING AGENT WORKING ---")
+    csv_path = state.get("csv_file_path", "uploaded_data.csv")
+    cleaned_path = workspace_file(state, "cleaned_data.csv")
+    query = state.get("refined_query", "")
+    
+    # Native cleaning is CPU bound: run it off the event loop
+    if not wants_custom_cleaning(query):
+        return await asyncio.to_thread(_native_cleaning, csv_path)
+    
+    messages = [SystemMessage(content=_cleaning_prompt(csv_path, cleaned_path, query))]
+    code_gen = await llm.ainvoke(messages)
+    check = await asyncio.to_thread(_check_code, code_gen.content, csv_path)
+    if not check["ok"]:
+        retry = await llm.ainvoke(await asyncio.to_thread(_retry_messages, messages, code_gen, check, csv_path))
+        check = await asyncio.to_thread(_check_code, retry.content, csv_path, "retry")
+    if not check["ok"]:
+        print("Cleaning code failed the code check twice: using the native cleaning rules")
+        return await asyncio.to_thread(_native_cleaning, csv_path)
+    result = await python_repl_tool.ainvoke(check["code"])
+    return await asyncio.to_thread(_custom_cleaning_result, csv_path, cleaned_path, result)
@@ -1,10 +1,68 @@
-from dotenv import load_dotenv
-load_dotenv()
-from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
+import os
+import time
+import asyncio
+import inspect
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from src.state import AgentState
+from src.llm import get_llm
+from src.tools.cache import cached_node, prompt_version
+from src.tools.prompts import build_messages, compact_text, REPORT_EDA_TOKENS
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+llm = get_llm("gpt-4o-mini")
+
+# Sections are independent, so they are generated concurrently (wall time ~ slowest call)
+SECTION_TIMEOUT = float(os.getenv("REPORT_SECTION_TIMEOUT", "60"))
+SECTION_FALLBACK = "This section could not be generated ({reason}). Please refer to the other sections and charts."
+
+def generate_sections(prompts, timeout=SECTION_TIMEOUT):
+    """Invoke one prompt (message list) per section in parallel, returning a fallback text for failed/slow sections"""
+    def run_section(idx, messages):
+        # Tag lets streaming consumers (app.py) route tokens to the right section
+        return llm.invoke(messages, config={"tags": [f"section_{idx}"]}).content.strip()
+
+    executor = ThreadPoolExecutor(max_workers=len(prompts))
+    # copy_context() carries the graph's run config into the threads, so token streaming still works
+    futures = [executor.submit(contextvars.copy_context().run, run_section, idx, p)
+               for idx, p in enumerate(prompts, start=1)]
+    
+    # All sections start together, so one deadline gives each the same time budget
+    deadline = time.monotonic() + timeout
+    results = []
+    for idx, future in enumerate(futures, start=1):
+        try:
+            results.append(future.result(timeout=max(0, deadline - time.monotonic())))
+        except FutureTimeout:
+            print(f"Section {idx} timed out after {timeout}s")
+            results.append(SECTION_FALLBACK.format(reason="timeout"))
+        except Exception as e:
+            print(f"Section {idx} failed: {e}")
+            results.append(SECTION_FALLBACK.format(reason="generation error"))
+    
+    # Don't block the graph on stragglers
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+async def agenerate_sections(prompts, timeout=SECTION_TIMEOUT):
+    """Async generate_sections: one task per section, stragglers are cancelled at the deadline"""
+    async def run_section(idx, messages):
+        response = await llm.ainvoke(messages, config={"tags": [f"section_{idx}"]})
+        return response.content.strip()
+
+    tasks = [asyncio.create_task(run_section(idx, p)) for idx, p in enumerate(prompts, start=1)]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    results = []
+    for idx, task in enumerate(tasks, start=1):
+        if task in pending:
+            task.cancel()
+            print(f"Section {idx} timed out after {timeout}s")
+            results.append(SECTION_FALLBACK.format(reason="timeout"))
+        elif task.exception() is not None:
+            print(f"Section {idx} failed: {task.exception()}")
+            results.append(SECTION_FALLBACK.format(reason="generation error"))
+        else:
+            results.append(task.result())
+    return results
 
 def validation_node(state: AgentState):
     """Validate analysis completeness - EDA is essential, visualization is optional"""
@@ -12,19 +70,20 @@ def validation_node(state: AgentState):
     if eda: return {"validation_status": "SUCCESS"}
     return {"validation_status": "PARTIAL"}
 
-def reporting_node(state: AgentState):
-    print("--- REPORTING AGENT ---")
-    
-    eda = state.get("eda_report", "")
-    query = state.get("refined_query", "")
-    
-    # Base system prompt - adapts like a 10-year experienced data analyst
-    base_instruction = f"""
+def report_complete(result):
+    # Reports with fallback sections are not cached, the next run retries them
+    return SECTION_FALLBACK.split("(")[0] not in result.get("final_report", "")
+
+report_key = lambda state: [state.get("refined_query", ""), state.get("eda_report", "")]
+
+# Static part of every section prompt: no request / EDA inside, so it is an identical prefix across runs
+BASE_INSTRUCTIONS = """
     YOU ARE A SENIOR DATA ANALYST WITH 10+ YEARS OF EXPERIENCE.
     
-    INPUT:
-    - User Request: "{query}" (If empty, perform general analysis).
-    - EDA Results: {eda}
+    INPUT (in the user message):
+    - User Request (If empty, perform general analysis).
+    - EDA Results.
+    - The report section to write.
     
     CRITICAL RULES - MUST FOLLOW:
     1. **ONLY USE ACTUAL DATA**: Never fabricate, assume, or guess numbers/statistics
@@ -50,21 +109,19 @@ def reporting_node(state: AgentState):
        - Use phrases like "Based on the data...", "The analysis shows..."
        - If uncertain, say "The available data suggests..." or "Based on limited information..."
     """
-    
+
+SECTION_TASKS = [
     # Section 1: Overview
-    prompt_p1 = f"""{base_instruction}
-    Write SECTION 1 (Overview):
+    """Write SECTION 1 (Overview):
     - What does this dataset ACTUALLY contain? (Use real column names and data types)
     - EXACT data scale (state precise row and column counts from EDA)
     - ACTUAL data quality issues (missing values, outliers - cite specific percentages)
     - Keep objective tone, report ONLY what's in the data
     
     REMEMBER: Every statement must be verifiable from the EDA results above.
-    """
-    
+    """,
     # Section 2: Detailed Analysis
-    prompt_p2 = f"""{base_instruction}
-    Write SECTION 2 (Detailed Analysis):
+    """Write SECTION 2 (Detailed Analysis):
     - Report ACTUAL findings from the data (cite specific numbers, percentages, values)
     - Describe REAL distribution patterns with concrete examples
     - If data shows trends, state them with supporting numbers
@@ -72,11 +129,9 @@ def reporting_node(state: AgentState):
     
     FORBIDDEN: Making up statistics, inventing trends, or stating conclusions not supported by data.
     REQUIRED: Every insight must reference actual values from the EDA.
-    """
-    
+    """,
     # Section 3: Insights & Actions
-    prompt_p3 = f"""{base_instruction}
-    Write SECTION 3 (Insights & Recommendations):
+    """Write SECTION 3 (Insights & Recommendations):
     - If data reveals clear patterns -> State them with supporting evidence from EDA
     - Provide recommendations ONLY if they logically follow from the actual data
     - If data is limited/unclear -> State: "Based on the available data, [specific limitation]. More data needed for [specific aspect]."
@@ -87,15 +142,33 @@ def reporting_node(state: AgentState):
     - Don't make bold claims without numerical evidence
     - Be transparent about data limitations
     - If you're uncertain, say so clearly
-    """
-    
-    res_p1 = llm.invoke([SystemMessage(content=prompt_p1)]).content.strip()
-    res_p2 = llm.invoke([SystemMessage(content=prompt_p2)]).content.strip()
-    res_p3 = llm.invoke([SystemMessage(content=prompt_p3)]).content.strip()
-    
+    """,
+]
+
+REPORT_VERSION = prompt_version(llm, BASE_INSTRUCTIONS, *SECTION_TASKS, REPORT_EDA_TOKENS)
+
+def _section_prompts(state: AgentState):
+    """One message list per section: static rules, then request + EDA (same for all three), then the section task"""
+    eda = compact_text(state.get("eda_report", ""), REPORT_EDA_TOKENS)
+    query = state.get("refined_query", "")
+    data = f'User Request: "{query}"\n\nEDA Results:\n{eda}\n\n'
+    return [build_messages(BASE_INSTRUCTIONS, data + inspect.cleandoc(task)) for task in SECTION_TASKS]
+
+def _combine_sections(sections):
     def clean_text(text):
         return text.replace("##", "").strip()
 
+    res_p1, res_p2, res_p3 = sections
     final_combined = f"{clean_text(res_p1)}|||{clean_text(res_p2)}|||{clean_text(res_p3)}"
     
-    return {"final_report": final_combined}
\ No newline at end of file
+    return {"final_report": final_combined}
+
+@cached_node("report", report_key, REPORT_VERSION, cacheable=report_complete)
+def reporting_node(state: AgentState):
+    print("--- REPORTING AGENT ---")
+    return _combine_sections(generate_sections(_section_prompts(state)))
+
+@cached_node("report", report_key, REPORT_VERSION, cacheable=report_complete)
+async def areporting_node(state: AgentState):
+    print("--- REPORTING AGENT ---")
+    return _combine_sections(await agenerate_sections(_section_prompts(state)))
\ No newline at end of file
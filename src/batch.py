@@ -0,0 +1,217 @@
+"""
+Headless batch runner: analyse many CSVs with the agent graph, without the UI.
+
+    python -m src.batch --input exports/ --output reports/ --workers 8
+    python -m src.batch --manifest jobs.csv --output reports/ --executor process --workers 4 --llm-rps 2
+
+A manifest is a CSV / JSON-lines file with a `csv_path` column and an optional `query` column.
+Each job writes report.md, report.pdf and its charts to <output>/<job id>/. Finished jobs are
+recorded in <output>/batch_state.jsonl, so re-running the same command resumes after a crash.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+DEFAULT_QUERY = "Perform a general analysis of this dataset"
+STATE_FILE = "batch_state.jsonl"
+SUMMARY_FILE = "summary.json"
+SECTION_TITLES = ["1. Data Overview", "2. Detailed Analysis", "3. Insights & Recommendations"]
+
+def job_id(csv_path: str, query: str) -> str:
+    """Stable id (and output folder name) of a (file, query) job"""
+    digest = hashlib.blake2b(f"{os.path.abspath(csv_path)}|{query}".encode(), digest_size=4).hexdigest()
+    return f"{os.path.splitext(os.path.basename(csv_path))[0]}-{digest}"
+
+def load_jobs(input_dir=None, manifest=None, query=None):
+    """[{id, csv_path, query}] from a directory of CSVs or a manifest file"""
+    query = query or DEFAULT_QUERY
+    rows = []
+    if manifest:
+        import pandas as pd
+        frame = pd.read_json(manifest, lines=True) if manifest.endswith((".jsonl", ".json")) else pd.read_csv(manifest)
+        base = os.path.dirname(os.path.abspath(manifest))
+        for record in frame.to_dict("records"):
+            path = str(record["csv_path"])
+            job_query = record.get("query")
+            rows.append((path if os.path.isabs(path) else os.path.join(base, path),
+                         job_query if isinstance(job_query, str) and job_query.strip() else query))
+    if input_dir:
+        for name in sorted(os.listdir(input_dir)):
+            if name.lower().endswith(".csv"):
+                rows.append((os.path.join(input_dir, name), query))
+    jobs, seen = [], set()
+    for path, job_query in rows:
+        jid = job_id(path, job_query)
+        if jid not in seen:
+            seen.add(jid)
+            jobs.append({"id": jid, "csv_path": path, "query": job_query})
+    return jobs
+
+def load_state(output_dir):
+    """Latest record per job id from the state file (a torn last line from a crash is ignored)"""
+    records = {}
+    path = os.path.join(output_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record["id"]] = record
+    return records
+
+def _init_process(limits, initializer):
+    if initializer:
+        initializer()
+    from src import llm
+    # 0 = keep the LLM_RPM / LLM_TPM settings
+    llm.set_limits(**{kind: value for kind, value in limits.items() if value})
+
+def write_outputs(job_dir, query, result):
+    """report.md + report.pdf next to the charts the graph saved in job_dir"""
+    from src.tools.pdf import create_pdf
+    parts = result.get("final_report", "").split("|||")
+    if len(parts) < 3: parts = [result.get("final_report", ""), "No Data", "No Data"]
+    charts = [os.path.join(job_dir, f"chart_{i}.png") for i in (1, 2)]
+    charts = [c if os.path.exists(c) else None for c in charts]
+
+    with open(os.path.join(job_dir, "report.md"), "w", encoding="utf-8") as f:
+        f.write(f"# Data Analysis Report\n\n_Request: {query}_\n\n")
+        for idx, (title, body) in enumerate(zip(SECTION_TITLES, parts)):
+            f.write(f"## {title}\n\n{body.strip()}\n\n")
+            if idx < 2 and charts[idx]:
+                f.write(f"![Chart {idx + 1}]({os.path.basename(charts[idx])})\n\n")
+    with open(os.path.join(job_dir, "report.pdf"), "wb") as f:
+        f.write(create_pdf(parts[0], parts[1], parts[2], charts[0], charts[1]))
+
+def run_job(job, output_dir):
+    """Analyse one CSV. Returns the state record (never raises)."""
+    from langchain_core.messages import HumanMessage
+    from src.graph import get_app
+    job_dir = os.path.join(output_dir, job["id"])
+    os.makedirs(job_dir, exist_ok=True)
+    record = {"id": job["id"], "csv_path": job["csv_path"], "query": job["query"], "started": time.time()}
+    try:
+        if not os.path.isfile(job["csv_path"]):
+            raise FileNotFoundError(job["csv_path"])
+        # The job folder is the run workspace: charts land directly in the output
+        result = get_app().invoke({
+            "messages": [HumanMessage(content=job["query"])],
+            "csv_file_path": job["csv_path"],
+            "workspace_dir": job_dir,
+        })
+        if result.get("refusal_reason"):
+            record.update(status="rejected", error=result["refusal_reason"])
+        elif not result.get("final_report"):
+            record.update(status="failed", error="no report generated")
+        else:
+            write_outputs(job_dir, job["query"], result)
+            record.update(status="ok", charts=len(result.get("viz_images", [])),
+                          node_seconds={n: t["seconds"] for n, t in result.get("node_timings", {}).items()})
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.time() - record["started"], 3)
+    return record
+
+def summarize(records, wall_seconds):
+    """Throughput, latency percentiles and failures of a batch"""
+    latencies = sorted(r["seconds"] for r in records)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else None
+    counts = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {
+        "jobs": len(records),
+        **counts,
+        "wall_seconds": round(wall_seconds, 2),
+        "jobs_per_minute": round(len(records) / wall_seconds * 60, 2) if wall_seconds else None,
+        "latency_s": {"p50": pct(0.5), "p90": pct(0.9), "p99": pct(0.99), "max": latencies[-1] if latencies else None},
+        "failures": [{"id": r["id"], "status": r["status"], "error": r.get("error", "")}
+                     for r in records if r["status"] != "ok"],
+    }
+
+def run_batch(jobs, output_dir, workers=4, executor="thread", llm_rps=0.0, retry_failed=False, initializer=None, llm_tpm=0):
+    """
+    Run all jobs not finished yet. executor: "thread" (one process, shared REPL pool) or "process"
+    (one graph per worker process). llm_rps: LLM requests per second, all models together; llm_tpm:
+    tokens per minute per model; both across the whole batch. Returns the summary of the jobs run in this invocation.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = load_state(output_dir)
+    finished = ("ok", "rejected", "failed") if not retry_failed else ("ok", "rejected")
+    todo = [j for j in jobs if done.get(j["id"], {}).get("status") not in finished]
+    print(f"Batch: {len(jobs)} jobs, {len(jobs) - len(todo)} already finished, {len(todo)} to run")
+
+    # A per-second limit allows one second of requests at once, not a minute's worth
+    limits = {"rpm": llm_rps * 60, "tpm": llm_tpm, "rpm_burst": llm_rps}
+    if executor == "process":
+        # Each process has its own gateway, so the batch-wide budget is split between them
+        limits = {kind: value / workers for kind, value in limits.items()}
+    if limits["rpm_burst"]:
+        limits["rpm_burst"] = max(1.0, limits["rpm_burst"])
+    # Requests per second count all models together (gpt-4o and gpt-4o-mini), as --llm-rps promises
+    limits["rpm_shared"] = True
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                   initializer=_init_process, initargs=(limits, initializer))
+    else:
+        _init_process(limits, initializer)
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+    records = []
+    start = time.time()
+    with pool, open(os.path.join(output_dir, STATE_FILE), "a+") as state:
+        # A crash mid-write leaves a torn last line: start on a fresh one
+        if state.tell():
+            state.seek(state.tell() - 1)
+            if state.read(1) != "\n":
+                state.write("\n")
+        futures = {pool.submit(run_job, job, output_dir): job for job in todo}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:  # worker process died
+                job = futures[future]
+                record = {"id": job["id"], "csv_path": job["csv_path"], "query": job["query"],
+                          "status": "failed", "error": f"{type(e).__name__}: {e}", "seconds": 0.0}
+            # One line per finished job, flushed right away: this is the resume point
+            state.write(json.dumps(record, default=str) + "\n")
+            state.flush()
+            os.fsync(state.fileno())
+            records.append(record)
+            print(f"[{len(records)}/{len(todo)}] {record['id']}: {record['status']} ({record['seconds']:.1f}s)")
+
+    summary = summarize(records, time.time() - start)
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse many CSV files with the data analyst agents")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="directory of CSV files")
+    source.add_argument("--manifest", help="CSV / JSON-lines file with csv_path and optional query columns")
+    parser.add_argument("--output", required=True, help="output directory (also holds the resume state)")
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="request used when the manifest has none")
+    parser.add_argument("--workers", type=int, default=4, help="jobs running in parallel")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--llm-rps", type=float, default=0.0, help="max LLM requests per second, all models together (0 = unlimited)")
+    parser.add_argument("--llm-tpm", type=int, default=0, help="max LLM tokens per minute per model (0 = unlimited)")
+    parser.add_argument("--retry-failed", action="store_true", help="re-run jobs that failed in a previous run")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.input, args.manifest, args.query)
+    summary = run_batch(jobs, args.output, args.workers, args.executor, args.llm_rps, args.retry_failed, llm_tpm=args.llm_tpm)
+    print(json.dumps({k: v for k, v in summary.items() if k != "failures"}, indent=2))
+    for failure in summary["failures"]:
+        print(f"  {failure['status']}: {failure['id']} - {failure['error'][:200]}")
+    return 0 if not summary["failures"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,117 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import InMemorySaver
 from src.state import AgentState
+from src import llm, tracing
+from src.tools.cleaning import wants_custom_cleaning
 
-from src.agents.prep import query_rewriter_node, data_cleaning_node
-from src.agents.analysis import eda_agent_node, viz_agent_node
-from src.agents.reporting import validation_node, reporting_node
+from src.agents.prep import query_rewriter_node, data_cleaning_node, aquery_rewriter_node, adata_cleaning_node
+from src.agents.analysis import profiling_node, eda_agent_node, viz_agent_node, aprofiling_node, aeda_agent_node, aviz_agent_node, EDA_ERROR
+from src.agents.reporting import validation_node, reporting_node, areporting_node
 
-workflow = StateGraph(AgentState)
+SESSION_MAX_THREADS = int(os.getenv("SESSION_MAX_THREADS", "200"))  # follow-up threads kept in memory
 
-# Nodes
-workflow.add_node("rewriter", query_rewriter_node)
-workflow.add_node("cleaner", data_cleaning_node)
-workflow.add_node("eda", eda_agent_node)
-workflow.add_node("viz", viz_agent_node)
-workflow.add_node("validation", validation_node)
-workflow.add_node("report", reporting_node)
+# Agent DAG: node -> (function, upstream nodes).
+# A node runs once all its upstream nodes finished; nodes that become ready together run concurrently.
+PIPELINE = {
+    "rewriter": (query_rewriter_node, []),
+    "cleaner": (data_cleaning_node, ["rewriter"]),
+    "profiler": (profiling_node, ["cleaner"]),   # fast, no LLM: produces date/target/group hints
+    "eda": (eda_agent_node, ["profiler"]),
+    "viz": (viz_agent_node, ["profiler"]),
+    "validation": (validation_node, ["eda", "viz"]),
+    "report": (reporting_node, ["validation"]),
+}
+
+# Async versions used by app.ainvoke / app.astream (nodes without one run the sync version in a thread)
+ASYNC_NODES = {
+    "rewriter": aquery_rewriter_node,
+    "cleaner": adata_cleaning_node,
+    "profiler": aprofiling_node,
+    "eda": aeda_agent_node,
+    "viz": aviz_agent_node,
+    "report": areporting_node,
+}
+
+def timed(name, node, anode=None):
+    """
+    Wrap a node in a trace span: start/end time, LLM usage, REPL executions and CSV bytes read
+    go to state["node_timings"] (and TRACE_FILE). The entry node starts a new trace per run.
+    """
+    upstream = PIPELINE[name][1]
+
+    def begin(state):
+        return state.get("trace_id") if upstream and state.get("trace_id") else tracing.new_trace_id()
+
+    def finish(result, start, trace_id, usage, metrics):
+        end = time.time()
+        timing = {"trace_id": trace_id, "start": start, "end": end, "seconds": round(end - start, 3)}
+        if usage:
+            timing["llm"] = usage  # calls, requests, retries, tokens of this node in this run
+        # repl: executions / seconds / peak MB, csv: bytes read, prompt: prompts built / tokens, memory: process RSS,
+        # charts: render / encode ms and bytes of each chart version
+        timing.update({k: v for k, v in metrics.items() if k in ("repl", "csv", "memory", "prompt", "charts")})
+        update = {**(result or {}), "node_timings": {name: timing}}
+        if not upstream:
+            update["trace_id"] = trace_id
+        return update
+
+    def run(state):
+        start, trace_id = time.time(), begin(state)
+        with tracing.node_span(name, trace_id, upstream) as metrics:
+            with llm.track(name) as usage:
+                result = node(state)
+            metrics["llm"] = usage
+        return finish(result, start, trace_id, usage, metrics)
+
+    async def arun(state):
+        start, trace_id = time.time(), begin(state)
+        with tracing.node_span(name, trace_id, upstream) as metrics:
+            with llm.track(name) as usage:
+                result = await anode(state)
+            metrics["llm"] = usage
+        return finish(result, start, trace_id, usage, metrics)
+
+    # One runnable, both entry points: invoke/stream use run, ainvoke/astream use arun
+    return RunnableLambda(run, afunc=arun if anode else None, name=name)
+
+def critical_path(node_timings):
+    """Longest chain of dependent nodes by measured duration. Returns (nodes, seconds)."""
+    durations = {n: node_timings[n].get("seconds", 0) for n in PIPELINE if n in node_timings}
+    return tracing.critical_path(durations, {n: upstream for n, (_, upstream) in PIPELINE.items()})
+
+def can_reuse_analysis(state: AgentState):
+    """
+    Follow-up question on an already analysed file (state restored from the thread's checkpoint):
+    cleaning, profile, EDA and charts don't depend on the new wording, only the report does.
+    """
+    eda = state.get("eda_report", "")
+    if not eda or eda == EDA_ERROR or state.get("analyzed_file") != state.get("csv_file_path"):
+        return False
+    if wants_custom_cleaning(state.get("refined_query", "")):
+        return False  # new cleaning instructions change everything downstream
+    # Workspace may have been cleaned up by the retention policy in the meantime
+    cleaned = state.get("dataset_path") or state.get("cleaned_csv_path", "")
+    return all(path and os.path.exists(path) for path in [cleaned, *state.get("viz_images", [])])
 
 def check_relevance(state: AgentState):
     if state.get("refusal_reason"):
         return END
+    if can_reuse_analysis(state):
+        print("--- FOLLOW-UP: REUSING CLEANED DATA, PROFILE, EDA & CHARTS ---")
+        return "report"
     return "cleaner"
 
+workflow = StateGraph(AgentState)
+
+# Nodes
+for name, (node, _) in PIPELINE.items():
+    workflow.add_node(name, timed(name, node, ASYNC_NODES.get(name)))
+
 # Edges
 workflow.add_edge(START, "rewriter")
 workflow.add_conditional_edges(
@@ -27,17 +119,67 @@ workflow.add_conditional_edges(
     check_relevance,
     {
         END: END,
-        "cleaner": "cleaner"
+        "cleaner": "cleaner",
+        "report": "report"
     }
 )
 
-workflow.add_edge("cleaner", "eda")
-workflow.add_edge("cleaner", "viz")
+for name, (_, upstream) in PIPELINE.items():
+    if not upstream or upstream == ["rewriter"]:
+        continue  # entry node / gated by check_relevance
+    # A list of sources makes the node wait for all of them (join)
+    workflow.add_edge(upstream if len(upstream) > 1 else upstream[0], name)
+
+downstream = {dep for _, upstream in PIPELINE.values() for dep in upstream}
+for name in PIPELINE:
+    if name not in downstream:
+        workflow.add_edge(name, END)
+
+class SessionSaver(InMemorySaver):
+    """In-memory checkpointer that keeps only the most recently used threads"""
+    def __init__(self, max_threads=SESSION_MAX_THREADS):
+        super().__init__()
+        self.max_threads = max_threads
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        with self._recent_lock:
+            self._recent[config["configurable"]["thread_id"]] = None
+            self._recent.move_to_end(config["configurable"]["thread_id"])
+            expired = list(self._recent)[:max(0, len(self._recent) - self.max_threads)]
+            for thread_id in expired:
+                del self._recent[thread_id]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        return result
+
+# Compiled on first use (not at import), once per process
+_compiled = {}
+_compiled_lock = threading.Lock()
 
-workflow.add_edge("eda", "validation")
-workflow.add_edge("viz", "validation")
+def get_app():
+    """The agent graph"""
+    with _compiled_lock:
+        if "app" not in _compiled:
+            _compiled["app"] = workflow.compile()
+    return _compiled["app"]
 
-workflow.add_edge("validation", "report")
-workflow.add_edge("report", END)
+def get_session_app():
+    """
+    Same graph with per-thread state (config={"configurable": {"thread_id": ...}}): a follow-up question
+    on the same file resumes from the thread's checkpoint and only re-runs rewriter + report
+    """
+    with _compiled_lock:
+        if "session_app" not in _compiled:
+            _compiled["session_app"] = workflow.compile(checkpointer=SessionSaver())
+    return _compiled["session_app"]
 
-app = workflow.compile()
\ No newline at end of file
+def __getattr__(name):
+    # `from src.graph import app` keeps working
+    if name == "app":
+        return get_app()
+    if name == "session_app":
+        return get_session_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,351 @@
+"""
+LLM gateway: every agent calls the chat models through get_llm(model).invoke / ainvoke.
+
+- one pooled keep-alive HTTP client shared by all models (one async client per event loop)
+- token buckets on tokens per minute (LLM_TPM) and requests per minute (LLM_RPM), per model
+  (the batch runner's --llm-rps is one requests bucket shared by all models)
+- retries with jittered exponential backoff on 429 / 5xx / timeouts (Retry-After is honoured)
+- single-flight: identical prompts already in flight share one request
+- per-node call / latency / token accounting (graph.timed sets the node with track())
+
+OPENAI_BASE_URL points the gateway at any OpenAI-compatible server (e.g. benchmarks/mock_openai.py).
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import weakref
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))  # pooled HTTP connections per process
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))               # seconds per request
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))                           # tokens per minute per model, 0 = no limit
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))                           # requests per minute per model, 0 = no limit
+BACKOFF_BASE, BACKOFF_MAX = 0.5, 30.0
+COMPLETION_ESTIMATE = 600  # tokens reserved for the answer until the real usage is known
+RETRY_STATUS = {408, 409, 429}
+
+_lock = threading.Lock()
+_limits = {"tpm": LLM_TPM, "rpm": LLM_RPM}
+_bursts = {"tpm": None, "rpm": None}       # bucket capacity (None = one minute of the limit)
+_shared = {"tpm": False, "rpm": False}     # one bucket for all models instead of one per model
+_buckets = {}                              # (model or None if shared, "tpm" | "rpm") -> TokenBucket
+_inflight = {}                             # prompt key -> Future of the leader's response
+_stats = {}                                # node -> counters
+_clients = {}                              # model name -> LLMClient
+_http = None
+_async_http = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient (connections belong to their loop)
+_node = contextvars.ContextVar("llm_node", default=None)
+
+class TokenBucket:
+    """
+    Refills continuously at per_minute / 60 per second, holds at most burst (default per_minute).
+    Callers reserve first and then sleep until the reservation is covered (the balance may go
+    negative), so waiters are served in arrival order.
+    """
+    def __init__(self, per_minute, burst=None):
+        self.capacity = float(burst or per_minute)
+        self.rate = per_minute / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n) -> float:
+        """Take n tokens, return the seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(n, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, n):
+        """Give back (n > 0) or take (n < 0) tokens once the real usage is known"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + n)
+
+def set_limits(tpm=None, rpm=None, rpm_burst=None, rpm_shared=False):
+    """
+    Change the per-model limits of this process (0 = no limit). rpm_burst: requests allowed at once
+    (default: a full minute of rpm), e.g. a per-second limit should not start with a minute's burst.
+    rpm_shared: rpm counts the requests to all models together (a batch-wide requests-per-second limit).
+    """
+    with _lock:
+        if tpm is not None:
+            _limits["tpm"] = tpm
+        if rpm is not None:
+            _limits["rpm"] = rpm
+            _bursts["rpm"] = rpm_burst
+            _shared["rpm"] = rpm_shared
+        _buckets.clear()
+
+def _bucket(model, kind):
+    with _lock:
+        if not _limits[kind]:
+            return None
+        key = (None if _shared[kind] else model, kind)
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(_limits[kind], _bursts[kind])
+        return _buckets[key]
+
+def http_client():
+    """Keep-alive connection pool shared by every model (sync calls)"""
+    global _http
+    import httpx
+    with _lock:
+        if _http is None:
+            _http = httpx.Client(limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS), timeout=LLM_TIMEOUT)
+    return _http
+
+def async_http_client():
+    """Connection pool of the running event loop (async calls)"""
+    import httpx
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if loop not in _async_http:
+            _async_http[loop] = httpx.AsyncClient(limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS), timeout=LLM_TIMEOUT)
+        return _async_http[loop]
+
+# --- accounting ---
+
+@contextmanager
+def track(node):
+    """Attribute LLM calls made inside the block to `node`; yields that node's counters for this run"""
+    usage = {}
+    token = _node.set((node, usage))
+    try:
+        yield usage
+    finally:
+        _node.reset(token)
+
+def current_node():
+    """Node the running LLM call is attributed to (None outside track())"""
+    tracked = _node.get()
+    return tracked[0] if tracked else None
+
+def _record(**counts):
+    node, usage = _node.get() or ("other", None)
+    with _lock:
+        for target in (_stats.setdefault(node, {}), usage):
+            if target is not None:
+                for name, value in counts.items():
+                    target[name] = round(target.get(name, 0) + value, 3)
+
+def usage_stats():
+    """{node: {calls, requests, coalesced, retries, errors, seconds, prompt_tokens, completion_tokens}} since start"""
+    with _lock:
+        return {node: dict(counts) for node, counts in _stats.items()}
+
+def reset_usage_stats():
+    with _lock:
+        _stats.clear()
+
+# --- retries ---
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retrying `error`, None if it is not transient"""
+    import openai
+    retry_after = None
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code not in RETRY_STATUS and error.status_code < 500:
+            return None
+        retry_after = error.response.headers.get("retry-after")
+    elif not isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return None
+    # Full jitter: concurrent callers that failed together don't retry together
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    try:
+        return max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        return delay
+
+class _Abandoned(Exception):
+    """The leader of a coalesced call was cancelled: followers make their own call"""
+
+class LLMClient:
+    """Chat model behind the gateway. Same invoke / ainvoke signature as the LangChain model."""
+
+    def __init__(self, model_name, temperature=0):
+        self.model_name = model_name
+        self.temperature = temperature
+        self._fixed = None  # model set from outside (e.g. benchmarks/fakes.py)
+        self._sync = None
+        self._async = weakref.WeakKeyDictionary()
+
+    def _build(self, **clients):
+        from langchain_openai import ChatOpenAI
+        # Retries are done here, stream_usage gives token counts for streamed calls too
+        return ChatOpenAI(model=self.model_name, temperature=self.temperature, max_retries=0,
+                          timeout=LLM_TIMEOUT, stream_usage=True, **clients)
+
+    @property
+    def model(self):
+        if self._fixed is not None:
+            return self._fixed
+        if self._sync is None:
+            self._sync = self._build(http_client=http_client())
+        return self._sync
+
+    @model.setter
+    def model(self, model):
+        self._fixed = model
+
+    def _async_model(self):
+        if self._fixed is not None:
+            return self._fixed
+        loop = asyncio.get_running_loop()
+        if loop not in self._async:
+            self._async[loop] = self._build(http_async_client=async_http_client())
+        return self._async[loop]
+
+    def _key(self, messages, config):
+        if self.temperature:
+            return None  # sampled answers are not interchangeable: no coalescing
+        tags = (config or {}).get("tags")
+        raw = json.dumps([self.model_name, self.temperature, [(m.type, m.content) for m in messages], tags], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _reserve(self, messages):
+        """Reserve rate-limit budget for one request: (token estimate, seconds to wait)"""
+        estimate = sum(len(str(m.content)) for m in messages) // 4 + COMPLETION_ESTIMATE
+        wait = 0.0
+        for kind, amount in (("tpm", estimate), ("rpm", 1)):
+            bucket = _bucket(self.model_name, kind)
+            if bucket:
+                wait = max(wait, bucket.reserve(amount))
+        return estimate, wait
+
+    def _settle(self, estimate, response=None):
+        """Correct the token reservation with the real usage (a failed request used none)"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        bucket = _bucket(self.model_name, "tpm")
+        if bucket:
+            bucket.adjust(estimate - usage.get("total_tokens", estimate if response is not None else 0))
+        if usage:
+            _record(prompt_tokens=usage.get("input_tokens", 0), completion_tokens=usage.get("output_tokens", 0))
+
+    def _call(self, messages, config):
+        start = time.time()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            estimate, wait = self._reserve(messages)
+            if wait:
+                time.sleep(wait)
+            try:
+                _record(requests=1)
+                response = self.model.invoke(messages, config=config)
+                break
+            except Exception as e:
+                self._settle(estimate)
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == LLM_MAX_RETRIES:
+                    _record(errors=1)
+                    raise
+                print(f"LLM retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s: {type(e).__name__}")
+                _record(retries=1)
+                time.sleep(delay)
+        self._settle(estimate, response)
+        _record(seconds=time.time() - start)
+        return response
+
+    async def _acall(self, messages, config):
+        start = time.time()
+        model = self._async_model()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            estimate, wait = self._reserve(messages)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                _record(requests=1)
+                response = await model.ainvoke(messages, config=config)
+                break
+            except Exception as e:
+                self._settle(estimate)
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == LLM_MAX_RETRIES:
+                    _record(errors=1)
+                    raise
+                print(f"LLM retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s: {type(e).__name__}")
+                _record(retries=1)
+                await asyncio.sleep(delay)
+        self._settle(estimate, response)
+        _record(seconds=time.time() - start)
+        return response
+
+    def _join(self, key):
+        """(future, is_leader) for a prompt key"""
+        if key is None:
+            return Future(), True
+        with _lock:
+            if key in _inflight:
+                return _inflight[key], False
+            _inflight[key] = Future()
+            return _inflight[key], True
+
+    def _release(self, key, future, result=None, error=None):
+        with _lock:
+            _inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def invoke(self, messages, config=None):
+        _record(calls=1)
+        key = self._key(messages, config)
+        future, leader = self._join(key)
+        if not leader:
+            _record(coalesced=1)
+            try:
+                return future.result()
+            except _Abandoned:
+                return self._call(messages, config)
+        try:
+            response = self._call(messages, config)
+        except Exception as e:
+            self._release(key, future, error=e)
+            raise
+        except BaseException:
+            self._release(key, future, error=_Abandoned())
+            raise
+        self._release(key, future, response)
+        return response
+
+    async def ainvoke(self, messages, config=None):
+        _record(calls=1)
+        key = self._key(messages, config)
+        future, leader = self._join(key)
+        if not leader:
+            _record(coalesced=1)
+            try:
+                return await asyncio.wrap_future(future)
+            except _Abandoned:
+                return await self._acall(messages, config)
+        try:
+            response = await self._acall(messages, config)
+        except Exception as e:
+            self._release(key, future, error=e)
+            raise
+        except BaseException:  # cancelled run: followers from other runs carry on by themselves
+            self._release(key, future, error=_Abandoned())
+            raise
+        self._release(key, future, response)
+        return response
+
+def warm_up():
+    """Import the OpenAI client library (~2s) and open the shared connection pool before the first call"""
+    import langchain_openai  # noqa: F401
+    http_client()
+
+def get_llm(model_name, temperature=0) -> LLMClient:
+    """Shared client per (model, temperature): agents on the same model share limits and in-flight calls"""
+    with _lock:
+        key = f"{model_name}@{temperature}"
+        if key not in _clients:
+            _clients[key] = LLMClient(model_name, temperature)
+        return _clients[key]
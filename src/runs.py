@@ -0,0 +1,242 @@
+"""
+Run manager for multi-user serving: graph runs go through a bounded queue and execute on one
+asyncio event loop (app.astream), with a global concurrency limit, round-robin fairness
+between users and cancellation.
+"""
+import os
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from collections import deque, OrderedDict
+
+from src.tools.workspace import acquire_workspace, release_workspace
+
+RUNS_MAX_CONCURRENT = int(os.getenv("RUNS_MAX_CONCURRENT", "4"))  # graph runs executing at once
+RUNS_MAX_QUEUED = int(os.getenv("RUNS_MAX_QUEUED", "32"))         # waiting runs before submit() rejects
+RUNS_PER_USER = int(os.getenv("RUNS_PER_USER", "1"))              # concurrent runs per user
+APP_WARMUP = os.getenv("APP_WARMUP", "on").lower() not in ("off", "0", "false")  # warm_up() at UI start
+RUNS_KEEP_FINISHED = 200                                         # finished runs kept for status / metrics
+
+class RunQueueFull(Exception):
+    pass
+
+class Run:
+    def __init__(self, user, inputs, thread_id=None):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.inputs = inputs
+        self.thread_id = thread_id  # set -> run on the checkpointed graph (follow-up questions)
+        self.status = "queued"  # queued -> running -> done / failed / cancelled
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = dict(inputs)
+        self.error = None
+        self.events = queue.Queue()  # (mode, payload) from astream, None when the run ends
+        self.done = threading.Event()
+        self._task = None
+
+    @property
+    def queue_wait(self):
+        return self.started - self.submitted if self.started else None
+
+    @property
+    def run_time(self):
+        return self.finished - self.started if self.started and self.finished else None
+
+    def stream(self, timeout=None):
+        """Yield (mode, payload) stream events until the run ends"""
+        while True:
+            event = self.events.get(timeout=timeout)
+            if event is None:
+                return
+            yield event
+
+    def wait(self, timeout=None):
+        """Block until the run ended (or timeout). Returns True if it ended."""
+        return self.done.wait(timeout)
+
+class RunManager:
+    def __init__(self, graph=None, session_graph=None, max_concurrent=RUNS_MAX_CONCURRENT, max_queued=RUNS_MAX_QUEUED,
+                 per_user=RUNS_PER_USER):
+        if graph is None:
+            from src.graph import get_app
+            graph = get_app()
+        if session_graph is None:
+            from src.graph import get_session_app
+            session_graph = get_session_app()
+        self.graph = graph
+        self.session_graph = session_graph
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.per_user = per_user
+        self._lock = threading.Lock()
+        self._runs = OrderedDict()
+        self._queues = OrderedDict()  # user -> deque of queued runs (order = round-robin order)
+        self._running = {}            # user -> running count
+        self._counts = {"done": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="run-manager", daemon=True)
+        self._thread.start()
+
+    # --- public API (thread-safe) ---
+
+    def submit(self, user, inputs, thread_id=None) -> Run:
+        """
+        Queue a graph run. Raises RunQueueFull when the queue is at capacity (admission control).
+        Runs with a thread_id continue that thread's checkpointed state (follow-up questions).
+        """
+        with self._lock:
+            if sum(len(q) for q in self._queues.values()) >= self.max_queued:
+                self._counts["rejected"] += 1
+                raise RunQueueFull(f"{self.max_queued} runs already waiting, try again later")
+            run = Run(user, inputs, thread_id)
+            # In use until the run finishes: the retention policy never removes a live run's files
+            acquire_workspace(inputs.get("workspace_dir"))
+            self._runs[run.id] = run
+            self._queues.setdefault(user, deque()).append(run)
+        self._loop.call_soon_threadsafe(self._dispatch)
+        return run
+
+    def get(self, run_id) -> Run:
+        return self._runs.get(run_id)
+
+    def cancel(self, run_id) -> bool:
+        """Cancel a queued or running run. Returns False if it already finished."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run.status not in ("queued", "running"):
+                return False
+            if run.status == "queued":
+                self._queues[run.user].remove(run)
+                self._finish(run, "cancelled")
+                return True
+        # Running: cancel the task on the loop (in-flight REPL / LLM calls end with it)
+        self._loop.call_soon_threadsafe(lambda: run._task and run._task.cancel())
+        return True
+
+    def forget_thread(self, thread_id):
+        """Drop a thread's checkpoints (new file / new session)"""
+        self._loop.call_soon_threadsafe(self.session_graph.checkpointer.delete_thread, thread_id)
+
+    def metrics(self):
+        """Queue depth, running runs, outcomes, queue wait and run time of recent runs"""
+        with self._lock:
+            runs = list(self._runs.values())
+            metrics = {
+                "max_concurrent": self.max_concurrent,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "running": sum(self._running.values()),
+                **self._counts,
+            }
+        p95 = lambda values: values[min(len(values) - 1, int(len(values) * 0.95))]
+        for name, values in (("queue_wait", [r.queue_wait for r in runs if r.started]),
+                             ("run_time", [r.run_time for r in runs if r.run_time is not None])):
+            if values:
+                values = sorted(values)
+                metrics[f"avg_{name}_s"] = sum(values) / len(values)
+                metrics[f"p95_{name}_s"] = p95(values)
+        return metrics
+
+    def shutdown(self):
+        for run in list(self._runs.values()):
+            self.cancel(run.id)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # --- event loop side ---
+
+    def _next_run(self):
+        """Round-robin over users with queued runs and a free per-user slot"""
+        for user in list(self._queues):
+            pending = self._queues[user]
+            if not pending:
+                del self._queues[user]
+            elif self._running.get(user, 0) < self.per_user:
+                # Served user goes to the back of the rotation
+                self._queues.move_to_end(user)
+                return pending.popleft()
+        return None
+
+    def _dispatch(self):
+        with self._lock:
+            while sum(self._running.values()) < self.max_concurrent:
+                run = self._next_run()
+                if run is None:
+                    break
+                self._running[run.user] = self._running.get(run.user, 0) + 1
+                run.status, run.started = "running", time.time()
+                run._task = self._loop.create_task(self._execute(run))
+
+    async def _execute(self, run):
+        status = "done"
+        try:
+            graph, config = self.graph, None
+            if run.thread_id:
+                graph, config = self.session_graph, {"configurable": {"thread_id": run.thread_id}}
+            async for mode, payload in graph.astream(run.inputs, config, stream_mode=["updates", "messages"]):
+                if mode == "updates":
+                    for update in payload.values():
+                        run.result.update(update or {})
+                run.events.put((mode, payload))
+            if config:
+                # Follow-ups skip the nodes whose outputs are reused (charts...): take them from the checkpoint
+                run.result.update((await graph.aget_state(config)).values)
+        except asyncio.CancelledError:
+            status = "cancelled"
+        except Exception as e:
+            status, run.error = "failed", e
+        with self._lock:
+            self._running[run.user] -= 1
+            self._finish(run, status)
+        self._dispatch()
+
+    def _finish(self, run, status):
+        # Called with the lock held
+        run.status, run.finished = status, time.time()
+        release_workspace(run.inputs.get("workspace_dir"))
+        self._counts[status] += 1
+        run.events.put(None)
+        run.done.set()
+        finished = [r for r in self._runs.values() if r.finished]
+        for old in finished[:max(0, len(finished) - RUNS_KEEP_FINISHED)]:
+            del self._runs[old.id]
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_run_manager() -> RunManager:
+    """Shared run manager, started on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RunManager()
+    return _manager
+
+_warmup = None
+
+def warm_up(background=True):
+    """
+    Pay the cold start before the first run: import the agents, compile the graphs, import the
+    OpenAI client library and start the REPL workers. Once per process; returns the warm-up thread
+    (None when APP_WARMUP is off).
+    """
+    global _warmup
+    if not APP_WARMUP:
+        return None
+    with _manager_lock:
+        if _warmup is None:
+            def run():
+                from src import llm
+                from src.tools import pool
+                start = time.perf_counter()
+                get_run_manager()
+                llm.warm_up()
+                pool.warm_up()
+                print(f"Warm-up done in {time.perf_counter() - start:.1f}s")
+            _warmup = threading.Thread(target=run, name="warm-up", daemon=True)
+            _warmup.start()
+    if not background:
+        _warmup.join()
+    return _warmup
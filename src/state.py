@@ -1,16 +1,36 @@
 from typing import TypedDict, Annotated, List, Dict, Any
 from langgraph.graph.message import add_messages
-import operator
+
+def merge_run_timings(left: Dict, right: Dict) -> Dict:
+    """
+    Reducer for node_timings: merged within a run, replaced when a new run (trace_id) starts, so a
+    follow-up on a checkpointed thread only reports the nodes it ran
+    """
+    right = right or {}
+    runs = {t.get("trace_id") for t in right.values()}
+    kept = {n: t for n, t in (left or {}).items() if not runs or t.get("trace_id") in runs}
+    return {**kept, **right}
 
 class AgentState(TypedDict):
     messages: Annotated[List, add_messages]
+    workspace_dir: str
+    use_cache: bool
     csv_file_path: str
     cleaned_csv_path: str
+    dataset_path: str
+    sample_path: str
+    aggregates: Dict[str, str]
+    cleaning_stats: Dict[str, Any]
     refined_query: str
     refusal_reason: str
+    primary_date: str
     primary_target: str
     primary_group: str
+    data_profile: Dict[str, Any]
+    analyzed_file: str
     eda_report: str
-    viz_images: Annotated[List[str], operator.add] 
+    viz_images: List[str]  # written by the viz node only; replaced (not appended) when a thread re-runs it
     validation_status: str
-    final_report: str
\ No newline at end of file
+    final_report: str
+    trace_id: str  # set by the entry node, shared by every node span of the run
+    node_timings: Annotated[Dict[str, Dict[str, Any]], merge_run_timings]
\ No newline at end of file
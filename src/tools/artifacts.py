@@ -0,0 +1,196 @@
+"""
+Chart artifact store: every rendered chart is encoded once into the versions its consumers need,
+stored under the hash of the chart's content and looked up from memory afterwards.
+
+    web    palette PNG, CHART_WEB_WIDTH px     (st.image sends the file as is, no decode / re-encode)
+    thumb  palette PNG, CHART_THUMB_WIDTH px   (history sidebar)
+    print  palette PNG, PDF_IMAGE_MAX_WIDTH px (PDF export)
+
+The variants are built in the worker right after the chart is saved (charts.render_chart), so the
+UI and the PDF builder only find them. Charts restored from the result cache have the same content
+and hash, so their variants are reused. Reports kept in the history refer to their charts by digest
+(variant_path), not by workspace path: workspaces expire before the history does.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "data_analyst_artifacts"))
+# Unused charts are kept as long as the history keeps the reports showing them
+ARTIFACT_TTL_HOURS = float(os.getenv("ARTIFACT_TTL_HOURS", os.getenv("HISTORY_TTL_HOURS", "168")))
+# Charts are rendered at CHART_DPI (a 10x6 in figure at 150 dpi is ~1500 px wide), then downscaled
+CHART_DPI = int(os.getenv("CHART_DPI", "150"))
+CHART_WEB_WIDTH = int(os.getenv("CHART_WEB_WIDTH", "1000"))
+CHART_THUMB_WIDTH = int(os.getenv("CHART_THUMB_WIDTH", "240"))
+# Embedded 170 mm wide in the PDF: 1500 px is ~220 dpi (the rendered size, no resampling)
+PDF_IMAGE_MAX_WIDTH = int(os.getenv("PDF_IMAGE_MAX_WIDTH", "1500"))
+VARIANTS = {"web": CHART_WEB_WIDTH, "thumb": CHART_THUMB_WIDTH, "print": PDF_IMAGE_MAX_WIDTH}
+MEMO_SIZE = 256       # charts whose metadata is kept in memory
+TOUCH_INTERVAL = 600  # seconds between two last-use updates of a chart served from memory
+
+_memo = OrderedDict()  # (path, mtime, size) -> [metadata, last touch]
+_lock = threading.Lock()
+_last_cleanup = 0.0
+
+def _digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:24]
+
+def _store_path(digest, name):
+    return os.path.join(ARTIFACT_DIR, digest[:2], f"{digest}.{name}")
+
+def _write(path, save):
+    # Temp name + rename: concurrent builders of the same chart never see half-written files
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    save(tmp)
+    os.replace(tmp, path)
+
+def _build(path, digest, render_ms):
+    from PIL import Image
+    start = time.perf_counter()
+    with Image.open(path) as im:
+        im = im.convert("RGBA")
+        # Flattened on white: smaller palette PNGs and fpdf does not split alpha channels pixel by pixel
+        flat = Image.new("RGB", im.size, "white")
+        flat.paste(im, mask=im.getchannel("A"))
+    os.makedirs(os.path.dirname(_store_path(digest, "json")), exist_ok=True)
+    meta = {"digest": digest, "width": flat.width, "height": flat.height, "render_ms": render_ms,
+            "bytes": {"png": os.path.getsize(path)}, "paths": {}}
+    # Largest first, each variant downscaled from the previous one
+    image = flat
+    for name, width in sorted(VARIANTS.items(), key=lambda v: -v[1]):
+        out = _store_path(digest, f"{name}.png")
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS, reducing_gap=2.0)
+        # Fast octree palette: charts have few colours, it is ~5x faster and smaller than median cut
+        palette = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        # Max compression for what the browser downloads, the PDF one is only read locally
+        level = 6 if name == "print" else 9
+        _write(out, lambda tmp: palette.save(tmp, format="PNG", compress_level=level))
+        meta["paths"][name] = out
+        meta["bytes"][name] = os.path.getsize(out)
+    meta["encode_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def save_meta(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+    _write(_store_path(digest, "json"), save_meta)
+    return meta
+
+def _load(digest):
+    try:
+        with open(_store_path(digest, "json")) as f:
+            meta = json.load(f)
+        if all(os.path.exists(p) for p in meta["paths"].values()):
+            os.utime(_store_path(digest, "json"))  # recently used, kept by the cleanup
+            return meta
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _memo_hit(key):
+    """Memoized metadata if its files are still there (last use refreshed now and then), else None"""
+    with _lock:
+        entry = _memo.get(key)
+        if entry is None:
+            return None
+        _memo.move_to_end(key)
+    meta, touched = entry
+    if not all(os.path.exists(p) for p in meta["paths"].values()):
+        with _lock:
+            _memo.pop(key, None)  # removed by the cleanup of another process: rebuilt
+        return None
+    if time.time() - touched > TOUCH_INTERVAL:
+        try:
+            os.utime(_store_path(meta["digest"], "json"))
+            entry[1] = time.time()
+        except OSError:
+            return None
+    return meta
+
+def chart_variants(path, render_ms=None):
+    """
+    Metadata of a chart's variants: {"paths": {web, thumb, print}, "bytes": {...}, "render_ms", "encode_ms", ...}.
+    Built on first use, then served from the store / memory (a few stats per call). None if the chart is unreadable.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    meta = _memo_hit(key)
+    if meta is not None:
+        return meta
+    try:
+        digest = _digest(path)
+        meta = _load(digest) or _build(path, digest, render_ms)
+    except Exception as e:
+        print(f"Chart artifact error ({path}): {e}")
+        return None
+    with _lock:
+        _memo[key] = [meta, time.time()]
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    _maybe_cleanup()
+    return meta
+
+def chart_variant(path, name):
+    """Path of one variant ("web", "thumb", "print"), the original chart if it can't be built"""
+    meta = chart_variants(path)
+    return meta["paths"][name] if meta else path
+
+def chart_digest(path):
+    """Content digest of a rendered chart (stable reference for the history), None if unreadable"""
+    meta = chart_variants(path)
+    return meta["digest"] if meta else None
+
+def variant_path(ref, name):
+    """
+    Path of one variant of a chart referenced by digest (or by path, for older history entries).
+    None when the chart is gone.
+    """
+    if not ref:
+        return None
+    if os.sep not in ref and "." not in ref:
+        meta = _load(ref)
+        return meta["paths"][name] if meta else None
+    return chart_variant(ref, name) if os.path.exists(ref) else None
+
+def cleanup_artifacts(ttl_hours=None):
+    """Delete charts not used for ttl_hours. Returns the number removed."""
+    ttl_hours = ARTIFACT_TTL_HOURS if ttl_hours is None else ttl_hours
+    if ttl_hours <= 0 or not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    removed, now = 0, time.time()
+    for folder in os.listdir(ARTIFACT_DIR):
+        folder = os.path.join(ARTIFACT_DIR, folder)
+        for name in os.listdir(folder) if os.path.isdir(folder) else []:
+            if not name.endswith(".json"):
+                continue
+            try:
+                if now - os.path.getmtime(os.path.join(folder, name)) <= ttl_hours * 3600:
+                    continue
+                digest = name[:-len(".json")]
+                for variant in VARIANTS:
+                    if os.path.exists(_store_path(digest, f"{variant}.png")):
+                        os.remove(_store_path(digest, f"{variant}.png"))
+                os.remove(os.path.join(folder, name))
+                removed += 1
+            except OSError:
+                pass  # removed by another process
+    return removed
+
+def _maybe_cleanup():
+    # At most once an hour per process
+    global _last_cleanup
+    if time.time() - _last_cleanup > 3600:
+        _last_cleanup = time.time()
+        cleanup_artifacts()
@@ -1,40 +1,57 @@
-from langchain_experimental.utilities import PythonREPL
-from langchain_core.tools import tool
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import sklearn
+from langchain_core.tools import StructuredTool
 import re
+import asyncio
 
-import warnings 
-warnings.filterwarnings("ignore")
+from src import tracing
+from src.tools.pool import get_pool
 
-# Khởi tạo môi trường chạy code
-repl = PythonREPL()
+def _format_result(result):
+    if result["status"] == "ok":
+        return f"Execution Result:\n{result['output']}"
+    return f"Execution Error:\n{result['output']}"
 
-@tool
-def python_repl_tool(code: str):
+def _profile():
+    # Functions kept per profiled execution, 0 = not profiled (TRACE_PROFILE)
+    return tracing.TRACE_PROFILE_TOP if tracing.profiling_enabled() else 0
+
+def run_python(code: str, dataset_path: str = "", frames: dict = None):
     """
     Python execution tool with pandas, matplotlib, seaborn, sklearn, numpy.
+    If dataset_path is given, the cleaned data is preloaded as `df` (frames: extra {name: feather path}).
     RULES: Always print results, save charts as PNG, do NOT use plt.show().
     """
     try:
-        result = repl.run(code)
-        return f"Execution Result:\n{result}"
+        # Each execution runs in a pooled worker process with a fresh namespace and limits
+        result = get_pool().run(code, dataset_path=dataset_path or None, frames=frames, profile=_profile())
+        tracing.record_repl(result)
+        return _format_result(result)
+    except Exception as e:
+        return f"Execution Error:\n{str(e)}"
+
+async def arun_python(code: str, dataset_path: str = "", frames: dict = None):
+    try:
+        # First call starts the worker processes: keep that off the event loop too
+        pool = await asyncio.to_thread(get_pool)
+        result = await pool.arun(code, dataset_path=dataset_path or None, frames=frames, profile=_profile())
+        tracing.record_repl(result)
+        return _format_result(result)
     except Exception as e:
         return f"Execution Error:\n{str(e)}"
 
+# invoke() -> run_python, ainvoke() -> arun_python
+python_repl_tool = StructuredTool.from_function(func=run_python, coroutine=arun_python, name="python_repl_tool")
+
 def extract_code(text: str) -> str:
     """Extract Python code from LLM response"""
     pattern = r"```python\n(.*?)```"
     match = re.search(pattern, text, re.DOTALL)
-    
+
     if match:
         return match.group(1).strip()
-    
+
     pattern_generic = r"```\n(.*?)```"
     match_generic = re.search(pattern_generic, text, re.DOTALL)
     if match_generic:
         return match_generic.group(1).strip()
-        
-    return text.strip()
\ No newline at end of file
+
+    return text.strip()
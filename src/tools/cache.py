@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import asyncio
+import inspect
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import functools
+
+from src.tools.datastore import file_hash
+from src.tools.workspace import workspace_file
+
+# Persistent cache of agent outputs keyed by (node, dataset hash, query, ...), with TTL + LRU size cap
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "data_analyst_cache.sqlite"))
+RESULT_CACHE_TTL_HOURS = float(os.getenv("RESULT_CACHE_TTL_HOURS", "72"))
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "512"))
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "on").lower() not in ("off", "0", "false")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY, node TEXT, value TEXT, size INTEGER, created REAL, accessed REAL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT, name TEXT, data BLOB, PRIMARY KEY (key, name)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed);
+"""
+
+class ResultCache:
+    def __init__(self, path=RESULT_CACHE_PATH, ttl_hours=RESULT_CACHE_TTL_HOURS, max_mb=RESULT_CACHE_MAX_MB):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._counters = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, node, outcome):
+        with self._lock:
+            counter = self._counters.setdefault(node, {"hits": 0, "misses": 0})
+            counter[outcome] += 1
+
+    def get(self, key, node):
+        """Return (value, {name: bytes}) or None"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(node, "misses")
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            blobs = dict(conn.execute("SELECT name, data FROM blobs WHERE key = ?", (key,)).fetchall())
+        self._count(node, "hits")
+        return json.loads(row[0]), blobs
+
+    def put(self, key, node, value, blobs=None):
+        data = json.dumps(value)
+        blobs = blobs or {}
+        size = len(data) + sum(len(b) for b in blobs.values())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", (key, node, data, size, now, now))
+            conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+            conn.executemany("INSERT INTO blobs VALUES (?, ?, ?)", [(key, n, b) for n, b in blobs.items()])
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Drop expired entries, then least recently used ones until under the size cap
+        if self.ttl_seconds > 0:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        conn.execute("DELETE FROM blobs WHERE key NOT IN (SELECT key FROM entries)")
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM blobs")
+
+    def stats(self):
+        """Hit/miss counters (this process) plus size of the store"""
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._lock:
+            nodes = {n: dict(c) for n, c in self._counters.items()}
+        hits = sum(c["hits"] for c in nodes.values())
+        misses = sum(c["misses"] for c in nodes.values())
+        return {"hits": hits, "misses": misses, "nodes": nodes, "entries": entries, "bytes": size}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResultCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+    return _cache
+
+def cache_enabled(state) -> bool:
+    """Cache is on unless disabled globally (RESULT_CACHE=off) or per run (state["use_cache"] = False)"""
+    return RESULT_CACHE_ENABLED and (state or {}).get("use_cache", True) is not False
+
+def dataset_fingerprint(state) -> str:
+    """Content hash of the cleaned dataset (the dataset store already names files by hash)"""
+    dataset_path = state.get("dataset_path", "")
+    if dataset_path:
+        return os.path.splitext(os.path.basename(dataset_path))[0]
+    csv_path = state.get("cleaned_csv_path") or state.get("csv_file_path", "")
+    return file_hash(csv_path) if csv_path and os.path.exists(csv_path) else ""
+
+def prompt_version(model, *templates) -> str:
+    """
+    Short hash of what a node's output depends on besides its inputs: model name / temperature and
+    prompt templates / settings. Part of every cache key, so a prompt or model change is a miss.
+    """
+    raw = json.dumps([getattr(model, "model_name", str(model)), getattr(model, "temperature", None), *templates], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+def make_key(node, parts) -> str:
+    raw = json.dumps([node, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _restore(value, blobs, state, files_key):
+    # Cached files are written back into the run's workspace
+    if files_key:
+        paths = []
+        for name in value.get(files_key, []):
+            path = workspace_file(state or {}, name)
+            with open(path, "wb") as f:
+                f.write(blobs[name])
+            paths.append(path)
+        value[files_key] = paths
+    return value
+
+def _store(cache, key, node, result, files_key, cacheable):
+    if cacheable is None or cacheable(result):
+        value, blobs = dict(result), {}
+        if files_key:
+            for path in result.get(files_key, []):
+                with open(path, "rb") as f:
+                    blobs[os.path.basename(path)] = f.read()
+            value[files_key] = list(blobs)
+        cache.put(key, node, value, blobs)
+
+def cached_call(node, parts, compute, state=None, files_key=None, cacheable=None):
+    """
+    Return compute() through the cache.
+    files_key: result key holding a list of file paths (e.g. chart PNGs); the files are stored as
+    blobs and written back into the run's workspace on a hit.
+    cacheable: predicate deciding whether a result may be stored (e.g. skip failures).
+    """
+    if not cache_enabled(state):
+        return compute()
+
+    cache = get_cache()
+    key = make_key(node, parts)
+    hit = cache.get(key, node)
+    if hit is not None:
+        print(f"Cache hit: {node}")
+        return _restore(*hit, state, files_key)
+
+    result = compute()
+    _store(cache, key, node, result, files_key, cacheable)
+    return result
+
+async def acached_call(node, parts, acompute, state=None, files_key=None, cacheable=None):
+    """Async cached_call: acompute is a coroutine function, SQLite / file I/O runs in a thread"""
+    if not cache_enabled(state):
+        return await acompute()
+
+    cache = get_cache()
+    key = make_key(node, parts)
+    hit = await asyncio.to_thread(cache.get, key, node)
+    if hit is not None:
+        print(f"Cache hit: {node}")
+        return await asyncio.to_thread(_restore, *hit, state, files_key)
+
+    result = await acompute()
+    await asyncio.to_thread(_store, cache, key, node, result, files_key, cacheable)
+    return result
+
+def cached_node(node, key_parts, version, files_key=None, cacheable=None):
+    """
+    Decorator: short-circuit an agent node on a cache hit. key_parts(state) -> list of key components,
+    version: prompt_version() of the node's model and prompts. Works for sync and async (coroutine) nodes.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(state):
+                if not cache_enabled(state):
+                    return await fn(state)
+                parts = [version, dataset_fingerprint(state), *key_parts(state)]
+                return await acached_call(node, parts, lambda: fn(state), state, files_key, cacheable)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(state):
+            if not cache_enabled(state):
+                return fn(state)
+            parts = [version, dataset_fingerprint(state), *key_parts(state)]
+            return cached_call(node, parts, lambda: fn(state), state, files_key, cacheable)
+        return wrapper
+    return decorator
@@ -0,0 +1,202 @@
+"""
+Native chart library: the Viz agent only picks small JSON chart specs, rendering is done here
+(in the execution pool's worker processes, where `df` and the aggregates are preloaded).
+"""
+import json
+import numpy as np
+import pandas as pd
+from src.tools.typeinfer import parse_dates
+
+CHART_TYPES = {
+    "trend": ["date", "value"],       # line chart of the value aggregated per month
+    "histogram": ["value"],
+    "top_n": ["group", "value"],      # horizontal bars of the top groups
+    "boxplot": ["value"],             # optional "group" for one box per group
+    "scatter": ["x", "y"],
+    "heatmap": [],                    # correlation of the numeric columns
+}
+MAX_CHARTS = 2
+TOP_N = 10
+MAX_BOX_GROUPS = 8
+MAX_SCATTER_POINTS = 5000
+AGGREGATIONS = ("sum", "mean", "count")
+
+def validate_spec(spec: dict, columns: dict):
+    """
+    Normalise one chart spec against {column: kind} ("numeric" / "datetime" / "categorical" / "id").
+    Returns the cleaned spec, or None if it can't be rendered.
+    """
+    if not isinstance(spec, dict) or spec.get("type") not in CHART_TYPES:
+        return None
+    numeric = lambda c: columns.get(c) == "numeric"
+    clean = {"type": spec["type"]}
+    for field in CHART_TYPES[spec["type"]] + (["group"] if spec["type"] == "boxplot" else []):
+        value = spec.get(field)
+        if value is None and field == "group":
+            continue
+        if value not in columns:
+            return None
+        clean[field] = value
+    if any(not numeric(clean[f]) for f in ("value", "x", "y") if f in clean):
+        return None
+    if clean.get("group") is not None and columns[clean["group"]] == "numeric":
+        return None
+    if spec["type"] in ("trend", "top_n"):
+        clean["agg"] = spec.get("agg") if spec.get("agg") in AGGREGATIONS else "sum"
+    if spec["type"] == "heatmap" and sum(numeric(c) for c in columns) < 2:
+        return None
+    if isinstance(spec.get("title"), str) and spec["title"].strip():
+        clean["title"] = spec["title"].strip()[:80]
+    return clean
+
+def default_specs(hints: dict, columns: dict):
+    """Charts used when the LLM picks nothing usable: trend or histogram, then ranking or boxplot"""
+    date, target, group = hints.get("date_col"), hints.get("target_col"), hints.get("group_col")
+    if target not in columns:
+        target = next((c for c, kind in columns.items() if kind == "numeric"), None)
+    if target is None:
+        return []
+    first = {"type": "trend", "date": date, "value": target} if date in columns else {"type": "histogram", "value": target}
+    second = {"type": "top_n", "group": group, "value": target} if group in columns else {"type": "boxplot", "value": target}
+    return [s for s in (validate_spec(first, columns), validate_spec(second, columns)) if s]
+
+def parse_specs(text: str, columns: dict, hints: dict):
+    """Valid specs from an LLM answer ({"charts": [...]}), padded with defaults up to MAX_CHARTS"""
+    specs = []
+    try:
+        start, end = text.index("{"), text.rindex("}") + 1
+        specs = json.loads(text[start:end]).get("charts", [])
+    except (ValueError, AttributeError):
+        pass
+    valid = [s for s in (validate_spec(s, columns) for s in specs if s) if s]
+    for spec in default_specs(hints, columns):
+        if len(valid) >= MAX_CHARTS:
+            break
+        if spec["type"] not in {s["type"] for s in valid}:
+            valid.append(spec)
+    return valid[:MAX_CHARTS]
+
+# --- Rendering (runs inside a worker process) ---
+
+_figure = None
+
+def _get_axes(size=(10, 6)):
+    # One Figure per process, cleared between charts: no pyplot state, no per-chart allocation
+    global _figure
+    if _figure is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        _figure = Figure()
+        FigureCanvasAgg(_figure)
+    _figure.clf()
+    _figure.set_size_inches(*size)
+    return _figure, _figure.add_subplot()
+
+def _aggregate(series: pd.Series, by, agg: str) -> pd.Series:
+    return getattr(series.groupby(by), agg)()
+
+def _trend(ax, df, spec, frames):
+    date, value, agg = spec["date"], spec["value"], spec["agg"]
+    monthly = frames.get("agg_by_month")
+    if agg == "sum" and monthly is not None and {date, value} <= set(monthly.columns):
+        data = monthly.set_index(date)[value]  # exact monthly totals (large file)
+    else:
+        dates = parse_dates(df[date])
+        data = _aggregate(df[value], dates.dt.to_period("M").dt.to_timestamp(), agg).sort_index()
+    ax.plot(data.index, data.values, marker="o", linewidth=2, markersize=6)
+    step = max(1, len(data) // 10)  # label every ~10th point to avoid clutter
+    for x, y in list(data.items())[::step]:
+        ax.text(x, y, f"{y:.0f}", fontsize=9, ha="center", va="bottom")
+    ax.set_xlabel("Date", fontsize=12)
+    ax.set_ylabel(f"{agg.title()} {value}", fontsize=12)
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis="x", rotation=45)
+    return f"Trend of {value} Over Time"
+
+def _histogram(ax, df, spec, frames):
+    values = df[spec["value"]].dropna()
+    ax.hist(values, bins=max(1, min(20, len(values) // 5)), edgecolor="black")
+    ax.set_xlabel(spec["value"], fontsize=12)
+    ax.set_ylabel("Frequency", fontsize=12)
+    ax.grid(True, alpha=0.3, axis="y")
+    return f"Distribution of {spec['value']}"
+
+def _top_n(ax, df, spec, frames):
+    group, value, agg = spec["group"], spec["value"], spec["agg"]
+    by_group = frames.get("agg_by_group")
+    if agg == "sum" and by_group is not None and {group, value} <= set(by_group.columns):
+        data = by_group.set_index(group)[value]  # exact totals (large file)
+    else:
+        data = _aggregate(df[value], df[group], agg)
+    data = data.nlargest(TOP_N).sort_values()
+    import matplotlib.cm as cm
+    colors = cm.viridis(np.linspace(0.3, 0.9, len(data)))
+    bars = ax.barh([str(i) for i in data.index], data.values, color=colors, edgecolor="black")
+    for bar, val in zip(bars, data.values):
+        ax.text(val, bar.get_y() + bar.get_height() / 2, f" {val:.0f}", va="center", fontsize=10)
+    ax.set_xlabel(f"{agg.title()} {value}", fontsize=12)
+    ax.set_ylabel(group, fontsize=12)
+    ax.grid(True, alpha=0.3, axis="x")
+    return f"Top {TOP_N} {group} by {agg.title()} {value}"
+
+def _boxplot(ax, df, spec, frames):
+    value, group = spec["value"], spec.get("group")
+    if group:
+        top = df[group].value_counts().index[:MAX_BOX_GROUPS]
+        data = [df.loc[df[group] == g, value].dropna() for g in top]
+        labels = [str(g) for g in top]
+    else:
+        data, labels = [df[value].dropna()], [value]
+    bp = ax.boxplot(data, tick_labels=labels, patch_artist=True)
+    for patch in bp["boxes"]:
+        patch.set_facecolor("lightblue")
+    ax.set_ylabel(value, fontsize=12)
+    ax.grid(True, alpha=0.3, axis="y")
+    return f"Distribution Analysis of {value}" + (f" by {group}" if group else "")
+
+def _scatter(ax, df, spec, frames):
+    data = df[[spec["x"], spec["y"]]].dropna()
+    if len(data) > MAX_SCATTER_POINTS:
+        data = data.sample(MAX_SCATTER_POINTS, random_state=0)
+    ax.scatter(data[spec["x"]], data[spec["y"]], alpha=0.5, s=12)
+    ax.set_xlabel(spec["x"], fontsize=12)
+    ax.set_ylabel(spec["y"], fontsize=12)
+    ax.grid(True, alpha=0.3)
+    return f"{spec['y']} vs {spec['x']}"
+
+def _heatmap(ax, df, spec, frames):
+    import seaborn as sns
+    corr = df.select_dtypes(include="number").corr()
+    sns.heatmap(corr, ax=ax, annot=len(corr) <= 10, fmt=".2f", cmap="coolwarm", vmin=-1, vmax=1)
+    return "Correlation Between Numeric Columns"
+
+RENDERERS = {
+    "trend": _trend,
+    "histogram": _histogram,
+    "top_n": _top_n,
+    "boxplot": _boxplot,
+    "scatter": _scatter,
+    "heatmap": _heatmap,
+}
+
+def render_chart(spec: dict, path: str, namespace: dict) -> str:
+    """Draw one spec with the data in namespace (`df` + optional aggregates), save it as PNG and build its variants"""
+    import time
+    import seaborn as sns
+    from src.tools import artifacts
+    start = time.perf_counter()
+    sns.set_theme(style="whitegrid")
+    df = namespace["df"]
+    frames = {k: v for k, v in namespace.items() if k.startswith("agg_")}
+    fig, ax = _get_axes()
+    title = RENDERERS[spec["type"]](ax, df, spec, frames)
+    ax.set_title(spec.get("title", title), fontsize=14, fontweight="bold")
+    fig.tight_layout()
+    fig.savefig(path, dpi=artifacts.CHART_DPI, bbox_inches="tight")
+    meta = artifacts.chart_variants(path, render_ms=round((time.perf_counter() - start) * 1000, 1))
+    sizes = f" (web {meta['bytes']['web'] // 1024} KB, print {meta['bytes']['print'] // 1024} KB)" if meta else ""
+    return f"Saved {spec['type']} chart to {path}{sizes}"
+
+def render_code(spec: dict, path: str) -> str:
+    """Script run by the execution pool for one chart"""
+    return f"from src.tools.charts import render_chart\nprint(render_chart({spec!r}, {path!r}, globals()))"
@@ -0,0 +1,125 @@
+import os
+import re
+import uuid
+import pandas as pd
+from src import tracing
+from src.tools import datastore, largefile
+from src.tools.typeinfer import is_text, coerce_numeric
+
+# Built-in cleaning engine: same rules as the cleaning template, without the LLM round trip
+NUMERIC_COERCE_THRESHOLD = 0.5  # max NaN share after coercion for a text column to become numeric
+CATEGORICAL_FILL = "Unknown"
+
+# Queries that ask for cleaning beyond the default rules go to the LLM path
+CUSTOM_CLEANING_PATTERNS = [
+    r"\bclean",
+    r"\bimput",
+    r"fill\s*(na|nan|null|missing|empty|blank)",
+    r"missing values?",
+    r"\bdedup|duplicat",
+    r"outlier",
+    r"\bdrop\s+(rows?|columns?|nulls?|na|nan|missing)",
+    r"normali[sz]",
+    r"standardi[sz]",
+]
+
+def wants_custom_cleaning(query: str) -> bool:
+    """True if the user request contains explicit data cleaning instructions"""
+    if not query:
+        return False
+    text = query.lower()
+    return any(re.search(p, text) for p in CUSTOM_CLEANING_PATTERNS)
+
+def clean_dataframe(df: pd.DataFrame):
+    """
+    Numeric coercion, mean / "Unknown" imputation and de-duplication.
+    Returns (cleaned_df, stats) where stats holds per-column details.
+    """
+    df = df.copy()
+    dtypes_before = df.dtypes.astype(str).to_dict()
+    rows_before = len(df)
+
+    # 1. Coerce text columns that are mostly numeric
+    coerced = []
+    for col in [c for c in df.columns if is_text(df[c])]:
+        # Sample-based check first: clearly non-numeric columns are never converted
+        numeric_vals = coerce_numeric(df[col], NUMERIC_COERCE_THRESHOLD)
+        if numeric_vals is not None:
+            df[col] = numeric_vals
+            coerced.append(col)
+
+    # 2. Impute missing values (one vectorized fill per column group)
+    nulls = df.isna().sum()
+    num_cols = df.select_dtypes(include=["float", "int"]).columns
+    means = df[num_cols].mean()
+    if len(num_cols):
+        df[num_cols] = df[num_cols].fillna(means)
+    cat_cols = [c for c in df.columns if is_text(df[c])]
+    if cat_cols:
+        df[cat_cols] = df[cat_cols].fillna(CATEGORICAL_FILL)
+
+    # 3. Remove duplicate rows
+    df = df.drop_duplicates()
+
+    columns = {}
+    for col in df.columns:
+        fill_value = None
+        if col in num_cols and nulls[col]:
+            fill_value = None if pd.isna(means[col]) else float(means[col])
+        elif col in cat_cols and nulls[col]:
+            fill_value = CATEGORICAL_FILL
+        columns[col] = {
+            "dtype_before": dtypes_before[col],
+            "dtype_after": str(df[col].dtype),
+            "coerced_to_numeric": col in coerced,
+            "nulls_filled": int(nulls[col]) if fill_value is not None else 0,
+            "fill_value": fill_value,
+        }
+
+    stats = {
+        "engine": "native",
+        "rows_before": rows_before,
+        "rows_after": len(df),
+        "duplicates_removed": rows_before - len(df),
+        "columns": columns,
+    }
+    return df, stats
+
+def clean_csv(csv_path: str):
+    """
+    Clean a CSV once per unique file content.
+    Returns (feather_path, stats) from the dataset store.
+    """
+    key = datastore.dataset_key(csv_path)
+    cached = datastore.lookup(key)
+    if cached:
+        feather_path, stats = cached
+        return feather_path, {**stats, "cache_hit": True}
+
+    if largefile.is_large(csv_path):
+        return clean_csv_streaming(csv_path, key)
+
+    tracing.record_csv_read(csv_path)
+    df = pd.read_csv(csv_path)
+    df, stats = clean_dataframe(df)
+    feather_path = datastore.store(key, df, stats)
+    return feather_path, {**stats, "cache_hit": False}
+
+def clean_csv_streaming(csv_path: str, key: str):
+    """Large-file variant of clean_csv: chunked, bounded memory, also stores a row sample"""
+    os.makedirs(datastore.DATASET_CACHE_DIR, exist_ok=True)
+    feather_path, _ = datastore.dataset_files(key)
+    sample_path = datastore.sample_file(feather_path)
+    suffix = f".{uuid.uuid4().hex}.tmp"
+    targets = [feather_path, sample_path]
+    try:
+        stats = largefile.stream_clean(csv_path, *[p + suffix for p in targets],
+                                       threshold=NUMERIC_COERCE_THRESHOLD, fill=CATEGORICAL_FILL)
+        for path in targets:
+            os.replace(path + suffix, path)
+    finally:
+        for path in targets:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    datastore.save_stats(key, stats)
+    return feather_path, {**stats, "cache_hit": False}
@@ -0,0 +1,281 @@
+"""
+Static checks of LLM-generated code before it goes to the REPL pool.
+
+validate(code, columns, large) parses the script and looks for:
+- syntax errors
+- column references (df["x"], groupby / sort_values / subset / drop(columns=...)) not in the schema
+- plt.show() (nothing to show in the headless workers)
+- read_csv in a loop or repeated on the same file
+- row-by-row loops (iterrows / itertuples / apply(axis=1)) on large files
+
+Fixable issues are rewritten (column name differing only in case / spacing, plt.show removed,
+repeated reads served from one load). Anything else makes the script "not ok": the caller asks
+the LLM for one corrected version with feedback() instead of running code that would fail.
+Column checks are skipped when the names can't be resolved statically (df.columns = ...,
+rename(columns=str.lower) or a comprehension, set_axis, df = df.merge(...)).
+"""
+import os
+import ast
+import re
+import difflib
+import threading
+
+# Files above this size count as large for the row-by-row loop check
+CODECHECK_LARGE_MB = float(os.getenv("CODECHECK_LARGE_MB", "10"))
+CODECHECK_ENABLED = os.getenv("CODECHECK", "on").lower() not in ("off", "0", "false")
+
+FRAME_NAMES = {"df"}
+# Methods returning a frame with (a subset of) the same columns: their results are checked too
+COLUMN_PRESERVING = {"copy", "dropna", "drop_duplicates", "fillna", "head", "tail", "sample", "sort_values",
+                     "query", "astype", "replace", "rename", "assign", "drop", "infer_objects", "convert_dtypes"}
+# String arguments that name columns, per method (positional index or keyword)
+COLUMN_ARGS = {"groupby": (0, "by"), "sort_values": (0, "by"), "dropna": (None, "subset"),
+               "drop_duplicates": (0, "subset"), "drop": (None, "columns"), "set_index": (0, "keys")}
+# Methods renaming every column at once: names after them are unknown statically
+RENAME_ALL = {"set_axis", "add_prefix", "add_suffix"}
+ROW_LOOPS = {"iterrows", "itertuples"}
+
+READ_ONCE_HELPER = '''
+def __read_csv_once(*args, **kwargs):
+    # Added by the code check: the script read the same CSV several times / in a loop
+    import pandas as __pd
+    cache = globals().setdefault("__csv_cache", {})
+    key = repr((args, sorted(kwargs.items())))
+    if key not in cache:
+        cache[key] = __pd.read_csv(*args, **kwargs)
+    return cache[key].copy()
+'''
+
+_counts = {"checked": 0, "passed": 0, "fixed": 0, "rejected": 0, "executions_saved": 0}
+_lock = threading.Lock()
+
+def csv_columns(csv_path):
+    """Header of a CSV (no data rows are parsed), None if unreadable"""
+    import pandas as pd
+    try:
+        return [str(c) for c in pd.read_csv(csv_path, nrows=0).columns]
+    except Exception:
+        return None
+
+def is_large(csv_path):
+    try:
+        return os.path.getsize(csv_path) > CODECHECK_LARGE_MB * 1024 * 1024
+    except OSError:
+        return False
+
+def _norm(name):
+    return re.sub(r"[\s_]+", "_", str(name).strip().lower())
+
+def _call_name(node):
+    """'read_csv' for pd.read_csv(...), 'show' for plt.show(...)"""
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Attribute):
+            return node.func.attr
+        if isinstance(node.func, ast.Name):
+            return node.func.id
+    return None
+
+def _strings(node):
+    """String constants of a str / list / tuple literal"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [e for e in node.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    return []
+
+class _Scan(ast.NodeVisitor):
+    """Collects frame variables, created columns, column references and expensive calls"""
+
+    def __init__(self):
+        self.frames = set(FRAME_NAMES)
+        self.created = set()       # columns the script added / renamed to so far
+        self.refs = []             # (Constant node, line, created before this point) read as column names
+        self.reads = []            # (Call node, in_loop)
+        self.shows = 0
+        self.row_loops = []        # (method, line)
+        self.renames_all = False   # df.columns = ..., rename(columns=str.lower)...: names unknown, column checks skipped
+        self._loop = 0
+
+    def _is_frame(self, node):
+        # df, df.copy().dropna(), df[mask], pd.read_csv(...)
+        while True:
+            if isinstance(node, ast.Name):
+                return node.id in self.frames
+            if isinstance(node, ast.Call):
+                if _call_name(node) == "read_csv":
+                    return True
+                if isinstance(node.func, ast.Attribute) and node.func.attr in COLUMN_PRESERVING:
+                    node = node.func.value
+                    continue
+                return False
+            if isinstance(node, ast.Subscript) and not _strings(node.slice):
+                node = node.value  # row filter keeps the columns
+                continue
+            return False
+
+    def _loop_body(self, node):
+        self._loop += 1
+        self.generic_visit(node)
+        self._loop -= 1
+
+    visit_For = visit_While = visit_ListComp = visit_DictComp = visit_SetComp = visit_GeneratorExp = _loop_body
+
+    def visit_Assign(self, node):
+        self.visit(node.value)  # right-hand side runs before the new column exists
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                # df = df.merge(...) / df = some_function(df): columns of the new frame are unknown
+                if self._is_frame(node.value):
+                    self.frames.add(target.id)
+                else:
+                    self.frames.discard(target.id)
+            if isinstance(target, ast.Attribute) and target.attr == "columns":
+                self.renames_all = True
+            if isinstance(target, ast.Subscript):
+                self.created.update(c.value for c in _strings(target.slice))
+            self.visit(target)
+
+    def visit_Subscript(self, node):
+        if isinstance(node.ctx, ast.Load) and self._is_frame(node.value):
+            self.refs += [(c, node.lineno, c.value in self.created) for c in _strings(node.slice)]
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = _call_name(node)
+        if name == "read_csv" and not any(k.arg in ("chunksize", "iterator") for k in node.keywords):
+            self.reads.append((node, self._loop > 0))
+        elif name == "show" and isinstance(node.func, ast.Attribute) and getattr(node.func.value, "id", "") == "plt":
+            self.shows += 1
+        elif isinstance(node.func, ast.Attribute) and self._is_frame(node.func.value):
+            if name in ROW_LOOPS or (name == "apply" and any(k.arg == "axis" and getattr(k.value, "value", None) in (1, "columns")
+                                                              for k in node.keywords)):
+                self.row_loops.append((name, node.lineno))
+            if name in COLUMN_ARGS:
+                pos, kw = COLUMN_ARGS[name]
+                args = [node.args[pos]] if pos is not None and len(node.args) > pos else []
+                args += [k.value for k in node.keywords if k.arg == kw]
+                for arg in args:
+                    self.refs += [(c, node.lineno, c.value in self.created) for c in _strings(arg)]
+            if name == "rename":
+                self._rename(node)
+            if name in RENAME_ALL:
+                self.renames_all = True
+            if name == "assign":
+                self.created.update(k.arg for k in node.keywords if k.arg)
+        self.generic_visit(node)
+
+    def _rename(self, node):
+        # Only a dict literal of strings maps to known names; str.lower, lambdas, comprehensions,
+        # variables or a positional mapper (axis=1) rename columns in ways not resolved here
+        mapping = [k.value for k in node.keywords if k.arg in ("columns", "mapper")] + node.args[:1]
+        for value in mapping:
+            if isinstance(value, ast.Dict) and all(isinstance(v, ast.Constant) and isinstance(v.value, str)
+                                                   for v in value.values):
+                self.created.update(v.value for v in value.values)
+            else:
+                self.renames_all = True
+
+class _Fix(ast.NodeTransformer):
+    def __init__(self, columns, reads):
+        self.columns = columns  # {constant node id: fixed name}
+        self.reads = reads      # ids of read_csv calls to serve from one load
+
+    def visit_Constant(self, node):
+        if id(node) in self.columns:
+            return ast.copy_location(ast.Constant(self.columns[id(node)]), node)
+        return node
+
+    def visit_Expr(self, node):
+        if _call_name(node.value) == "show" and getattr(getattr(node.value.func, "value", None), "id", "") == "plt":
+            return ast.copy_location(ast.Pass(), node)
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if id(node) in self.reads:
+            return ast.copy_location(ast.Call(func=ast.Name("__read_csv_once", ast.Load()), args=node.args, keywords=node.keywords), node)
+        return node
+
+def _issue(kind, message, fixable, line=None):
+    return {"kind": kind, "message": message, "fixable": fixable, "line": line}
+
+def validate(code, columns=None, large=False):
+    """
+    {"ok": runnable after fixes, "code": script to run (rewritten if fixed), "issues": [...]}.
+    columns: dataset schema (None = unknown, column checks skipped); large: flag row-by-row loops.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {"ok": False, "code": code, "issues": [_issue("syntax", f"SyntaxError: {e.msg}", False, e.lineno)]}
+    scan = _Scan()
+    scan.visit(tree)
+    issues, column_fixes, read_fixes = [], {}, set()
+
+    if columns is not None and not scan.renames_all:
+        by_norm = {}
+        for c in columns:
+            by_norm.setdefault(_norm(c), []).append(c)
+        for const, line, created in scan.refs:
+            if created or const.value in columns:
+                continue
+            match = by_norm.get(_norm(const.value), [])
+            if len(match) == 1:
+                column_fixes[id(const)] = match[0]
+                issues.append(_issue("column", f"column {const.value!r} -> {match[0]!r}", True, line))
+            else:
+                close = difflib.get_close_matches(const.value, columns, n=3, cutoff=0.6)
+                hint = f" (did you mean {', '.join(map(repr, close))}?)" if close else ""
+                issues.append(_issue("column", f"column {const.value!r} does not exist{hint}", False, line))
+
+    if scan.shows:
+        issues.append(_issue("plt_show", "plt.show() removed (headless worker, save figures with savefig)", True))
+
+    keys = [ast.dump(call) for call, _ in scan.reads]
+    if any(in_loop for _, in_loop in scan.reads) or len(keys) != len(set(keys)):
+        read_fixes = {id(call) for call, _ in scan.reads}
+        issues.append(_issue("read_csv", "CSV read in a loop / several times: loaded once and reused", True))
+
+    if large:
+        for name, line in scan.row_loops:
+            issues.append(_issue("row_loop", f"{name} on a large file is too slow, use vectorized pandas operations", False, line))
+
+    ok = all(i["fixable"] for i in issues)
+    if ok and (column_fixes or scan.shows or read_fixes):
+        tree = ast.fix_missing_locations(_Fix(column_fixes, read_fixes).visit(tree))
+        code = ast.unparse(tree)
+        if read_fixes:
+            code = READ_ONCE_HELPER.strip() + "\n\n" + code
+    return {"ok": ok, "code": code, "issues": issues}
+
+def feedback(result, columns=None):
+    """Targeted regeneration request for a script that failed validation"""
+    problems = "\n".join(f"- {'line ' + str(i['line']) + ': ' if i['line'] else ''}{i['message']}"
+                         for i in result["issues"] if not i["fixable"])
+    schema = f"\nAvailable columns: {columns}" if columns is not None else ""
+    return (f"Your script was not executed, a static check found these problems:\n{problems}{schema}\n"
+            "Return the complete corrected script in one ```python block. Change only what is needed to fix them.")
+
+def record(result, stage):
+    """Count a validation outcome; stage: "first" (generated code) or "retry" (regenerated code)"""
+    from src import tracing
+    fixed = any(i["fixable"] for i in result["issues"])
+    with _lock:
+        _counts["checked"] += 1
+        if not result["ok"]:
+            _counts["rejected"] += 1
+        elif fixed:
+            _counts["fixed"] += 1
+        else:
+            _counts["passed"] += 1
+        # A run of code that would fail (bad column, syntax error, rejected script) did not happen
+        if not result["ok"] or any(i["fixable"] and i["kind"] == "column" for i in result["issues"]):
+            _counts["executions_saved"] += 1
+    tracing.record(codecheck_checked=1, **{f"codecheck_{'rejected' if not result['ok'] else 'fixed' if fixed else 'passed'}": 1})
+    if result["issues"]:
+        print(f"Code check ({stage}): " + "; ".join(i["message"] for i in result["issues"]))
+
+def stats():
+    """Validation outcomes since start (this process)"""
+    with _lock:
+        return dict(_counts)
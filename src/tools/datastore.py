@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import pandas as pd
+
+from src import tracing
+
+# Cleaned datasets are stored once as uncompressed Feather (Arrow IPC) files keyed by content hash.
+# Files are immutable, so concurrent runs on the same upload can share them safely.
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data_analyst_datasets"))
+CLEANING_VERSION = "v1"  # bump when the native cleaning rules change
+# Eviction: datasets unused for the TTL are removed, then the least recently used ones above the size cap
+# (0 = disabled). Datasets used in the last IN_USE_SECONDS are kept: a run may still be reading them.
+DATASET_CACHE_TTL_HOURS = float(os.getenv("DATASET_CACHE_TTL_HOURS", "72"))
+DATASET_CACHE_MAX_MB = float(os.getenv("DATASET_CACHE_MAX_MB", "4096"))
+IN_USE_SECONDS = 3600
+CLEANUP_INTERVAL = 600  # seconds between two eviction passes per process
+
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Streaming content hash of a file"""
+    tracing.record_csv_read(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def dataset_key(csv_path: str, variant: str = CLEANING_VERSION) -> str:
+    return f"{file_hash(csv_path)}-{variant}"
+
+def dataset_files(key: str):
+    """Paths of the cached (feather, stats json) files for a key"""
+    base = os.path.join(DATASET_CACHE_DIR, key)
+    return f"{base}.feather", f"{base}.json"
+
+def lookup(key: str):
+    """Return (feather_path, stats) if the dataset is cached, else None"""
+    feather_path, stats_path = dataset_files(key)
+    if not all(os.path.exists(p) for p in (feather_path, stats_path)):
+        return None
+    with open(stats_path) as f:
+        stats = json.load(f)
+    try:
+        os.utime(stats_path)  # last use, for the eviction
+    except OSError:
+        pass
+    return feather_path, stats
+
+def _atomic_write(path, write):
+    # Write to a temp name then rename, so readers never see half-written files
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def store(key: str, df: pd.DataFrame, stats: dict = None):
+    """Persist a cleaned DataFrame (Feather + stats). Returns the Feather path."""
+    import pyarrow.feather as feather
+    os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+    feather_path, _ = dataset_files(key)
+
+    # Uncompressed so readers can memory-map the file instead of decoding it.
+    # No CSV copy: every reader loads the Feather file, and writing CSV costs far more than cleaning
+    _atomic_write(feather_path, lambda p: feather.write_feather(df, p, compression="uncompressed"))
+
+    save_stats(key, stats)
+    return feather_path
+
+def save_stats(key: str, stats: dict):
+    """Written last: a dataset only counts as cached once its stats file exists"""
+    def write(p):
+        with open(p, "w") as f:
+            json.dump(stats or {}, f)
+    _atomic_write(dataset_files(key)[1], write)
+    _maybe_cleanup()
+
+def cleanup_datasets(ttl_hours: float = None, max_mb: float = None):
+    """Evict datasets by last use (stats file mtime): TTL, then LRU down to max_mb. Returns the number removed."""
+    ttl_hours = DATASET_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    max_mb = DATASET_CACHE_MAX_MB if max_mb is None else max_mb
+    if not os.path.isdir(DATASET_CACHE_DIR):
+        return 0
+    entries = {}  # key -> {"used": stats file mtime, "newest": newest file mtime, "bytes", "files"}
+    for name in os.listdir(DATASET_CACHE_DIR):
+        path = os.path.join(DATASET_CACHE_DIR, name)
+        try:
+            size, mtime = os.path.getsize(path), os.path.getmtime(path)
+        except OSError:
+            continue
+        entry = entries.setdefault(name.split(".")[0], {"used": None, "newest": 0.0, "bytes": 0, "files": []})
+        if name.endswith(".json"):
+            entry["used"] = mtime
+        entry["newest"] = max(entry["newest"], mtime)
+        entry["bytes"] += size
+        entry["files"].append(path)
+    # Last use = stats file mtime; a dataset without one (being written or orphaned) = its newest file
+    entries = [(e["used"] if e["used"] is not None else e["newest"], e["bytes"], e["files"]) for e in entries.values()]
+
+    now = time.time()
+    total = sum(e[1] for e in entries)
+    removed = 0
+    for used, size, files in sorted(entries):  # least recently used first
+        if now - used < IN_USE_SECONDS:
+            continue
+        expired = ttl_hours > 0 and now - used > ttl_hours * 3600
+        if not (expired or (max_mb > 0 and total > max_mb * 1024 * 1024)):
+            continue
+        for path in files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # removed by another process
+        total -= size
+        removed += 1
+    return removed
+
+def _maybe_cleanup():
+    # At most once per CLEANUP_INTERVAL per process
+    global _last_cleanup
+    with _cleanup_lock:
+        if time.time() - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = time.time()
+    cleanup_datasets()
+
+def sample_file(feather_path: str) -> str:
+    """Row sample stored next to a large dataset"""
+    return feather_path.replace(".feather", ".sample.feather")
+
+def load(feather_path: str) -> pd.DataFrame:
+    """
+    Memory-mapped load: numeric columns are zero-copy, read-only views of the file.
+    pandas Copy-on-Write copies them only if a script modifies them.
+    """
+    import pyarrow.feather as feather
+    table = feather.read_table(feather_path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+
+# Local pre-filter for the gatekeeper: clear cases are decided here in microseconds,
+# only ambiguous requests go to the LLM
+GATEKEEPER_LOCAL = os.getenv("GATEKEEPER_LOCAL", "on").lower() not in ("off", "0", "false")
+
+DEFAULT_QUERIES = {
+    "perform general data analysis",
+    "perform a general analysis of this dataset",
+}
+
+GREETING_PATTERNS = [
+    r"(hi|hello|hey|hiya|yo|howdy|greetings|good (morning|afternoon|evening|night))( there)?",
+    r"(thanks|thank you|thx|ty|ok|okay|cool|nice|great|bye|goodbye|see you)",
+    r"(how are you|how are you doing|what'?s up|sup|who are you|what can you do)",
+    r"(xin chao|chao ban|cam on|tam biet)",
+]
+GREETING_FILLERS = r"(\s+(bot|assistant|friend|buddy|there|again|so much|a lot|ban))*"
+
+# Analysis terms. Most are also everyday words ("plot", "compare", "total", "mean"), so a request
+# is only accepted locally when one comes with a data context below
+ANALYSIS_PATTERNS = [
+    r"\banaly[sz]", r"\bstatistic", r"\bsummar", r"\boverview\b", r"\bexplor", r"\beda\b", r"\binsight",
+    r"\btrend", r"\bforecast", r"\bgrowth\b", r"\bseasonal", r"\bover time\b", r"\b(monthly|weekly|daily|yearly|quarterly)\b",
+    r"\bchart", r"\bplot", r"\bgraph", r"\bvisuali[sz]", r"\bhistogram", r"\bheatmap", r"\bscatter", r"\bbox ?plot",
+    r"\bdistribution", r"\bcorrelat", r"\boutlier", r"\banomal", r"\bvarian", r"\bstd\b|\bdeviation",
+    r"\b(average|mean|median|mode|sum|total|count|min(imum)?|max(imum)?|percent(age)?|ratio|share)\b",
+    r"\bcompar", r"\bbreak ?down", r"\bgroup(ed)? by\b", r"\btop \d+\b", r"\brank", r"\bsegment", r"\bclean",
+    r"\bmissing values?\b", r"\bduplicat",
+    r"\b(phan tich|bieu do|xu huong|thong ke)\b",
+]
+
+# The uploaded data itself: "this dataset", "the price column", "my sales data", "rows with nulls"
+DATA_CONTEXT_PATTERNS = [
+    r"\b(datasets?|csvs?|columns?|rows?|fields?|records?|variables?)\b",
+    r"\b(this|my|our|the|uploaded)( \w+)? (data|file|table|spreadsheet|sheet)\b",
+    r"\bdu lieu\b",
+]
+
+# Words that make a request suspicious even if it mentions data (left to the LLM)
+OFF_TOPIC_PATTERNS = [
+    r"\bpoem|\bpoetry|\bsong|\blyrics|\bstory|\bjoke|\brecipe|\bcook|\bgame|\bmovie|\bweather",
+    r"\bignore (all |the )?(previous|above)|\bsystem prompt|\bjailbreak|\bpretend\b",
+]
+
+REJECT_GREETING = ("Hello! I'm a data analysis assistant. Upload a CSV file and ask me about it, "
+                   "for example: 'Compare sales by region' or 'Show the monthly revenue trend'.")
+REJECT_GIBBERISH = ("I couldn't understand that request. Please describe what you'd like to analyse, "
+                    "for example: 'Summarise the dataset' or 'Which products sell best?'.")
+
+# One compiled alternation per rule set
+_GREETING = re.compile("(?:" + "|".join(GREETING_PATTERNS) + ")" + GREETING_FILLERS)
+_ANALYSIS = re.compile("|".join(ANALYSIS_PATTERNS))
+_OFF_TOPIC = re.compile("|".join(OFF_TOPIC_PATTERNS))
+_DATA_CONTEXT = re.compile("|".join(DATA_CONTEXT_PATTERNS))
+_WORD = re.compile(r"[a-z]+")
+_counts = {"valid": 0, "invalid": 0, "escalated": 0}
+_lock = threading.Lock()
+
+def _normalize(query):
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s']", " ", (query or "").lower())).strip()
+
+def _is_gibberish(text):
+    """Keyboard mash / random characters: no real words or too few letters (ASCII text only)"""
+    words = _WORD.findall(text)
+    if sum(len(w) for w in words) < 3:
+        return True
+    def wordlike(w):
+        # Needs a vowel, no long consonant runs, no long repeats ("asdfgh", "zzzzz", "qwrtp")
+        return (re.search(r"[aeiouy]", w) and not re.search(r"[^aeiouy]{5,}", w)
+                and not re.search(r"(.)\1\1", w))
+    return sum(len(w) for w in words if wordlike(w)) < 0.6 * sum(len(w) for w in words)
+
+def classify_query(query):
+    """
+    {"status": "VALID" | "INVALID", "content": ...} for clear-cut requests, None when the LLM
+    gatekeeper has to decide. VALID keeps the request as is (content = original query), so it is
+    only returned for the default query or an analysis term about the uploaded data.
+    """
+    text = _normalize(query)
+    verdict = None
+    if not (query or "").strip() or text in DEFAULT_QUERIES:
+        verdict = {"status": "VALID", "content": query}
+    elif _OFF_TOPIC.search(text):
+        verdict = None
+    elif _GREETING.fullmatch(text):
+        verdict = {"status": "INVALID", "content": REJECT_GREETING}
+    elif _ANALYSIS.search(text) and _DATA_CONTEXT.search(text):
+        verdict = {"status": "VALID", "content": query}
+    elif text.isascii() and _is_gibberish(text):
+        # Vietnamese with diacritics, Chinese, Russian... are not judged by letter shape: the LLM decides
+        verdict = {"status": "INVALID", "content": REJECT_GIBBERISH}
+
+    with _lock:
+        _counts["escalated" if verdict is None else verdict["status"].lower()] += 1
+    return verdict
+
+def stats():
+    """How many requests were decided locally vs sent to the LLM (this process)"""
+    with _lock:
+        counts = dict(_counts)
+    total = sum(counts.values())
+    return {**counts, "total": total, "local_share": (total - counts["escalated"]) / total if total else None}
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+
+# Analysis history of the UI sessions, kept in SQLite instead of server memory.
+# Per session only the newest HISTORY_MAX_PER_USER reports are kept; reports older than the TTL are dropped.
+HISTORY_PATH = os.getenv("HISTORY_PATH", os.path.join(tempfile.gettempdir(), "data_analyst_history.sqlite"))
+HISTORY_MAX_PER_USER = int(os.getenv("HISTORY_MAX_PER_USER", "50"))
+HISTORY_TTL_HOURS = float(os.getenv("HISTORY_TTL_HOURS", "168"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id TEXT PRIMARY KEY, user TEXT, created REAL, timestamp TEXT, query TEXT, report TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_user ON history (user, created);
+CREATE INDEX IF NOT EXISTS idx_history_created ON history (created);
+"""
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH, max_per_user=HISTORY_MAX_PER_USER, ttl_hours=HISTORY_TTL_HOURS):
+        self.path = path
+        self.max_per_user = max_per_user
+        self.ttl_seconds = ttl_hours * 3600
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add(self, user, item):
+        """Store a history item {id, timestamp, query, report}"""
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?)",
+                         (item["id"], user, time.time(), item["timestamp"], item["query"], json.dumps(item["report"])))
+            self._evict(conn, user)
+
+    def _evict(self, conn, user):
+        # Expired reports of every session, then the oldest ones of this session over the cap
+        if self.ttl_seconds > 0:
+            conn.execute("DELETE FROM history WHERE created < ?", (time.time() - self.ttl_seconds,))
+        if self.max_per_user > 0:
+            conn.execute("""DELETE FROM history WHERE user = ? AND id NOT IN
+                            (SELECT id FROM history WHERE user = ? ORDER BY created DESC LIMIT ?)""",
+                         (user, user, self.max_per_user))
+
+    def page(self, user, page=0, page_size=HISTORY_PAGE_SIZE):
+        """Newest first, without the report bodies: ([{id, timestamp, query, img1 (chart digest)}], total)"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM history WHERE user = ?", (user,)).fetchone()[0]
+            rows = conn.execute("""SELECT id, timestamp, query, json_extract(report, '$.img1') FROM history
+                                   WHERE user = ? ORDER BY created DESC LIMIT ? OFFSET ?""",
+                                (user, page_size, page * page_size)).fetchall()
+        return [{"id": r[0], "timestamp": r[1], "query": r[2], "img1": r[3]} for r in rows], total
+
+    def get(self, user, item_id):
+        """Report of one history item, None if it was evicted"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT report FROM history WHERE user = ? AND id = ?", (user, item_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear(self, user):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE user = ?", (user,))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_history() -> HistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+    return _store
@@ -0,0 +1,343 @@
+"""
+Large-file mode: cleaning, de-duplication and profiling statistics computed by streaming the CSV
+in chunks, so peak memory depends on the chunk size, not on the file size.
+
+One exception: de-duplication has to remember every unique row. In memory (HashSet) that is
+8 bytes per unique row, so up to LARGE_FILE_DEDUP_MB; files with more rows than that are
+de-duplicated on disk instead (DiskDedup: hash-partitioned spill files, one more pass over the CSV).
+Both compare rows by their 64-bit hash only, so unlike drop_duplicates() in the in-memory cleaner
+this is probabilistic: two distinct rows with the same hash would be merged. The odds are about
+n^2 / 2^65 for n unique rows (~3e-6 for 10M rows, ~3e-4 for 100M rows).
+"""
+import os
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+from src import tracing
+from src.tools.typeinfer import detect_date_format, parse_dates, numeric_share
+
+LARGE_FILE_MB = float(os.getenv("LARGE_FILE_MB", "200"))          # switch to streaming above this size
+CHUNK_ROWS = int(os.getenv("LARGE_FILE_CHUNK_ROWS", "200000"))
+SAMPLE_ROWS = int(os.getenv("LARGE_FILE_SAMPLE_ROWS", "100000"))  # rows the agents work on
+DEDUP_MEMORY_MB = float(os.getenv("LARGE_FILE_DEDUP_MB", "256"))   # row hashes kept in memory (8 bytes / row)
+KMV_SIZE = 2048      # distinct-count sketch size (~2% error)
+TOP_K_CAPACITY = 5000
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+def is_large(csv_path: str) -> bool:
+    return os.path.getsize(csv_path) > LARGE_FILE_MB * 1024 * 1024
+
+class ColumnSketch:
+    """Mergeable per-column aggregates: counts, moments, KMV distinct estimate and approximate top values"""
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = 0  # non-null values that parse as numbers
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.kmv = np.empty(0, dtype=np.uint64)
+        self.top = {}
+
+    def update(self, raw: pd.Series):
+        values = raw.dropna()
+        self.rows += len(raw)
+        self.nulls += len(raw) - len(values)
+
+        if pd.api.types.is_numeric_dtype(values):
+            num = values.to_numpy(dtype=float)
+        elif numeric_share(values) > 0:
+            num = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=float)
+        else:
+            # Sample found no numbers: skip the (slow) full string -> number conversion
+            num = np.empty(0)
+        if len(num):
+            self.numeric += len(num)
+            self.sum += num.sum()
+            self.sumsq += np.square(num).sum()
+            self.min = min(self.min, num.min())
+            self.max = max(self.max, num.max())
+
+        if len(values):
+            hashes = pd.util.hash_array(np.asarray(values.unique(), dtype=object))
+            if len(self.kmv) == KMV_SIZE:
+                hashes = hashes[hashes < self.kmv[-1]]  # only values that can enter the sketch
+            self.kmv = np.unique(np.concatenate([self.kmv, hashes]))[:KMV_SIZE]
+        if len(values) > len(num):
+            # Top values are only reported for text columns
+            for value, count in values.value_counts().items():
+                self.top[value] = self.top.get(value, 0) + int(count)
+            if len(self.top) > TOP_K_CAPACITY:
+                # Keep the heaviest half: approximate, but exact for frequent values
+                keep = sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)[:TOP_K_CAPACITY // 2]
+                self.top = dict(keep)
+
+    def merge(self, other: "ColumnSketch"):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric += other.numeric
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.kmv = np.unique(np.concatenate([self.kmv, other.kmv]))[:KMV_SIZE]
+        for value, count in other.top.items():
+            self.top[value] = self.top.get(value, 0) + count
+        return self
+
+    def distinct(self) -> int:
+        """Exact below KMV_SIZE distinct values, K-minimum-values estimate above"""
+        if len(self.kmv) < KMV_SIZE:
+            return len(self.kmv)
+        kth = float(self.kmv[-1]) / float(np.iinfo(np.uint64).max)
+        return int((KMV_SIZE - 1) / kth)
+
+    def is_numeric_column(self, threshold: float) -> bool:
+        """Same rule as the in-memory cleaner: numeric if it coerces with < threshold NaN share"""
+        non_null = self.rows - self.nulls
+        if non_null and self.numeric == non_null:
+            return True
+        return self.rows > 0 and (self.rows - self.numeric) / self.rows < threshold
+
+    def mean(self):
+        return self.sum / self.numeric if self.numeric else None
+
+    def summary(self):
+        info = {
+            "null_rate": round(self.nulls / self.rows, 4) if self.rows else 0,
+            "approx_distinct": self.distinct(),
+        }
+        if self.numeric:
+            mean = self.mean()
+            info.update({
+                "mean": mean,
+                "std": float(np.sqrt(max(self.sumsq / self.numeric - mean ** 2, 0))),
+                "min": float(self.min),
+                "max": float(self.max),
+            })
+        else:
+            top = sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)[:5]
+            info["top_values"] = {str(k): v for k, v in top}
+        return info
+
+class HashSet:
+    """Set of uint64 row hashes kept as sorted numpy segments (8 bytes per unique row, hash equality = same row)"""
+
+    def __init__(self):
+        self.segments = []
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Add hashes, return mask of the ones not seen before (first occurrence within the batch)"""
+        mask = ~pd.Series(hashes).duplicated().to_numpy()
+        for seg in self.segments:
+            pos = np.searchsorted(seg, hashes)
+            pos[pos == len(seg)] = 0
+            mask &= seg[pos] != hashes
+        fresh = np.sort(hashes[mask])
+        if len(fresh):
+            self.segments.append(fresh)
+            # Merge equal-sized neighbours so lookups stay O(log n) segments
+            while len(self.segments) > 1 and len(self.segments[-2]) <= len(self.segments[-1]) * 2:
+                last = self.segments.pop()
+                # Segments are disjoint and sorted: a stable sort of the two runs is a linear merge
+                self.segments[-1] = np.sort(np.concatenate([self.segments[-1], last]), kind="stable")
+        return mask
+
+class DiskDedup:
+    """
+    De-duplication by row hash (same collision odds as HashSet) in bounded memory: the row hashes of a first pass are spilled to
+    hash-partitioned files (hash, row number), each partition is de-duplicated on its own and the
+    duplicates are marked in a memory-mapped array (1 byte per row, on disk). The writing pass then
+    asks add_new() for each chunk in the same order, like HashSet.
+    """
+    RECORD = np.dtype([("hash", np.uint64), ("row", np.uint64)])
+
+    def __init__(self, rows: int, folder: str, memory_mb: float = None):
+        memory = (memory_mb or DEDUP_MEMORY_MB) * 1024 * 1024
+        # A partition plus its sort order must fit in the budget (~3x the 16-byte records)
+        self.bits = max(1, int(np.ceil(np.log2(max(2.0, rows * self.RECORD.itemsize * 3 / memory)))))
+        self.paths = [os.path.join(folder, f"dedup_{i}.bin") for i in range(1 << self.bits)]
+        self.files = [open(p, "wb") for p in self.paths]
+        self.duplicates = np.memmap(os.path.join(folder, "dedup_rows.bin"), dtype=bool, mode="w+", shape=(max(rows, 1),))
+        self.spilled = 0
+        self.offset = 0
+
+    def spill(self, hashes: np.ndarray):
+        """First pass: record a chunk's row hashes"""
+        records = np.empty(len(hashes), dtype=self.RECORD)
+        records["hash"] = hashes
+        records["row"] = np.arange(self.spilled, self.spilled + len(hashes), dtype=np.uint64)
+        part = (hashes >> np.uint64(64 - self.bits)).astype(np.int64)
+        order = np.argsort(part, kind="stable")
+        bounds = np.searchsorted(part[order], np.arange(len(self.files) + 1))
+        for i, f in enumerate(self.files):
+            if bounds[i + 1] > bounds[i]:
+                records[order[bounds[i]:bounds[i + 1]]].tofile(f)
+        self.spilled += len(hashes)
+
+    def finish(self):
+        """Mark every row whose hash appeared on an earlier row"""
+        for f, path in zip(self.files, self.paths):
+            f.close()
+            records = np.fromfile(path, dtype=self.RECORD)
+            os.remove(path)
+            if len(records) < 2:
+                continue
+            records = records[np.lexsort((records["row"], records["hash"]))]
+            repeat = records["hash"][1:] == records["hash"][:-1]
+            self.duplicates[records["row"][1:][repeat]] = True
+        self.duplicates.flush()
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Second pass: mask of the chunk's rows to keep (first occurrences)"""
+        mask = ~np.asarray(self.duplicates[self.offset:self.offset + len(hashes)])
+        self.offset += len(hashes)
+        return mask
+
+def _row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+def _read_chunks(csv_path, text_cols=None):
+    # Chunks infer types independently; columns known to be text are read as str so they stay consistent
+    dtype = {c: str for c in text_cols} if text_cols else None
+    tracing.record_csv_read(csv_path)  # once per pass
+    return pd.read_csv(csv_path, dtype=dtype, chunksize=CHUNK_ROWS)
+
+def stream_clean(csv_path: str, feather_path: str, sample_path: str, threshold: float, fill: str):
+    """
+    Two passes over the CSV (three when the row hashes don't fit in LARGE_FILE_DEDUP_MB):
+      1. mergeable sketches per column (decides numeric coercion, fill means, profile stats)
+      2. coerce / impute / de-duplicate each chunk and append it to the Feather output,
+         keeping a bottom-k uniform row sample for the agents.
+    Returns the cleaning stats (same shape as clean_dataframe, plus "profile").
+    """
+    import pyarrow as pa
+
+    # Pass 1: statistics (one sketch per chunk, merged)
+    sketches = {}
+    for chunk in _read_chunks(csv_path):
+        for col in chunk.columns:
+            part = ColumnSketch()
+            part.update(chunk[col])
+            sketches[col] = sketches[col].merge(part) if col in sketches else part
+    columns = list(sketches)
+    numeric_cols = [c for c in columns if sketches[c].is_numeric_column(threshold)]
+    means = {c: sketches[c].mean() for c in numeric_cols}
+
+    rows_before = sketches[columns[0]].rows if columns else 0
+    text_cols = [c for c in columns if c not in numeric_cols]
+
+    def cleaned_chunks():
+        for chunk in _read_chunks(csv_path, text_cols):
+            for col in columns:
+                if col in numeric_cols:
+                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+                    if means[col] is not None:
+                        chunk[col] = chunk[col].fillna(means[col])
+                else:
+                    chunk[col] = chunk[col].fillna(fill)
+            yield chunk
+
+    # Pass 2: clean + dedup + write. More rows than the in-memory hash budget: one extra pass
+    # records the row hashes on disk first (spill files next to the output, removed afterwards)
+    on_disk = rows_before * 8 > DEDUP_MEMORY_MB * 1024 * 1024
+    schema = pa.schema([(c, pa.float64() if c in numeric_cols else pa.string()) for c in columns])
+    rng = np.random.default_rng(0)
+    sample, sample_keys = None, None
+    rows_after = 0
+    with (tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(feather_path))) if on_disk
+          else contextlib.nullcontext()) as folder:
+        if on_disk:
+            seen = DiskDedup(rows_before, folder)
+            for chunk in cleaned_chunks():
+                seen.spill(_row_hashes(chunk))
+            seen.finish()
+        else:
+            seen = HashSet()
+        with pa.OSFile(feather_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in cleaned_chunks():
+                chunk = chunk[seen.add_new(_row_hashes(chunk))]
+                rows_after += len(chunk)
+
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+                # Bottom-k sampling: random priorities, keep the smallest -> uniform sample, mergeable per chunk
+                keys = rng.random(len(chunk))
+                if sample is None:
+                    sample, sample_keys = chunk, keys
+                else:
+                    sample = pd.concat([sample, chunk], ignore_index=True)
+                    sample_keys = np.concatenate([sample_keys, keys])
+                if len(sample) > SAMPLE_ROWS:
+                    keep = np.argpartition(sample_keys, SAMPLE_ROWS)[:SAMPLE_ROWS]
+                    sample, sample_keys = sample.iloc[keep].reset_index(drop=True), sample_keys[keep]
+
+    sample = sample if sample is not None else pd.DataFrame(columns=columns)
+    sample.to_feather(sample_path)
+
+    profile = {}
+    for col in columns:
+        info = sketches[col].summary()
+        if col in numeric_cols and len(sample):
+            info["approx_quantiles"] = {str(q): float(v) for q, v in sample[col].quantile(QUANTILES).items()}
+        profile[col] = info
+
+    column_stats = {}
+    for col in columns:
+        nulls = sketches[col].nulls
+        fill_value = means[col] if col in numeric_cols else fill
+        column_stats[col] = {
+            "dtype_before": "str",
+            "dtype_after": "float64" if col in numeric_cols else "str",
+            "coerced_to_numeric": col in numeric_cols,
+            "nulls_filled": nulls if fill_value is not None else 0,
+            "fill_value": fill_value if nulls else None,
+        }
+
+    return {
+        "engine": "streaming",
+        "rows_before": rows_before,
+        "rows_after": rows_after,
+        "duplicates_removed": rows_before - rows_after,
+        "dedup": "disk" if on_disk else "memory",
+        "sample_rows": len(sample),
+        "columns": column_stats,
+        "profile": profile,
+    }
+
+def stream_aggregates(feather_path: str, date_col: str, target_col: str, group_col: str, top_n: int = 100):
+    """
+    Exact chart aggregates over the full dataset, reading only the needed columns batch by batch:
+    monthly totals of the target and the top groups by total target.
+    Returns {"agg_by_month": DataFrame, "agg_by_group": DataFrame} (only those that apply).
+    """
+    import pyarrow as pa
+    reader = pa.ipc.open_file(pa.memory_map(feather_path))
+    names = reader.schema.names
+    if target_col not in names:
+        return {}
+
+    by_month, by_group = None, None
+    date_format = None
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        if date_col in names:
+            part = batch.select([date_col, target_col]).to_pandas()
+            # Format detected once (first batch), then every batch is parsed with it
+            date_format = date_format or detect_date_format(part[date_col]) or "mixed"
+            part[date_col] = parse_dates(part[date_col], date_format)
+            part = part.dropna(subset=[date_col]).groupby(pd.Grouper(key=date_col, freq="MS"))[target_col].sum()
+            by_month = part if by_month is None else by_month.add(part, fill_value=0)
+        if group_col in names:
+            part = batch.select([group_col, target_col]).to_pandas().groupby(group_col)[target_col].sum()
+            by_group = part if by_group is None else by_group.add(part, fill_value=0)
+
+    result = {}
+    if by_month is not None:
+        result["agg_by_month"] = by_month.sort_index().reset_index()
+    if by_group is not None:
+        result["agg_by_group"] = by_group.nlargest(top_n).reset_index()
+    return result
@@ -0,0 +1,108 @@
+import os
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.tools import artifacts
+
+# Unicode font shipped at the repo root (falls back to Arial / latin-1 without it)
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'DejaVuSans.ttf')
+PDF_CACHE_SIZE = 32  # built PDFs kept in memory (per report id)
+
+_builds = OrderedDict()  # report id -> Future of the PDF bytes
+_builds_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf")
+
+@functools.lru_cache(maxsize=1)
+def _font_metrics():
+    """DejaVu metrics parsed once per process (fpdf reads / writes the DejaVuSans.pkl cache next to the font)"""
+    from fpdf import FPDF  # fpdf + PIL are only loaded by the first PDF build
+    pdf = FPDF()
+    pdf.add_font('DejaVu', '', FONT_PATH, uni=True)
+    font = dict(pdf.fonts['dejavu'])
+    font['ttffile'] = FONT_PATH  # the shipped .pkl stores a cwd-relative path
+    return font, dict(pdf.font_files['dejavu'])
+
+class _GlyphSubset(list):
+    """fpdf's list of used characters (one entry per character written) with O(1) membership:
+    the font width table tests `cid in subset` for all 65k glyphs"""
+    def __init__(self, items=()):
+        super().__init__(items)
+        self._seen = set(self)
+
+    def append(self, item):
+        super().append(item)
+        self._seen.add(item)
+
+    def __contains__(self, item):
+        return item in self._seen
+
+def _add_font(pdf):
+    # Same registration as add_font, without re-reading the metrics; the subset is per document
+    font, font_file = _font_metrics()
+    pdf.fonts['dejavu'] = {**font, 'i': len(pdf.fonts) + 1, 'subset': _GlyphSubset(font['subset'])}
+    pdf.font_files['dejavu'] = dict(font_file)
+    pdf.font_files[FONT_PATH] = {'type': 'TTF'}
+
+def prepare_image(ref):
+    """Print version of a chart (digest or path): flattened, PDF_IMAGE_MAX_WIDTH px palette PNG. None if it is gone."""
+    return artifacts.variant_path(ref, "print")
+
+def create_pdf(p1, p2, p3, img1=None, img2=None):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    unicode_font = os.path.exists(FONT_PATH)
+    if unicode_font:
+        _add_font(pdf)
+        pdf.set_font('DejaVu', '', 14)
+    else:
+        pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, txt="DATA ANALYSIS REPORT", ln=1, align='C')
+    pdf.ln(10)
+
+    def write_section(title, body):
+        if unicode_font:
+            pdf.set_font('DejaVu', '', 14)
+            pdf.cell(200, 10, txt=title, ln=1)
+            pdf.set_font('DejaVu', '', 11)
+            pdf.multi_cell(0, 8, txt=body)
+        else:
+             # Fallback cho font Arial
+            pdf.set_font("Arial", 'B', 14)
+            pdf.cell(200, 10, txt=title.encode('latin-1', 'replace').decode('latin-1'), ln=1)
+            pdf.set_font("Arial", size=11)
+            pdf.multi_cell(0, 8, txt=body.encode('latin-1', 'replace').decode('latin-1'))
+        pdf.ln(5)
+
+    write_section("1. Trends & Overview", p1)
+    image = prepare_image(img1)
+    if image:
+        pdf.image(image, x=10, w=170)
+        pdf.ln(5)
+
+    write_section("2. Detailed Analysis", p2)
+    image = prepare_image(img2)
+    if image:
+        pdf.image(image, x=10, w=170)
+        pdf.ln(5)
+
+    write_section("3. Insights & Recommendations", p3)
+
+    return pdf.output(dest='S').encode('latin-1')
+
+def prebuild_pdf(report_id, p1, p2, p3, img1=None, img2=None):
+    """Start building a report's PDF in the background (once per report id). Returns the Future."""
+    with _builds_lock:
+        if report_id in _builds:
+            _builds.move_to_end(report_id)
+            return _builds[report_id]
+        future = _builds[report_id] = _executor.submit(create_pdf, p1, p2, p3, img1, img2)
+        while len(_builds) > PDF_CACHE_SIZE:
+            _builds.popitem(last=False)
+    return future
+
+def report_pdf(report_id, p1, p2, p3, img1=None, img2=None):
+    """PDF bytes of a report, built at most once per report id"""
+    return prebuild_pdf(report_id, p1, p2, p3, img1, img2).result()
@@ -0,0 +1,170 @@
+import os
+import time
+import queue
+import atexit
+import asyncio
+import functools
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Pool of pre-started worker processes for LLM-generated code
+REPL_WORKERS = int(os.getenv("REPL_WORKERS", str(min(4, os.cpu_count() or 1))))
+REPL_TIMEOUT = float(os.getenv("REPL_TIMEOUT", "120"))          # wall-clock seconds per execution
+REPL_CPU_SECONDS = float(os.getenv("REPL_CPU_SECONDS", "120"))  # CPU seconds per execution
+REPL_MEMORY_MB = int(os.getenv("REPL_MEMORY_MB", "2048"))       # extra address space per execution
+
+def _worker_entry(conn):
+    # Imported here so the parent process never loads the heavy libraries
+    from src.tools import worker
+    worker.main(conn)
+
+def _get_context():
+    method = os.getenv("REPL_START_METHOD")
+    if not method:
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    ctx = mp.get_context(method)
+    if method == "forkserver":
+        # The fork server imports pandas/matplotlib/seaborn once, each worker forks from it
+        ctx.set_forkserver_preload(["src.tools.worker"])
+    return ctx
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_entry, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, force=False):
+        try:
+            if not force:
+                self.conn.send(None)
+                self.process.join(timeout=1)
+        except (OSError, EOFError):
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class ExecutionPool:
+    """Runs code in isolated worker processes with per-execution limits and timing metrics"""
+
+    def __init__(self, size=REPL_WORKERS, timeout=REPL_TIMEOUT, cpu_seconds=REPL_CPU_SECONDS, memory_mb=REPL_MEMORY_MB):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._ctx = _get_context()
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._busy = 0
+        self._counts = {"ok": 0, "error": 0, "timeout": 0, "cpu_limit": 0, "memory_limit": 0, "crashed": 0}
+        self._timings = deque(maxlen=1000)
+        self._closed = False
+        # arun(): one thread per worker talks to the processes, extra async calls wait in the executor queue
+        self._async_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="repl-async")
+        for _ in range(size):
+            self._idle.put(_Worker(self._ctx))
+
+    def run(self, code: str, timeout: float = None, dataset_path: str = None, frames: dict = None, profile: int = 0):
+        """
+        Execute code on the next free worker. Returns a dict with output, status, timings and peak memory.
+        If dataset_path is given, the script gets the memory-mapped dataset as `df`;
+        frames ({name: feather path}) are preloaded under their names.
+        profile > 0: cProfile the execution, result["profile"] lists that many top functions.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        worker = self._idle.get()
+        with self._lock:
+            self._waiting -= 1
+            self._busy += 1
+        wait_s = time.perf_counter() - queued_at
+
+        start = time.perf_counter()
+        try:
+            worker.conn.send({"code": code, "cpu_seconds": self.cpu_seconds, "memory_mb": self.memory_mb,
+                              "dataset_path": dataset_path, "frames": frames, "profile": profile})
+            if worker.conn.poll(timeout):
+                result = worker.conn.recv()
+            else:
+                result = {"output": f"Execution timed out after {timeout}s", "status": "timeout"}
+        except (EOFError, OSError) as e:
+            # Worker died (segfault, hard memory kill, SIGXCPU without handler...)
+            result = {"output": f"Execution worker crashed: {e!r}", "status": "crashed"}
+        result.setdefault("exec_s", time.perf_counter() - start)
+        result["wait_s"] = wait_s
+
+        # Replace workers that may be stuck or left in a bad state
+        if result["status"] in ("timeout", "crashed", "memory_limit"):
+            worker.stop(force=True)
+            worker = _Worker(self._ctx)
+        self._idle.put(worker)
+
+        with self._lock:
+            self._busy -= 1
+            self._counts[result["status"]] += 1
+            self._timings.append((wait_s, result["exec_s"]))
+        return result
+
+    async def arun(self, code: str, timeout: float = None, dataset_path: str = None, frames: dict = None, profile: int = 0):
+        """Async run(): awaits a free worker without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._async_executor,
+                                          functools.partial(self.run, code, timeout, dataset_path, frames, profile))
+
+    def metrics(self):
+        """Queue depth, utilisation and timing summary of recent executions"""
+        with self._lock:
+            timings = list(self._timings)
+            metrics = {
+                "workers": self.size,
+                "busy": self._busy,
+                "queue_depth": self._waiting,
+                "executions": sum(self._counts.values()),
+                **self._counts,
+            }
+        if timings:
+            waits = sorted(t[0] for t in timings)
+            execs = sorted(t[1] for t in timings)
+            p95 = lambda values: values[min(len(values) - 1, int(len(values) * 0.95))]
+            metrics.update({
+                "avg_wait_s": sum(waits) / len(waits),
+                "p95_wait_s": p95(waits),
+                "avg_exec_s": sum(execs) / len(execs),
+                "p95_exec_s": p95(execs),
+            })
+        return metrics
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._async_executor.shutdown(wait=False, cancel_futures=True)
+        while not self._idle.empty():
+            self._idle.get_nowait().stop()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ExecutionPool:
+    """Shared pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExecutionPool()
+            atexit.register(_pool.shutdown)
+    return _pool
+
+def warm_up() -> ExecutionPool:
+    """Start the shared pool and wait until every worker is ready (libraries imported) with one no-op each"""
+    pool = get_pool()
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        list(executor.map(lambda _: pool.run("pass"), range(pool.size)))
+    return pool
@@ -0,0 +1,183 @@
+import re
+import numpy as np
+import pandas as pd
+
+from src.tools.typeinfer import is_text as _is_text, is_id_like as _is_id_like, detect_date_format, parse_dates, infer_kind
+
+# Lightweight, non-LLM column profiling: picks the date / target / group hints for the agents
+DATE_NAME_HINT = re.compile(r"date|time|day|month|year|period|timestamp", re.I)
+TARGET_NAME_HINT = re.compile(r"revenue|sales|amount|price|total|profit|score|quantity|qty|value|cost|income|count", re.I)
+GROUP_NAME_HINT = re.compile(r"category|region|product|type|segment|group|department|country|city|store|channel|class", re.I)
+CALENDAR_PART = re.compile(r"^(year|month|day|week|quarter|hour)s?$", re.I)
+MAX_GROUP_CARDINALITY = 50
+
+def _pick(candidates, name_hint):
+    preferred = [c for c in candidates if name_hint.search(str(c))]
+    if preferred:
+        return preferred[0]
+    return candidates[0] if candidates else "None"
+
+def detect_key_columns(df: pd.DataFrame, distinct_counts: dict = None, n_rows: int = None):
+    """
+    Return {"date_col", "target_col", "group_col"} ("None" when not found).
+    For large files df is a row sample; distinct_counts / n_rows then describe the full file.
+    """
+    n_rows = n_rows or len(df)
+    nunique = lambda c: distinct_counts[c] if distinct_counts and c in distinct_counts else df[c].nunique()
+    id_like = lambda c: _is_id_like(c, df[c], distinct_counts.get(c) if distinct_counts else None, n_rows)
+    text_cols = [c for c in df.columns if _is_text(df[c]) or pd.api.types.is_datetime64_any_dtype(df[c])]
+
+    # Date: name hint first, then any text column that parses as dates
+    date_candidates = [c for c in text_cols if DATE_NAME_HINT.search(str(c))] + \
+                      [c for c in text_cols if not DATE_NAME_HINT.search(str(c))]
+    date_col = next((c for c in date_candidates if detect_date_format(df[c])), "None")
+
+    numeric_cols = [c for c in df.select_dtypes(include="number").columns
+                    if not id_like(c) and not CALENDAR_PART.match(str(c).strip())
+                    and nunique(c) > 1]
+    target_col = _pick(numeric_cols, TARGET_NAME_HINT)
+
+    group_cols = [c for c in text_cols if c != date_col and _is_text(df[c]) and not id_like(c)
+                  and 1 < nunique(c) <= max(2, min(MAX_GROUP_CARDINALITY, n_rows // 2))]
+    group_col = _pick(group_cols, GROUP_NAME_HINT)
+
+    return {"date_col": date_col, "target_col": target_col, "group_col": group_col}
+
+# Structured data profile (no LLM): the EDA agent only turns this into a narrative
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+TOP_K = 5
+TOP_CORRELATIONS = 5
+TOP_GROUPS = 10
+MAX_TREND_POINTS = 36
+
+def _num(value, digits=4):
+    """JSON-friendly number rounded to a few significant digits (None for NaN)"""
+    if value is None or pd.isna(value) or not np.isfinite(float(value)):
+        return None
+    value = float(value)
+    return float(f"{value:.{digits}g}") if value != int(value) or abs(value) >= 1e15 else int(value)
+
+def _numeric_profile(num: pd.DataFrame):
+    """Vectorized stats for all numeric columns at once"""
+    quantiles = num.quantile(QUANTILES)
+    q1, q3 = quantiles.loc[0.25], quantiles.loc[0.75]
+    iqr = q3 - q1
+    outliers = ((num < q1 - 1.5 * iqr) | (num > q3 + 1.5 * iqr)).sum()
+    stats = num.agg(["mean", "std", "min", "max"])
+    return {
+        col: {
+            "kind": "numeric",
+            **{k: _num(stats.at[k, col]) for k in ("mean", "std", "min", "max")},
+            "quantiles": {str(q): _num(quantiles.at[q, col]) for q in QUANTILES},
+            "outliers_iqr": int(outliers[col]),
+        }
+        for col in num.columns
+    }
+
+def _text_profile(series: pd.Series, n_rows: int):
+    counts = series.value_counts().head(TOP_K)
+    return {
+        "kind": "text",
+        "top_values": {str(k): {"count": int(v), "share": _num(v / n_rows, 3)} for k, v in counts.items()},
+    }
+
+def _date_profile(series: pd.Series):
+    fmt = detect_date_format(series)
+    parsed = parse_dates(series, fmt)
+    return {
+        "kind": "datetime",
+        "format": fmt,
+        "min": str(parsed.min().date()) if parsed.notna().any() else None,
+        "max": str(parsed.max().date()) if parsed.notna().any() else None,
+        "unparsed_rate": _num(parsed.isna().mean() - series.isna().mean(), 3),
+    }
+
+def _top_correlations(num: pd.DataFrame):
+    if num.shape[1] < 2:
+        return []
+    corr = num.corr()
+    pairs = corr.where(np.triu(np.ones(corr.shape, dtype=bool), k=1)).stack().dropna()
+    pairs = pairs.reindex(pairs.abs().sort_values(ascending=False).index).head(TOP_CORRELATIONS)
+    return [{"columns": [a, b], "pearson": _num(v, 3)} for (a, b), v in pairs.items()]
+
+def _target_by_group(df, target, group, by_group=None):
+    if by_group is None:
+        by_group = df.groupby(group)[target].agg(["sum", "mean", "count"])
+        by_group = by_group.nlargest(TOP_GROUPS, "sum").reset_index()
+    return [{group: str(row[group]), **{k: _num(row[k]) for k in ("sum", "mean", "count") if k in row}}
+            for _, row in by_group.head(TOP_GROUPS).iterrows()]
+
+def _target_trend(df, date, target, by_month=None):
+    if by_month is None:
+        dates = parse_dates(df[date])
+        by_month = df[target].groupby(dates).sum().resample("MS").sum().reset_index()
+        by_month.columns = [date, target]
+    series = by_month.set_index(date)[target]
+    if series.empty:
+        return {}
+    freq = "MS"
+    if len(series) > MAX_TREND_POINTS:
+        series, freq = series.resample("YS").sum(), "YS"
+    label = (lambda d: d.strftime("%Y-%m")) if freq == "MS" else (lambda d: d.strftime("%Y"))
+    return {
+        "period": "month" if freq == "MS" else "year",
+        "totals": {label(d): _num(v) for d, v in series.items()},
+        "peak": label(series.idxmax()),
+        "lowest": label(series.idxmin()),
+        "change_first_to_last": _num((series.iloc[-1] - series.iloc[0]) / series.iloc[0], 3) if series.iloc[0] else None,
+    }
+
+def build_profile(df: pd.DataFrame, hints: dict, full_stats: dict = None, n_rows: int = None, aggregates: dict = None):
+    """
+    Compact, JSON-serialisable profile: per-column stats, correlations and target breakdowns.
+    Large files: df is a row sample; full_stats (streaming profile), n_rows and the exact
+    aggregates DataFrames then replace the sample-based numbers where available.
+    """
+    n_rows = n_rows or len(df)
+    aggregates = aggregates or {}
+    date, target, group = hints["date_col"], hints["target_col"], hints["group_col"]
+
+    null_rates = df.isna().mean()
+    num = df.select_dtypes(include="number")
+    columns = _numeric_profile(num) if num.shape[1] else {}
+    for col in df.columns:
+        if col in columns:
+            continue
+        if col == date or detect_date_format(df[col]):
+            columns[col] = _date_profile(df[col])
+        else:
+            columns[col] = _text_profile(df[col], len(df))
+
+    for col, info in columns.items():
+        full = (full_stats or {}).get(col)
+        if info["kind"] != "datetime":
+            # numeric / id / categorical split, from the shared type inference
+            info["kind"] = infer_kind(col, df[col], full.get("approx_distinct") if full else None, n_rows)
+        info["dtype"] = str(df[col].dtype)
+        info["null_rate"] = _num(null_rates[col], 3)
+        info["distinct"] = int(df[col].nunique())
+        if full:
+            # Exact (or sketched) full-file numbers beat the sample's
+            info["null_rate"] = _num(full.get("null_rate"), 3)
+            info["distinct"] = full.get("approx_distinct", info["distinct"])
+            for k in ("mean", "std", "min", "max"):
+                if k in full and k in info:
+                    info[k] = _num(full[k])
+
+    profile = {
+        "rows": n_rows,
+        "columns_count": len(df.columns),
+        "sampled_rows": len(df) if len(df) < n_rows else None,
+        "key_columns": hints,
+        "columns": {str(c): info for c, info in columns.items()},
+        "correlations": _top_correlations(num.drop(columns=[c for c in num.columns if _is_id_like(c, num[c])])),
+    }
+    if target in num.columns:
+        if group in df.columns:
+            by_group = aggregates.get("agg_by_group")
+            if by_group is not None:
+                by_group = by_group.rename(columns={target: "sum"})
+            profile["target_by_group"] = _target_by_group(df, target, group, by_group)
+        if date in df.columns:
+            profile["target_trend"] = _target_trend(df, date, target, aggregates.get("agg_by_month"))
+    return profile
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import inspect
+import functools
+
+from langchain_core.messages import SystemMessage, HumanMessage
+from src import tracing
+
+# Prompt layout: static instructions first (system message, identical across runs so the provider's
+# prefix cache can reuse them), variable data last (human message), compacted to a token budget
+REPORT_EDA_TOKENS = int(os.getenv("REPORT_EDA_TOKENS", "1500"))    # EDA text in each report prompt
+EDA_PROFILE_TOKENS = int(os.getenv("EDA_PROFILE_TOKENS", "2500"))  # data profile JSON in the EDA prompt
+TABLE_HEAD_ROWS, TABLE_TAIL_ROWS = 5, 2  # rows kept of long printed tables
+
+_TABLE_ROW = re.compile(r"^\s*\S+(?:\s{2,}\S+)+\s*$")  # pandas-style aligned columns
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+    except Exception:
+        return None  # not installed / no vocabulary offline: ~4 characters per token
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text, disallowed_special=())) if enc else len(text) // 4
+
+def _truncate(text, budget):
+    """Head and tail of text within budget tokens (the end of stdout often holds the totals)"""
+    enc = _encoding()
+    tokens = enc.encode(text, disallowed_special=()) if enc else text
+    scale = 1 if enc else 4
+    if len(tokens) <= budget * scale:
+        return text
+    head, tail = int(budget * 0.7) * scale, int(budget * 0.25) * scale
+    cut = (len(tokens) - head - tail) // scale
+    join = (lambda t: enc.decode(t)) if enc else "".join
+    return f"{join(tokens[:head])}\n[... {cut} tokens truncated ...]\n{join(tokens[-tail:])}"
+
+def _dedupe_lines(lines):
+    # Repeated stdout lines (prints in loops, warnings) are kept once; table rows are left to _shorten_tables
+    seen, kept, dropped = set(), [], 0
+    for line in lines:
+        key = line.strip()
+        if key and key in seen and not _TABLE_ROW.match(line):
+            dropped += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+    if dropped:
+        kept.append(f"[{dropped} duplicate lines removed]")
+    return kept
+
+def _shorten_tables(lines):
+    # Long printed tables: header + first / last rows
+    out, run = [], []
+    def flush():
+        if len(run) > 1 + TABLE_HEAD_ROWS + TABLE_TAIL_ROWS + 1:
+            omitted = len(run) - 1 - TABLE_HEAD_ROWS - TABLE_TAIL_ROWS
+            out.extend(run[:1 + TABLE_HEAD_ROWS] + [f"... {omitted} rows omitted ..."] + run[-TABLE_TAIL_ROWS:])
+        else:
+            out.extend(run)
+        run.clear()
+    for line in lines:
+        if _TABLE_ROW.match(line):
+            run.append(line)
+        else:
+            flush()
+            out.append(line)
+    flush()
+    return out
+
+def compact_text(text: str, budget: int) -> str:
+    """Fit free text (e.g. an EDA report or raw stdout) into budget tokens: dedupe, shorten tables, truncate"""
+    text = (text or "").strip()
+    if count_tokens(text) <= budget:
+        return text
+    lines = [line.rstrip() for line in text.splitlines()]
+    text = "\n".join(_shorten_tables(_dedupe_lines(lines)))
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return _truncate(text, budget)
+
+def _profile_json(profile):
+    return json.dumps(profile, separators=(",", ":"), default=str)
+
+def compact_profile(profile: dict, budget: int) -> dict:
+    """
+    Shrink a data profile (profiling.build_profile) until its JSON fits budget tokens.
+    Key columns keep their stats; other columns lose quantiles, then top values, then are listed by name only.
+    """
+    if count_tokens(_profile_json(profile)) <= budget:
+        return profile
+    profile = json.loads(_profile_json(profile))  # deep copy
+    key_cols = set(profile.get("key_columns", {}).values())
+    columns = profile.get("columns", {})
+    others = [c for c in columns if c not in key_cols]
+
+    def strip_quantiles():
+        for c in others:
+            columns[c].pop("quantiles", None)
+            columns[c].pop("dtype", None)
+
+    def fewer_values():
+        for c in others:
+            if "top_values" in columns[c]:
+                columns[c]["top_values"] = dict(list(columns[c]["top_values"].items())[:2])
+
+    def shorter_trend():
+        totals = profile.get("target_trend", {}).get("totals", {})
+        if len(totals) > 12:
+            keys = list(totals)
+            step = -(-len(keys) // 12)
+            profile["target_trend"]["totals"] = {k: totals[k] for k in keys[::step] + keys[-1:]}
+            profile["target_trend"]["totals_sampled_every"] = step
+
+    def names_only():
+        # Keep stats for as many columns as fit, list the rest by name and kind
+        total = count_tokens(_profile_json(profile))
+        listed = {}
+        for c in reversed(others):
+            if total <= budget:
+                break
+            total -= count_tokens(_profile_json({c: columns[c]})) - count_tokens(_profile_json({c: columns[c]["kind"]}))
+            listed[c] = columns.pop(c)["kind"]
+        profile["other_columns"] = dict(reversed(listed.items()))
+
+    for step in (strip_quantiles, fewer_values, shorter_trend, names_only):
+        step()
+        if count_tokens(_profile_json(profile)) <= budget:
+            break
+    return profile
+
+def build_messages(instructions: str, data: str):
+    """[system: static instructions, human: variable data]; counts the prompt tokens for the node's trace"""
+    messages = [SystemMessage(content=inspect.cleandoc(instructions)), HumanMessage(content=data.strip() + "\n")]
+    tracing.record(prompt_calls=1, prompt_tokens=sum(count_tokens(m.content) for m in messages))
+    return messages
@@ -0,0 +1,105 @@
+"""
+Shared column type inference: decisions come from a bounded sample, so the full column is
+converted at most once (with an explicit date format instead of per-value format guessing).
+"""
+import re
+import functools
+import pandas as pd
+
+SAMPLE_SIZE = 500
+DATE_MIN_SHARE = 0.9   # share of the sample that must parse for a column to count as a date
+# Tried in order; ties go to the first one (month-first, like pandas)
+DATE_FORMATS = [
+    "ISO8601",
+    "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d",
+    "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%y", "%d/%m/%y",
+    "%b %d, %Y", "%d %b %Y", "%B %d, %Y", "%d %B %Y", "%b %Y", "%B %Y",
+]
+NUMBER_LIKE = re.compile(r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$")
+ID_NAME_HINT = re.compile(r"(^|_|\b)id$|^id(_|\b)|uuid|code$|zip|phone", re.I)
+
+def is_text(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+def sample_values(series: pd.Series, size: int = SAMPLE_SIZE) -> pd.Series:
+    """Bounded, deterministic sample of the non-null values (spread over the column, not just the head)"""
+    values = series.dropna()
+    if len(values) > size:
+        values = values.iloc[:: len(values) // size][:size]
+    return values
+
+@functools.lru_cache(maxsize=1024)
+def _detect_format(values: tuple):
+    if not values or all(NUMBER_LIKE.match(v) for v in values):
+        return None  # plain numbers are not dates, even if some formats would accept them
+    sample = pd.Series(values)
+    best, best_share = None, 0.0
+    for fmt in DATE_FORMATS:
+        share = pd.to_datetime(sample, errors="coerce", format=fmt).notna().mean()
+        if share > best_share:
+            best, best_share = fmt, share
+        if share == 1.0:
+            break
+    if best_share >= DATE_MIN_SHARE:
+        return best
+    if pd.to_datetime(sample, errors="coerce", format="mixed").notna().mean() >= DATE_MIN_SHARE:
+        return "mixed"  # slow per-value parsing, only when no single format fits
+    return None
+
+def detect_date_format(series: pd.Series):
+    """Date format of a text column ("ISO8601", a strftime pattern or "mixed"), None if not a date"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if not is_text(series):
+        return None
+    values = sample_values(series)
+    return _detect_format(tuple(str(v) for v in values))
+
+def parse_dates(series: pd.Series, fmt: str = None) -> pd.Series:
+    """Convert a column to datetime once, with an explicit format (detected from a sample if not given)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    fmt = fmt or detect_date_format(series) or "mixed"
+    return pd.to_datetime(series, errors="coerce", format=fmt)
+
+def numeric_share(series: pd.Series) -> float:
+    """Share of a sample (nulls included) that parses as numbers"""
+    size = min(len(series), SAMPLE_SIZE)
+    if not size:
+        return 0.0
+    sample = series.iloc[:: max(1, len(series) // size)][:size]
+    return pd.to_numeric(sample, errors="coerce").notna().mean()
+
+def coerce_numeric(series: pd.Series, threshold: float):
+    """
+    Numeric version of a text column if its NaN share after coercion is < threshold, else None.
+    The sample rejects clearly non-numeric columns without converting them; borderline and
+    numeric columns are converted once and checked exactly.
+    """
+    if numeric_share(series) < (1 - threshold) / 2:
+        return None
+    values = pd.to_numeric(series, errors="coerce")
+    return values if values.isna().mean() < threshold else None
+
+def is_id_like(name: str, series: pd.Series, distinct: int = None, n_rows: int = None) -> bool:
+    if ID_NAME_HINT.search(str(name)):
+        return True
+    if distinct is not None:
+        # Sampled data: (almost) one distinct value per row of the full file
+        if pd.api.types.is_float_dtype(series) and not (series.dropna() % 1 == 0).all():
+            return False
+        return distinct >= 0.95 * n_rows
+    # Unique, monotonically increasing integers are row numbers, not metrics
+    return pd.api.types.is_integer_dtype(series) and series.is_unique and series.is_monotonic_increasing
+
+def infer_kind(name: str, series: pd.Series, distinct: int = None, n_rows: int = None) -> str:
+    """"numeric", "datetime", "id" or "categorical" """
+    if detect_date_format(series):
+        return "datetime"
+    if is_id_like(name, series, distinct, n_rows):
+        return "id"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    return "categorical"
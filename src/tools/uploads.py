@@ -0,0 +1,57 @@
+import os
+import uuid
+import hashlib
+
+# Uploads are never loaded whole: the preview reads PREVIEW_ROWS rows, rows are counted by scanning
+# newlines and the file is copied to the workspace in UPLOAD_CHUNK_MB chunks
+PREVIEW_ROWS = int(os.getenv("PREVIEW_ROWS", "5"))
+UPLOAD_CHUNK_MB = float(os.getenv("UPLOAD_CHUNK_MB", "8"))
+_CHUNK = max(1, int(UPLOAD_CHUNK_MB * 1024 * 1024))
+
+def _chunks(f):
+    f.seek(0)
+    for chunk in iter(lambda: f.read(_CHUNK), b""):
+        yield chunk
+    f.seek(0)
+
+def read_preview(f, rows: int = PREVIEW_ROWS):
+    """First rows of an uploaded CSV (file-like object) as a DataFrame"""
+    import pandas as pd  # not at module level: app.py imports this module before the first render
+    f.seek(0)
+    try:
+        return pd.read_csv(f, nrows=rows)
+    finally:
+        f.seek(0)
+
+def count_rows(f) -> int:
+    """
+    Data rows of a CSV without parsing it: newlines minus the header line.
+    Quoted values spanning several lines are counted once per line.
+    """
+    lines, last = 0, b"\n"
+    for chunk in _chunks(f):
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+    if last != b"\n":
+        lines += 1  # no newline after the last row
+    return max(0, lines - 1)
+
+def upload_hash(f) -> str:
+    """Content hash of an uploaded file, read chunk by chunk"""
+    digest = hashlib.sha256()
+    for chunk in _chunks(f):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def save_upload(f, path: str) -> str:
+    """Copy an uploaded file to disk chunk by chunk (temp name + rename)"""
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in _chunks(f):
+                out.write(chunk)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
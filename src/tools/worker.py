@@ -0,0 +1,192 @@
+"""
+Code-execution worker process.
+Heavy libraries are imported once per worker; every job runs in a fresh namespace
+with CPU and memory limits.
+"""
+import io
+import os
+import math
+import re
+import time
+import signal
+import contextlib
+from collections import OrderedDict
+
+# Preloaded so generated scripts import them for free
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg') # Headless mode
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+try:
+    import sklearn
+except ImportError:
+    sklearn = None
+
+try:
+    import resource  # POSIX only, limits are skipped elsewhere
+except ImportError:
+    resource = None
+
+import warnings
+warnings.filterwarnings("ignore")
+
+from src.tools import datastore, charts  # charts: native chart renderer used by the Viz agent
+
+class CPULimitExceeded(Exception):
+    pass
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded("CPU time limit exceeded")
+
+def _vm_bytes():
+    """Current virtual memory size of this process (Linux), 0 if unknown"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def _reset_peak_rss():
+    # Linux: "5" resets VmHWM, so the peak reported after a job is the job's own
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0
+
+def _profile_summary(profiler, top):
+    """Top functions of a cProfile run by cumulative time, one line each"""
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [f"{cum:8.3f}s cum {tot:8.3f}s own {calls:>7} calls  {os.path.basename(file)}:{line}({func})"
+            for (file, line, func), (_, calls, tot, cum, _) in rows]
+
+def _set_limits(cpu_seconds, memory_mb):
+    if resource is None:
+        return
+    if cpu_seconds:
+        # RLIMIT_CPU counts the whole process lifetime, so the budget is added to what was already used
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    base = _vm_bytes()
+    if memory_mb and base:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = base + memory_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+def _clear_limits():
+    if resource is None:
+        return
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        _, hard = resource.getrlimit(limit)
+        resource.setrlimit(limit, (hard, hard))
+
+def sanitize_input(code: str) -> str:
+    # Same cleanup as langchain's PythonREPL (stray backticks / "python" prefix)
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    return re.sub(r"(\s|`)*$", "", code)
+
+# Memory-mapped datasets stay open across jobs so follow-up scripts skip the load entirely
+_datasets = OrderedDict()
+MAX_CACHED_DATASETS = 4
+
+def _get_dataset(path: str) -> pd.DataFrame:
+    if path in _datasets:
+        _datasets.move_to_end(path)
+    else:
+        _datasets[path] = datastore.load(path)
+        while len(_datasets) > MAX_CACHED_DATASETS:
+            _datasets.popitem(last=False)
+    return _datasets[path]
+
+def execute(code: str, cpu_seconds: float = 0, memory_mb: int = 0, dataset_path: str = None, frames: dict = None,
+            profile: int = 0):
+    """
+    Run code in a fresh namespace and return its stdout plus timing and peak memory.
+    dataset_path is preloaded as `df`, frames ({name: feather path}) under their names.
+    profile > 0: run under cProfile and return that many top functions.
+    """
+    _reset_peak_rss()
+    namespace = {"__name__": "__main__"}
+    preload = dict(frames or {})
+    if dataset_path:
+        preload["df"] = dataset_path
+    for name, path in preload.items():
+        # Shallow copy: with Copy-on-Write, a script's modifications never reach the cached frame
+        namespace[name] = _get_dataset(path).copy(deep=False)
+    buffer = io.StringIO()
+    status = "ok"
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    _set_limits(cpu_seconds, memory_mb)
+    try:
+        with contextlib.redirect_stdout(buffer):
+            if profiler:
+                profiler.runctx(sanitize_input(code), namespace, namespace)
+            else:
+                exec(sanitize_input(code), namespace)
+        output = buffer.getvalue()
+    except MemoryError:
+        status = "memory_limit"
+        output = buffer.getvalue() + f"MemoryError: memory limit of {memory_mb} MB exceeded"
+    except CPULimitExceeded as e:
+        status = "cpu_limit"
+        output = buffer.getvalue() + f"{e} ({cpu_seconds}s)"
+    except Exception as e:
+        status = "error"
+        output = buffer.getvalue() + repr(e)
+    finally:
+        _clear_limits()
+        plt.close('all')
+
+    result = {
+        "output": output,
+        "status": status,
+        "exec_s": time.perf_counter() - start,
+        "cpu_s": time.process_time() - cpu_start,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if profiler:
+        result["profile"] = _profile_summary(profiler, profile)
+    return result
+
+def main(conn):
+    """Worker loop: receive jobs from the pool until None or the pipe closes"""
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        conn.send(execute(**job))
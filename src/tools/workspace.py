@@ -0,0 +1,95 @@
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+
+# Every analysis run gets its own directory for uploads, cleaned data and charts
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", os.path.join(tempfile.gettempdir(), "data_analyst_runs"))
+# Retention policy: idle runs older than TTL are removed, and at most MAX_RUNS idle ones are kept (0 = disabled).
+# Workspaces in use (marker file, see acquire_workspace) are never removed.
+WORKSPACE_TTL_HOURS = float(os.getenv("WORKSPACE_TTL_HOURS", "24"))
+WORKSPACE_MAX_RUNS = int(os.getenv("WORKSPACE_MAX_RUNS", "100"))
+CLEANUP_INTERVAL = 600  # seconds between two retention passes per process
+IN_USE = ".in_use"      # present while a run is queued on / executing in the workspace
+
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+def create_workspace(run_id: str = None) -> str:
+    """Create a fresh run directory, marked in use until release_workspace()"""
+    _maybe_cleanup()
+    run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(WORKSPACE_ROOT, run_id)
+    os.makedirs(path, exist_ok=True)
+    open(os.path.join(path, IN_USE), "w").close()
+    return path
+
+def acquire_workspace(path: str):
+    """Mark a workspace in use (a run is queued on it) and refresh its age for the TTL"""
+    if path and os.path.isdir(path):
+        open(os.path.join(path, IN_USE), "w").close()
+        os.utime(path)
+
+def release_workspace(path: str):
+    """The workspace is idle: the retention policy may remove it"""
+    try:
+        os.remove(os.path.join(path, IN_USE))
+    except (OSError, TypeError):
+        pass
+
+def _in_use(path, ttl_hours):
+    # A marker older than the TTL was left by a crashed process
+    try:
+        age = time.time() - os.path.getmtime(os.path.join(path, IN_USE))
+    except OSError:
+        return False
+    return ttl_hours <= 0 or age <= ttl_hours * 3600
+
+def workspace_file(state, filename: str) -> str:
+    """Path of an artifact inside the run's workspace (cwd if the state has none)"""
+    return os.path.join(state.get("workspace_dir") or ".", filename)
+
+def remove_workspace(path: str):
+    # Only ever delete directories that live under the workspace root
+    if path and os.path.abspath(path).startswith(os.path.abspath(WORKSPACE_ROOT) + os.sep):
+        shutil.rmtree(path, ignore_errors=True)
+
+def cleanup_workspaces(ttl_hours: float = None, max_runs: int = None):
+    """Delete expired idle run directories. Returns the number removed."""
+    ttl_hours = WORKSPACE_TTL_HOURS if ttl_hours is None else ttl_hours
+    max_runs = WORKSPACE_MAX_RUNS if max_runs is None else max_runs
+    if not os.path.isdir(WORKSPACE_ROOT):
+        return 0
+
+    runs = []
+    for name in os.listdir(WORKSPACE_ROOT):
+        path = os.path.join(WORKSPACE_ROOT, name)
+        try:
+            if os.path.isdir(path) and not _in_use(path, ttl_hours):
+                runs.append((os.path.getmtime(path), path))
+        except OSError:
+            pass  # removed by another process
+    runs.sort(reverse=True)  # newest first
+
+    expired = []
+    now = time.time()
+    for idx, (mtime, path) in enumerate(runs):
+        too_old = ttl_hours > 0 and now - mtime > ttl_hours * 3600
+        too_many = max_runs > 0 and idx >= max_runs
+        if too_old or too_many:
+            expired.append(path)
+
+    for path in expired:
+        remove_workspace(path)
+    return len(expired)
+
+def _maybe_cleanup():
+    # At most once per CLEANUP_INTERVAL per process, not on every new run
+    global _last_cleanup
+    with _cleanup_lock:
+        if time.time() - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = time.time()
+    cleanup_workspaces()
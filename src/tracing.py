@@ -0,0 +1,231 @@
+"""
+Per-node tracing of the agent graph.
+
+graph.timed opens one span per node; code running inside it adds its counters with record()
+(REPL executions, CSV bytes read; LLM usage comes from llm.track). The totals land in
+state["node_timings"][node], and with TRACE_FILE set every span is appended to that file as one
+JSON line with OpenTelemetry span fields (trace_id, span_id, parent_span_id, name,
+start/end_time_unix_nano, attributes, status). REPL executions are child spans of their node.
+
+TRACE_PROFILE=cprofile runs every REPL execution under cProfile in the worker; the top functions
+are attached to the execution span.
+
+    python -m src.tracing trace.jsonl              # per-node summary + critical path of the last run
+    python -m src.tracing trace.jsonl --all --profile
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")                        # JSONL span file, empty = no export
+TRACE_PROFILE = os.getenv("TRACE_PROFILE", "off").lower()       # off | cprofile (REPL executions)
+TRACE_PROFILE_TOP = int(os.getenv("TRACE_PROFILE_TOP", "15"))   # functions kept per profiled execution
+
+_lock = threading.Lock()
+_span = contextvars.ContextVar("trace_span", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+def _status_kb(field):
+    """VmRSS / VmHWM of this process in KB (Linux), 0 if unknown"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def profiling_enabled() -> bool:
+    return TRACE_PROFILE == "cprofile"
+
+def _flatten(attributes, prefix=""):
+    # OpenTelemetry attributes are flat: {"llm": {"calls": 2}} -> {"llm.calls": 2}
+    flat = {}
+    for key, value in attributes.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def export(span):
+    """Append one finished span to TRACE_FILE (single write per line, safe across processes)"""
+    if not TRACE_FILE:
+        return
+    line = json.dumps({**span, "attributes": _flatten(span["attributes"])}, default=str) + "\n"
+    try:
+        fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"Trace export error: {e}")
+
+def _new_span(name, trace_id, parent=None, attributes=None):
+    return {
+        "trace_id": trace_id,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_span_id": parent,
+        "name": name,
+        "kind": "INTERNAL",
+        "start_time_unix_nano": time.time_ns(),
+        "end_time_unix_nano": None,
+        "attributes": dict(attributes or {}),
+        "status": {"code": "OK"},
+    }
+
+@contextmanager
+def node_span(name, trace_id, upstream=()):
+    """Span of one graph node; yields its attributes dict (filled by record() inside the block)"""
+    span = _new_span(name, trace_id, attributes={"node": {"name": name, "upstream": list(upstream)}})
+    token = _span.set(span)
+    try:
+        yield span["attributes"]
+    except BaseException as e:
+        span["status"] = {"code": "ERROR", "message": f"{type(e).__name__}: {e}"}
+        raise
+    finally:
+        _span.reset(token)
+        span["end_time_unix_nano"] = time.time_ns()
+        # Main process memory: concurrent nodes share it, so this is the process view at node end
+        span["attributes"]["memory"] = {"rss_mb": round(_status_kb("VmRSS") / 1024, 1),
+                                        "process_peak_mb": round(_status_kb("VmHWM") / 1024, 1)}
+        export(span)
+
+def record(**counts):
+    """Add counters to the current node span (no-op outside a node)"""
+    span = _span.get()
+    if span is None:
+        return
+    with _lock:
+        for name, value in counts.items():
+            group, _, key = name.partition("_")
+            target = span["attributes"].setdefault(group, {})
+            if key.startswith("peak"):
+                target[key] = max(target.get(key, 0), value)
+            else:
+                target[key] = round(target.get(key, 0) + value, 3)
+
+def record_csv_read(path):
+    """A CSV file is read in full by the current node"""
+    try:
+        record(csv_bytes=os.path.getsize(path), csv_files=1)
+    except OSError:
+        pass
+
+def record_repl(result):
+    """Account one pool execution result to the current node and export it as a child span"""
+    span = _span.get()
+    record(repl_calls=1, repl_seconds=result.get("exec_s", 0), repl_wait_seconds=result.get("wait_s", 0),
+           repl_cpu_seconds=result.get("cpu_s", 0), repl_peak_mb=result.get("peak_rss_mb", 0),
+           **{"repl_" + result["status"]: 1} if result.get("status") != "ok" else {})
+    if span is None or not TRACE_FILE:
+        return
+    child = _new_span("repl", span["trace_id"], span["span_id"], {"repl": {
+        "status": result.get("status"), "exec_s": round(result.get("exec_s", 0), 4),
+        "wait_s": round(result.get("wait_s", 0), 4), "cpu_s": round(result.get("cpu_s", 0), 4),
+        "peak_rss_mb": result.get("peak_rss_mb", 0), "profile": result.get("profile", []),
+    }})
+    child["end_time_unix_nano"] = time.time_ns()
+    child["start_time_unix_nano"] = child["end_time_unix_nano"] - int(result.get("exec_s", 0) * 1e9)
+    if result.get("status") != "ok":
+        child["status"] = {"code": "ERROR", "message": result.get("status")}
+    export(child)
+
+def critical_path(durations, upstream):
+    """Longest chain of dependent nodes. durations {node: s}, upstream {node: [nodes]}. Returns (nodes, seconds)."""
+    best = {}
+    def longest(name):
+        if name not in best:
+            chains = [longest(dep) for dep in upstream.get(name, []) if dep in durations]
+            path, seconds = max(chains, key=lambda x: x[1], default=([], 0))
+            best[name] = (path + [name], seconds + durations[name])
+        return best[name]
+    return max((longest(n) for n in durations), key=lambda x: x[1], default=([], 0))
+
+# --- viewer ---
+
+def load_traces(path):
+    """{trace_id: [spans]} in file order (torn lines are skipped)"""
+    traces = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+def summarize(spans):
+    """Per-node rows and the critical path of one trace"""
+    seconds = lambda s: (s["end_time_unix_nano"] - s["start_time_unix_nano"]) / 1e9
+    nodes = [s for s in spans if s["parent_span_id"] is None]
+    rows = []
+    for s in sorted(nodes, key=lambda s: s["start_time_unix_nano"]):
+        a = s["attributes"]
+        rows.append({
+            "node": s["name"], "seconds": round(seconds(s), 3), "status": s["status"]["code"],
+            "llm_calls": a.get("llm.calls", 0), "llm_seconds": a.get("llm.seconds", 0),
+            "tokens": a.get("llm.prompt_tokens", 0) + a.get("llm.completion_tokens", 0),
+            "repl_calls": a.get("repl.calls", 0), "repl_seconds": a.get("repl.seconds", 0),
+            "repl_peak_mb": a.get("repl.peak_mb", 0), "csv_mb": round(a.get("csv.bytes", 0) / 1e6, 2),
+            "rss_mb": a.get("memory.rss_mb", 0),
+        })
+    durations = {r["node"]: r["seconds"] for r in rows}
+    upstream = {s["name"]: s["attributes"].get("node.upstream", []) for s in nodes}
+    path, total = critical_path(durations, upstream)
+    start = min((s["start_time_unix_nano"] for s in spans), default=0)
+    end = max((s["end_time_unix_nano"] for s in spans), default=0)
+    return {"rows": rows, "critical_path": path, "critical_seconds": round(total, 3), "wall_seconds": round((end - start) / 1e9, 3)}
+
+def print_trace(trace_id, spans, show_profile=False):
+    summary = summarize(spans)
+    print(f"Trace {trace_id}: wall {summary['wall_seconds']:.2f}s")
+    print(f"  {'node':<11}{'seconds':>9}{'llm':>5}{'llm s':>8}{'tokens':>8}{'repl':>6}{'repl s':>8}{'repl MB':>9}{'csv MB':>8}{'rss MB':>8}")
+    for r in summary["rows"]:
+        flag = "" if r["status"] == "OK" else "  ERROR"
+        print(f"  {r['node']:<11}{r['seconds']:>9.2f}{r['llm_calls']:>5}{r['llm_seconds']:>8.2f}{r['tokens']:>8}"
+              f"{r['repl_calls']:>6}{r['repl_seconds']:>8.2f}{r['repl_peak_mb']:>9.0f}{r['csv_mb']:>8.1f}{r['rss_mb']:>8.0f}{flag}")
+    print(f"  critical path: {' -> '.join(summary['critical_path'])} ({summary['critical_seconds']:.2f}s)")
+    if show_profile:
+        for s in spans:
+            profile = s["attributes"].get("repl.profile")
+            if profile:
+                parent = next((p["name"] for p in spans if p["span_id"] == s["parent_span_id"]), "?")
+                print(f"  profile of a REPL execution in {parent} ({s['attributes'].get('repl.exec_s', 0):.2f}s):")
+                for line in profile:
+                    print(f"    {line}")
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarise a TRACE_FILE: per-node costs and critical path")
+    parser.add_argument("trace_file")
+    parser.add_argument("--trace", help="trace id (default: the last run in the file)")
+    parser.add_argument("--all", action="store_true", help="every run in the file")
+    parser.add_argument("--profile", action="store_true", help="show the cProfile output of REPL executions")
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.trace_file)
+    if not traces:
+        print("No spans found")
+        return 1
+    ids = list(traces) if args.all else [args.trace or list(traces)[-1]]
+    for trace_id in ids:
+        if trace_id not in traces:
+            print(f"Unknown trace id: {trace_id}")
+            return 1
+        print_trace(trace_id, traces[trace_id], args.profile)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())